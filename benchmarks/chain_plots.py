@@ -0,0 +1,89 @@
+"""Times per-chain pLDDT/PAE plot rendering serially and in a process pool.
+
+Renders the plots of the bundled assets/pred_data prediction (token map of
+assets/pdb/prot_lig.pdb, ligand included) and of synthetic predictions with many chains, once in
+this process and once per pool size. The pool only pays off with more than
+one chain and more than one CPU; each worker receives just its chain's slices.
+
+    python benchmarks/chain_plots.py --chains 4 8 16 --residues 150 --processes 2 4
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "scripts"))
+from engine.analysis import render_all_chain_plots  # noqa: E402
+from engine.predictions import token_block  # noqa: E402
+from engine.structure import read_structure  # noqa: E402
+from engine.token_map import build_token_map, chain_tokens  # noqa: E402
+
+ASSETS = os.path.join(BENCH_DIR, "..", "assets")
+PRED_DATA = os.path.join(ASSETS, "pred_data")
+
+
+def make_tasks(plddt, pae, tokens, out_dir):
+    from engine.analysis import CHAIN_COLORS, COLOR_TO_CMAP, chain_pae_level
+
+    tasks = []
+    for i, (chain_id, idx) in enumerate(tokens.items()):
+        color = CHAIN_COLORS[i % len(CHAIN_COLORS)]
+        chain_pae, extent = chain_pae_level(token_block(pae, idx))
+        for kind, data in (("plddt", plddt[idx]), ("pae", chain_pae)):
+            tasks.append({"kind": kind, "chain_id": chain_id, "color": color, "cmap": COLOR_TO_CMAP[color],
+                          "data": data, "extent": extent, "file": os.path.join(out_dir, f"{chain_id}_{kind}.png")})
+    return tasks
+
+
+def bundled_case(out_dir):
+    import numpy as np
+
+    with np.load(os.path.join(PRED_DATA, "plddt.npz")) as data:
+        plddt = data["plddt"].astype(np.float32) * 100
+    with np.load(os.path.join(PRED_DATA, "pae.npz")) as data:
+        pae = data["pae"].astype(np.float32)
+    tokens = chain_tokens(build_token_map(read_structure(os.path.join(ASSETS, "pdb", "prot_lig.pdb"))))
+    return "pred_data", make_tasks(plddt, pae, tokens, out_dir)
+
+
+def synthetic_case(n_chains, residues, out_dir):
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    n_tokens = n_chains * residues
+    plddt = rng.uniform(30, 95, n_tokens).astype(np.float32)
+    pae = rng.uniform(0, 30, (n_tokens, n_tokens)).astype(np.float32)
+    tokens = {f"{i:02d}": slice(i * residues, (i + 1) * residues) for i in range(n_chains)}
+    return f"{n_chains} chains x {residues}", make_tasks(plddt, pae, tokens, out_dir)
+
+
+def timed(tasks, processes):
+    started = time.perf_counter()
+    results = render_all_chain_plots(tasks, processes)
+    return time.perf_counter() - started, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chains", type=int, nargs="+", default=[4, 8])
+    parser.add_argument("--residues", type=int, default=150, help="residues per synthetic chain")
+    parser.add_argument("--processes", type=int, nargs="+", default=[2, 4])
+    args = parser.parse_args()
+
+    out_dir = tempfile.mkdtemp(prefix="boltz_chain_plots_")
+    cases = [bundled_case(out_dir)] + [synthetic_case(n, args.residues, out_dir) for n in args.chains]
+    print(f"{os.cpu_count()} CPUs")
+    print(f"{'case':>18} {'processes':>9} {'wall s':>8} {'speedup':>8}")
+    for label, tasks in cases:
+        baseline, expected = timed(tasks, 1)
+        print(f"{label:>18} {1:>9} {baseline:8.2f} {1:7.2f}x")
+        for processes in args.processes:
+            wall, results = timed(tasks, processes)
+            assert [len(r) for r in results] == [len(r) for r in expected], "chain order differs"
+            print(f"{label:>18} {processes:>9} {wall:8.2f} {baseline / wall:7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Times loading confidence arrays from compressed npz and from the memory-mapped store.
+
+Writes a synthetic job with `--samples` models of `--tokens` tokens (PAE as
+compressed npz, like boltz), then, each in a fresh process, loads the
+confidence stack and takes the PAE block of one chain (a quarter of the
+tokens) of the top model, as the report does: once from the npz files and
+once from the store in each dtype. Reports wall time, peak traced NumPy
+allocations and the resident set afterwards (which includes the mapped pages
+actually read).
+
+    python benchmarks/confidence_store.py --tokens 4000 --samples 5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "scripts"))
+from engine.confidence_store import STORE_DTYPES, write_confidence_store  # noqa: E402
+from engine.predictions import load_confidence_stack, predictions_dir, token_block  # noqa: E402
+
+JOB = "bench"
+
+
+def write_job(data_dir, n_tokens, n_samples):
+    import numpy as np
+
+    out_dir = predictions_dir(JOB, data_dir)
+    os.makedirs(out_dir)
+    rng = np.random.default_rng(0)
+    for i in range(n_samples):
+        open(f"{out_dir}/{JOB}_model_{i}.pdb", 'w').close()
+        np.savez_compressed(f"{out_dir}/plddt_{JOB}_model_{i}.npz", plddt=rng.uniform(0.3, 0.95, n_tokens).astype(np.float32))
+        pae = rng.gamma(2.0, 3.0, (n_tokens, n_tokens)).astype(np.float32)
+        np.savez_compressed(f"{out_dir}/pae_{JOB}_model_{i}.npz", pae=pae)
+        del pae
+
+
+def _rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def child(data_dir, n_tokens):
+    """Runs one load in this process and prints its measurements as JSON."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    stack = load_confidence_stack(JOB, data_dir=data_dir)
+    chain = range(n_tokens // 4, n_tokens // 2)
+    block_mean = float(token_block(stack["pae"][0], list(chain)).mean(dtype="float64"))
+    wall = time.perf_counter() - started
+    print(json.dumps({"wall": wall, "traced_mb": tracemalloc.get_traced_memory()[1] / 2 ** 20,
+                      "rss_mb": _rss_mb(),
+                      "block_mean": block_mean}))
+
+
+def measure(data_dir, n_tokens):
+    out = subprocess.run([sys.executable, __file__, "--child", data_dir, "--tokens", str(n_tokens)],
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=3000)
+    parser.add_argument("--samples", type=int, default=5)
+    parser.add_argument("--child", metavar="DATA_DIR", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(args.child, args.tokens)
+
+    data_dir = tempfile.mkdtemp(prefix="boltz_store_")
+    write_job(data_dir, args.tokens, args.samples)
+    print(f"{args.samples} samples x {args.tokens} tokens")
+    print(f"{'path':>22} {'wall s':>7} {'traced MB':>10} {'RSS MB':>7} {'block mean':>11}")
+    paths = [("npz", None)] + [(f"store {dtype}", dtype) for dtype in STORE_DTYPES]
+    for label, dtype in paths:
+        if dtype:
+            started = time.perf_counter()
+            write_confidence_store(JOB, dtype, data_dir)
+            label += f" ({time.perf_counter() - started:.1f}s)"
+        r = measure(data_dir, args.tokens)
+        print(f"{label:>22} {r['wall']:7.2f} {r['traced_mb']:10.1f} {r['rss_mb']:7.1f} {r['block_mean']:11.4f}")
+
+
+if __name__ == "__main__":
+    main()
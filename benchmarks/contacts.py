@@ -0,0 +1,112 @@
+"""Times the inter-chain contact search against Bio.PDB's NeighborSearch and a brute-force search.
+
+Uses the bundled prot_lig.pdb and synthetic assemblies of `--copies` copies of
+its protein, each its own chain, laid out on a cubic lattice `--spacing` Å
+apart so neighboring copies touch (about 4,600 atoms per copy; 11 copies make
+a 50k-atom assembly). For each structure reports the heavy atoms, the
+inter-chain atom pairs within `--cutoff` Å, and the time of
+contacts.neighbor_pairs (NumPy cell list), Bio.PDB.NeighborSearch (KD-tree,
+all pairs then filtered to inter-chain) and a chunked all-against-all NumPy
+search (skipped above `--brute-max` atoms), checking that all agree. The last
+column is the full token_contacts call (search plus folding into residue
+pairs).
+
+    python benchmarks/contacts.py --copies 2 5 11 --cutoff 5
+"""
+import argparse
+import os
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "scripts"))
+from engine.contacts import neighbor_pairs, token_contacts  # noqa: E402
+from engine.structure import read_structure  # noqa: E402
+from engine.token_map import build_token_map  # noqa: E402
+from pdb_reader import CHAIN_IDS, PROT_LIG, timed  # noqa: E402
+
+
+def assembly(structure, copies, spacing):
+    """`copies` translated copies of the protein atoms of `structure`, chains A, B, ..."""
+    import numpy as np
+
+    protein = np.flatnonzero(~structure["hetero"])
+    side = int(np.ceil(copies ** (1 / 3)))
+    shifts = np.array([(x, y, z) for x in range(side) for y in range(side) for z in range(side)][:copies]) * spacing
+    tiled = {key: np.tile(values[protein], copies) for key, values in structure.items() if key != "xyz"}
+    tiled["chain"] = np.repeat(np.array(list(CHAIN_IDS[:copies])), len(protein))
+    xyz = structure["xyz"][protein]
+    tiled["xyz"] = np.concatenate([xyz + shift for shift in shifts]).astype(np.float32)
+    return tiled
+
+
+def biopython_pairs(xyz, cutoff, groups):
+    import numpy as np
+    from Bio.PDB.NeighborSearch import NeighborSearch
+
+    class Atom:
+        def __init__(self, index, coord):
+            self.index, self.coord = index, coord
+
+        def get_coord(self):
+            return self.coord
+
+    atoms = [Atom(i, c) for i, c in enumerate(np.asarray(xyz, dtype=np.float64))]
+    pairs = [(a.index, b.index) for a, b in NeighborSearch(atoms).search_all(cutoff)]
+    i, j = np.array(pairs, dtype=np.int64).reshape(-1, 2).T
+    keep = groups[i] != groups[j]
+    return np.minimum(i, j)[keep], np.maximum(i, j)[keep]
+
+
+def brute_force_pairs(xyz, cutoff, groups, chunk=2048):
+    import numpy as np
+
+    xyz = np.asarray(xyz, dtype=np.float64)
+    found_i, found_j = [], []
+    for start in range(0, len(xyz), chunk):
+        block = xyz[start:start + chunk]
+        d2 = ((block[:, None, :] - xyz[None, :, :]) ** 2).sum(axis=2)
+        i, j = np.nonzero(d2 < cutoff ** 2)
+        i += start
+        keep = (j > i) & (groups[i] != groups[j])
+        found_i.append(i[keep])
+        found_j.append(j[keep])
+    return np.concatenate(found_i), np.concatenate(found_j)
+
+
+def pair_set(i, j):
+    return set(zip(i.tolist(), j.tolist()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--copies", type=int, nargs="+", default=[2, 5, 11])
+    parser.add_argument("--spacing", type=float, default=40.0)
+    parser.add_argument("--cutoff", type=float, default=5.0)
+    parser.add_argument("--brute-max", type=int, default=25000)
+    args = parser.parse_args()
+
+    prot_lig = read_structure(PROT_LIG)
+    structures = [("prot_lig.pdb", prot_lig)]
+    structures += [(f"{copies} copies", assembly(prot_lig, copies, args.spacing))
+                   for copies in args.copies if copies <= len(CHAIN_IDS)]
+    print(f"{'structure':>14} {'atoms':>7} {'pairs':>7} {'cell list s':>12} {'Bio.PDB s':>10} "
+          f"{'brute s':>8} {'contacts s':>11}")
+    for name, structure in structures:
+        heavy = structure["element"] != "H"
+        xyz, groups = structure["xyz"][heavy], structure["chain"][heavy]
+        cell, (i, j, _) = timed(neighbor_pairs, xyz, args.cutoff, groups)
+        expected = pair_set(i, j)
+        bio, bio_pairs = timed(biopython_pairs, xyz, args.cutoff, groups, repeat=1)
+        assert pair_set(*bio_pairs) == expected, f"Bio.PDB pairs differ for {name}"
+        brute = "-"
+        if len(xyz) <= args.brute_max:
+            seconds, brute_pairs = timed(brute_force_pairs, xyz, args.cutoff, groups, repeat=1)
+            assert pair_set(*brute_pairs) == expected, f"brute-force pairs differ for {name}"
+            brute = f"{seconds:8.3f}"
+        token_map = build_token_map(structure)
+        contacts, _ = timed(token_contacts, structure, token_map, args.cutoff)
+        print(f"{name:>14} {len(xyz):>7} {len(expected):>7} {cell:12.3f} {bio:10.3f} {brute:>8} {contacts:11.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""Stand-in for `boltz predict` on machines without a GPU or boltz install.
+
+Prints the stage markers and tqdm-style progress bars boltz prints, sleeps,
+burns CPU and holds memory per stage, and writes outputs shaped like boltz's
+(model PDBs from assets/pdb/prot_lig.pdb, pLDDT/PAE npz, confidence JSON,
+server MSA CSVs, a processed record that later runs skip preprocessing for, and
+an affinity JSON derived from the ligand SMILES when the input asks for
+affinity). Link or copy it as `boltz` on PATH:
+
+    mkdir -p /tmp/fakebin && ln -sf $PWD/benchmarks/fake_boltz.py /tmp/fakebin/boltz
+    PATH=/tmp/fakebin:$PATH python benchmarks/resource_profile.py
+
+Environment:
+    FAKE_BOLTZ_STAGE_SECONDS  seconds per stage (default 1.0)
+    FAKE_BOLTZ_MSA_SECONDS, FAKE_BOLTZ_PROCESS_SECONDS, FAKE_BOLTZ_INFERENCE_SECONDS
+                              override the duration of one stage
+    FAKE_BOLTZ_SLEEP          1 to sleep through the local stages instead of burning CPU
+    FAKE_BOLTZ_STARTUP_SECONDS  import and checkpoint loading time, paid once per process (default 0)
+
+It also serves as the stub for the warm worker (`python -m engine.worker --stub`),
+which loads it once and calls main() per job.
+    FAKE_BOLTZ_MEMORY_MB      memory held during diffusion (default 200)
+    FAKE_BOLTZ_EXIT           exit code after preprocessing (default 0, i.e. succeed)
+    FAKE_BOLTZ_MAX_SAMPLES    fail with a CUDA out-of-memory error above this many diffusion samples
+    FAKE_BOLTZ_MSA_FAILURES   fail the first N MSA server requests under --out_dir with a ConnectionError
+"""
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+
+ASSET_PDB = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "assets", "pdb", "prot_lig.pdb")
+
+# Stands in for importing torch and loading the checkpoints
+time.sleep(float(os.environ.get("FAKE_BOLTZ_STARTUP_SECONDS", 0)))
+
+
+def _arg(args, name, default):
+    return args[args.index(name) + 1] if name in args else default
+
+
+def _busy(seconds, memory_mb=0, label=None, steps=10):
+    """Spins the CPU (or sleeps) for `seconds`, holding `memory_mb` of touched memory, drawing a bar."""
+    idle = os.environ.get("FAKE_BOLTZ_SLEEP") == "1"
+    if label:
+        # tqdm draws the empty bar before the first step, which is when boltz allocates
+        sys.stdout.write(f"{label}:   0%|          | 0/{steps} [00:00<?, ?it/s]")
+        sys.stdout.flush()
+    hold = bytearray(memory_mb * 2 ** 20)
+    for i in range(0, len(hold), 4096):
+        hold[i] = 1
+    for step in range(1, steps + 1):
+        end = time.monotonic() + seconds / steps
+        if idle:
+            time.sleep(seconds / steps)
+        while time.monotonic() < end:
+            sum(range(1000))
+        if label:
+            pct = step * 100 // steps
+            bar = "#" * (pct // 10)
+            sys.stdout.write(f"\r{label}: {pct:3d}%|{bar:<10}| {step}/{steps} [00:01<00:01, 1.0it/s]")
+            sys.stdout.flush()
+    if label:
+        sys.stdout.write("\n")
+    return len(hold)
+
+
+def _write_outputs(root, name, samples):
+    pred_dir = f"{root}/predictions/{name}"
+    os.makedirs(pred_dir, exist_ok=True)
+    with open(ASSET_PDB, 'r') as f:
+        pdb = f.read()
+    n_tokens = 0
+    residues = set()
+    for line in pdb.splitlines():
+        if line.startswith("ATOM"):
+            residues.add((line[21], line[22:27]))
+        elif line.startswith("HETATM"):
+            n_tokens += 1
+    n_tokens += len(residues)
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+    for i in range(samples):
+        with open(f"{pred_dir}/{name}_model_{i}.pdb", 'w') as f:
+            f.write(pdb)
+        if np is not None:
+            rng = np.random.default_rng(i)
+            np.savez_compressed(f"{pred_dir}/plddt_{name}_model_{i}.npz",
+                                plddt=rng.uniform(0.5, 1.0, n_tokens).astype(np.float32))
+            np.savez_compressed(f"{pred_dir}/pae_{name}_model_{i}.npz",
+                                pae=rng.uniform(0.5, 30.0, (n_tokens, n_tokens)).astype(np.float32))
+        with open(f"{pred_dir}/confidence_{name}_model_{i}.json", 'w') as f:
+            json.dump({"confidence_score": 0.9 - 0.01 * i, "ptm": 0.85, "iptm": 0.8 - 0.01 * i}, f)
+
+
+def _write_affinity(root, name, text):
+    """Deterministic stand-in values: the same SMILES always gets the same affinity."""
+    smiles = re.findall(r"smiles:\s*['\"]?([^'\"\s,}]+)", text)
+    digest = hashlib.sha256((smiles[-1] if smiles else name).encode("utf-8")).digest()
+    value = digest[0] / 255 * 4 - 2
+    with open(f"{root}/predictions/{name}/affinity_{name}.json", 'w') as f:
+        json.dump({"affinity_pred_value": round(value, 4),
+                   "affinity_probability_binary": round(1 - (value + 2) / 4 * 0.9, 4)}, f)
+
+
+def main():
+    args = sys.argv[1:]
+    if not args or args[0] != "predict":
+        print("usage: boltz predict <input.yaml> --out_dir DIR [...]", file=sys.stderr)
+        return 2
+    yaml_path, out_dir = args[1], _arg(args, "--out_dir", ".")
+    samples = int(_arg(args, "--diffusion_samples", 1))
+    stage_s = float(os.environ.get("FAKE_BOLTZ_STAGE_SECONDS", 1.0))
+    msa_s, process_s, inference_s = (float(os.environ.get(f"FAKE_BOLTZ_{stage}_SECONDS", stage_s))
+                                     for stage in ("MSA", "PROCESS", "INFERENCE"))
+    memory_mb = int(os.environ.get("FAKE_BOLTZ_MEMORY_MB", 200))
+    exit_code = int(os.environ.get("FAKE_BOLTZ_EXIT", 0))
+    name = os.path.splitext(os.path.basename(yaml_path))[0]
+    root = f"{out_dir}/boltz_results_{name}"
+
+    print("Checking input data.", flush=True)
+    with open(yaml_path, 'r') as f:
+        text = f.read()
+    record = f"{root}/processed/records/{name}.json"
+    if os.path.exists(record):
+        # Like boltz, inputs with a processed record skip the MSA and featurization
+        print("All inputs are already processed.", flush=True)
+    elif "msa:" not in text:
+        print("Generating MSA for protein sequences", flush=True)
+        time.sleep(msa_s)  # the MSA server is remote: wall time, no local CPU
+        os.makedirs(out_dir, exist_ok=True)
+        counter = os.path.join(out_dir, ".fake_msa_requests")
+        requests_made = int(open(counter).read()) + 1 if os.path.exists(counter) else 1
+        with open(counter, 'w') as f:
+            f.write(str(requests_made))
+        if requests_made <= int(os.environ.get("FAKE_BOLTZ_MSA_FAILURES", 0)):
+            print("requests.exceptions.ConnectionError: HTTPSConnectionPool(host='api.colabfold.com', "
+                  "port=443): Max retries exceeded with url: /ticket/msa", flush=True)
+            return 1
+        os.makedirs(f"{root}/msa", exist_ok=True)
+        for i, sequence in enumerate(re.findall(r"sequence:\s*([A-Za-z]+)", text)):
+            with open(f"{root}/msa/{name}_{i}.csv", 'w') as f:
+                f.write(f"key,sequence\n-1,{sequence}\n")
+    if not os.path.exists(record):
+        print("Processing input data.", flush=True)
+        _busy(process_s, memory_mb // 4)
+        os.makedirs(os.path.dirname(record), exist_ok=True)
+        with open(record, 'w') as f:
+            json.dump({"id": name}, f)
+        with open(f"{root}/processed/manifest.json", 'w') as f:
+            json.dump({"records": [{"id": name}]}, f)
+    if exit_code:
+        print("RuntimeError: fake failure requested", flush=True)
+        return exit_code
+    max_samples = os.environ.get("FAKE_BOLTZ_MAX_SAMPLES")
+    if max_samples and samples > int(max_samples):
+        print("torch.OutOfMemoryError: CUDA out of memory. Tried to allocate 2.00 GiB", flush=True)
+        return 1
+    _busy(inference_s, memory_mb, label="Predicting DataLoader 0")
+    print("Writing outputs", flush=True)
+    _write_outputs(root, name, samples)
+    if re.search(r"\baffinity\b", text):
+        _write_affinity(root, name, text)
+    print("Number of failed examples: 0", flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""Import-time budget for the engine modules behind the notebook cells.
+
+Each module is imported in a fresh interpreter under `python -X importtime`.
+The check fails if a module's cumulative import time exceeds the budget, or if
+importing it pulls in one of the heavy dependencies that must stay lazy.
+
+    python benchmarks/import_time.py --budget-ms 50
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts")
+
+MODULES = [
+    "engine.run", "engine.analysis", "engine.viewer", "engine.batch",
+    "engine.cache", "engine.msa_store", "engine.stream", "engine.telemetry",
+]
+# Must never be imported just by importing an engine module.
+HEAVY_MODULES = [
+    "numpy", "matplotlib", "Bio", "requests", "py3Dmol", "IPython",
+    "google.colab", "googleapiclient", "torch",
+]
+
+
+def _importtime_rows(code):
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          cwd=SCRIPTS_DIR, capture_output=True, text=True, check=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # "import time:  self [us] | cumulative | imported package"
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), name.strip()))
+    return rows
+
+
+def measure(module, runs):
+    """Returns the best cumulative import time (us) of `module` and its slowest children.
+
+    Modules the interpreter imports at startup (site, encodings, ...) are
+    reported by -X importtime too, but are not caused by `module`.
+    """
+    startup = {name for _, name in _importtime_rows("pass")}
+    best, children = None, []
+    for _ in range(runs):
+        rows = [(us, name) for us, name in _importtime_rows(f"import {module}") if name not in startup]
+        total = next(us for us, name in rows if name == module)
+        if best is None or total < best:
+            best = total
+            children = sorted(row for row in rows if row[1] != module)[::-1][:5]
+    return best, children
+
+
+def heavy_imports(module):
+    code = (f"import sys, json; import {module}; "
+            f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))")
+    proc = subprocess.run([sys.executable, "-c", code], cwd=SCRIPTS_DIR, capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=50.0)
+    parser.add_argument("--runs", type=int, default=3, help="best-of-N to smooth out disk cache noise")
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    args = parser.parse_args()
+
+    failed = False
+    for module in args.modules:
+        total_us, children = measure(module, args.runs)
+        heavy = heavy_imports(module)
+        over = total_us / 1e3 > args.budget_ms
+        failed |= over or bool(heavy)
+        status = "FAIL" if over or heavy else "ok"
+        print(f"{status:4} {module:20} {total_us / 1e3:7.1f} ms"
+              + (f"  heavy imports: {', '.join(heavy)}" if heavy else ""))
+        if over:
+            for us, name in children:
+                print(f"       {us / 1e3:7.1f} ms  {name}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
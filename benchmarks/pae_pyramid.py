@@ -0,0 +1,69 @@
+"""Times and sizes PAE heatmaps drawn at full resolution and from the PAE pyramid.
+
+For single-chain synthetic PAE matrices of growing size, draws the report
+heatmap once from the full symmetrized matrix (the old path) and once from
+the pyramid level that matches the heatmap's pixel size, and reports wall
+time, peak traced memory and the size of the matrix handed to imshow.
+
+    python benchmarks/pae_pyramid.py --tokens 1000 2000 4000 8000
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "scripts"))
+from engine.analysis import chain_pae_level, render_chain_plot  # noqa: E402
+from engine.pae_pyramid import symmetrize_pae  # noqa: E402
+
+
+def synthetic_pae(n_tokens):
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    # Low error inside domains of ~150 tokens, high between them, plus noise
+    domain = np.arange(n_tokens) // 150
+    pae = np.where(domain[:, None] == domain[None, :], 4.0, 22.0).astype(np.float32)
+    pae += rng.uniform(0, 6, (n_tokens, n_tokens)).astype(np.float32)
+    return pae
+
+
+def draw(pae, pyramid):
+    n = pae.shape[0]
+    if pyramid:
+        data, extent = chain_pae_level(pae)
+    else:
+        data, extent = symmetrize_pae(pae), (-0.5, n - 0.5, -0.5, n - 0.5)
+    render_chain_plot({"kind": "pae", "chain_id": "A", "color": "#1f77b4", "cmap": "Blues_r",
+                       "data": data, "extent": extent})
+    return data.shape[0]
+
+
+def measure(pae, pyramid):
+    tracemalloc.start()
+    started = time.perf_counter()
+    drawn = draw(pae, pyramid)
+    wall = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return wall, peak / 1024 ** 2, drawn
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens", type=int, nargs="+", default=[1000, 2000, 4000])
+    args = parser.parse_args()
+
+    draw(synthetic_pae(200), True)  # warm up matplotlib
+    print(f"{'tokens':>7} {'path':>8} {'drawn':>6} {'wall s':>7} {'peak MB':>8}")
+    for n_tokens in args.tokens:
+        pae = synthetic_pae(n_tokens)
+        for pyramid in (False, True):
+            wall, peak, drawn = measure(pae, pyramid)
+            print(f"{n_tokens:>7} {'pyramid' if pyramid else 'full':>8} {drawn:>6} {wall:7.2f} {peak:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
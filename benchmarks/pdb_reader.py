@@ -0,0 +1,97 @@
+"""Times the columnar PDB reader against Bio.PDB's PDBParser.
+
+Reads assets/pdb/prot_lig.pdb and synthetic assemblies made of `--copies`
+copies of its protein chain (one chain id each, every line padded to 80
+columns as boltz writes them) and maps chains to polymer token indices, once
+through PDBParser's object hierarchy (the old chain_token_indices) and once
+through engine.structure and the token map, checking that both give the same
+result.
+
+    python benchmarks/pdb_reader.py --copies 5 20 50
+"""
+import argparse
+import os
+import string
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "scripts"))
+from engine.structure import read_structure  # noqa: E402
+from engine.token_map import build_token_map, ligand_mask  # noqa: E402
+
+PROT_LIG = os.path.join(BENCH_DIR, "..", "assets", "pdb", "prot_lig.pdb")
+CHAIN_IDS = string.ascii_uppercase + string.ascii_lowercase + string.digits
+
+
+def biopython_chain_token_indices(pdb_file):
+    from Bio.PDB import PDBParser
+
+    structure = PDBParser(QUIET=True).get_structure("protein", pdb_file)
+    chain_info = {}
+    residue_index = 0
+    for chain in structure[0]:
+        chain_info[chain.id] = {'indices': []}
+        for residue in chain:
+            if residue.id[0] == ' ':
+                chain_info[chain.id]['indices'].append(residue_index)
+                residue_index += 1
+    return chain_info
+
+
+def chain_token_indices(pdb_file):
+    import numpy as np
+
+    token_map = build_token_map(read_structure(pdb_file))
+    polymer_chains = token_map["chain"][~ligand_mask(token_map)]
+    return {chain_id: {'indices': np.flatnonzero(polymer_chains == i).tolist()}
+            for i, chain_id in enumerate(token_map["chain_ids"].tolist())}
+
+
+def write_assembly(path, copies):
+    with open(PROT_LIG, 'r') as f:
+        atoms = [line for line in f if line.startswith("ATOM")]
+    serial = 0
+    with open(path, 'w') as f:
+        for chain_id in CHAIN_IDS[:copies]:
+            for line in atoms:
+                serial += 1
+                f.write(f"{line[:6]}{serial % 100000:5d}{line[11:21]}{chain_id}{line[22:]}")
+            f.write("TER".ljust(80) + "\n")
+        f.write("END".ljust(80) + "\n")
+    return serial
+
+
+def timed(fn, *args, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--copies", type=int, nargs="+", default=[5, 20])
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="boltz_pdb_")
+    cases = [("prot_lig.pdb", PROT_LIG)]
+    for copies in args.copies:
+        path = os.path.join(tmp_dir, f"assembly_{copies}.pdb")
+        write_assembly(path, min(copies, len(CHAIN_IDS)))
+        cases.append((f"{copies} chains", path))
+
+    print(f"{'structure':>14} {'atoms':>7} {'PDBParser s':>12} {'columnar s':>11} {'read only s':>12} {'speedup':>8}")
+    for label, path in cases:
+        old, expected = timed(biopython_chain_token_indices, path)
+        new, result = timed(chain_token_indices, path)
+        read, structure = timed(read_structure, path)
+        assert result == expected, f"chain indices differ for {label}"
+        print(f"{label:>14} {len(structure['chain']):>7} {old:12.3f} {new:11.3f} {read:12.3f} {old / new:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
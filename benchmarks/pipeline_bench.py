@@ -0,0 +1,80 @@
+"""Times a batch with and without MSA/preprocessing prefetch.
+
+Runs the batch queue over `--jobs` distinct job YAMLs with benchmarks/fake_boltz.py
+linked as `boltz`, sleeping the given seconds per stage (MSA, preprocessing,
+inference), once strictly one job after the other and once per prefetch depth.
+With prefetch, a job's inference overlaps the MSA and preprocessing of the next,
+so the batch approaches jobs * max(msa + preprocessing, inference).
+
+    python benchmarks/pipeline_bench.py --jobs 6 --msa-seconds 2 --process-seconds 1 --inference-seconds 3
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "scripts"))
+from engine.batch import DONE, BatchQueue  # noqa: E402
+from engine.params import DEFAULT_RUN_PARAMS  # noqa: E402
+
+AMINO_ACIDS = "ACDEFGHIKLMNPQRSTVWY"
+
+
+def write_jobs(job_dir, n_jobs, length):
+    os.makedirs(job_dir, exist_ok=True)
+    rng = random.Random(0)
+    for i in range(n_jobs):
+        sequence = "".join(rng.choice(AMINO_ACIDS) for _ in range(length))
+        with open(os.path.join(job_dir, f"job{i:02d}.yaml"), 'w') as f:
+            f.write(f"version: 1\nsequences:\n  - protein:\n      id: A\n      sequence: {sequence}\n")
+
+
+def run_batch(job_dir, work_dir, depth):
+    os.makedirs(work_dir)
+    queue = BatchQueue(dict(DEFAULT_RUN_PARAMS), work_dir=work_dir, state_file=os.path.join(work_dir, "state.json"),
+                       log_dir=os.path.join(work_dir, "logs"))
+    queue.add_from(job_dir)
+    started = time.monotonic()
+    counts = queue.run(prefetch_depth=depth)
+    return time.monotonic() - started, counts[DONE]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=6)
+    parser.add_argument("--length", type=int, default=120, help="residues per job")
+    parser.add_argument("--msa-seconds", type=float, default=2.0)
+    parser.add_argument("--process-seconds", type=float, default=1.0)
+    parser.add_argument("--inference-seconds", type=float, default=3.0)
+    parser.add_argument("--depths", type=int, nargs="+", default=[1, 2])
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="boltz_pipeline_")
+    bin_dir = os.path.join(root, "bin")
+    os.makedirs(bin_dir)
+    os.symlink(os.path.join(BENCH_DIR, "fake_boltz.py"), os.path.join(bin_dir, "boltz"))
+    os.environ.update(PATH=f"{bin_dir}{os.pathsep}{os.environ['PATH']}", FAKE_BOLTZ_SLEEP="1", FAKE_BOLTZ_MEMORY_MB="0",
+                      FAKE_BOLTZ_MSA_SECONDS=str(args.msa_seconds),
+                      FAKE_BOLTZ_PROCESS_SECONDS=str(args.process_seconds),
+                      FAKE_BOLTZ_INFERENCE_SECONDS=str(args.inference_seconds))
+    job_dir = os.path.join(root, "jobs")
+    write_jobs(job_dir, args.jobs, args.length)
+
+    prep = args.msa_seconds + args.process_seconds
+    serial = args.jobs * (prep + args.inference_seconds)
+    bound = args.jobs * max(prep, args.inference_seconds) + min(prep, args.inference_seconds)
+    print(f"{args.jobs} jobs, stages {args.msa_seconds}s MSA + {args.process_seconds}s preprocessing + "
+          f"{args.inference_seconds}s inference; serial {serial:.1f}s, pipelined bound {bound:.1f}s")
+    print(f"{'prefetch depth':>14} {'wall s':>8} {'done':>5} {'speedup':>8}")
+    baseline = None
+    for depth in [0] + args.depths:
+        wall, done = run_batch(job_dir, os.path.join(root, f"depth{depth}"), depth)
+        baseline = baseline or wall
+        print(f"{depth:>14} {wall:8.1f} {done:5d} {baseline / wall:7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Profiles a boltz run per stage, the way the Boltz2 Engine cell does.
+
+Defaults to benchmarks/fake_boltz.py, so it runs on a CPU-only machine; pass
+`--boltz boltz` to profile a real install. Prints the per-stage summary and
+writes the timeline JSON and plot next to the outputs.
+
+    python benchmarks/resource_profile.py --stage-seconds 2 --memory-mb 300
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "scripts"))
+from engine.params import build_predict_command  # noqa: E402
+from engine.profiler import ResourceProfiler, plot_timeline  # noqa: E402
+from engine.stream import ProgressTracker, run_streaming  # noqa: E402
+
+JOB_YAML = """version: 1
+sequences:
+  - protein:
+      id: A
+      sequence: MKTAYIAKQRQISFVKSHFSRQLEERLGLIEVQAPILSRVGDGTQDNLSGAEKAVQVKVKALPDAQFEVVHSLAKWKRQTLGQHDFSAGEGLYTHMKALRPDEDRLSPLHSVYVDQWDWERVMGDGERQFSTLKSTVEAIWAGIKATEAAVSEEFGLAPFLPDQIHFVHSQELLSRYPDLDAKGRERAIAKDLGAVFLVGIGGKLSDGHRHDVRAPDYDDWUAEHDLRSEL
+  - ligand:
+      id: B
+      smiles: CC(=O)Oc1ccccc1C(=O)O
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--boltz", default=os.path.join(BENCH_DIR, "fake_boltz.py"))
+    parser.add_argument("--interval", type=float, default=0.2)
+    parser.add_argument("--stage-seconds", type=float, default=1.0)
+    parser.add_argument("--memory-mb", type=int, default=200)
+    parser.add_argument("--fail", action="store_true", help="make the fake boltz exit after preprocessing")
+    parser.add_argument("--out-dir", default=None)
+    args = parser.parse_args()
+
+    out_dir = args.out_dir or tempfile.mkdtemp(prefix="boltz_profile_")
+    os.makedirs(out_dir, exist_ok=True)
+    job_yaml = os.path.join(out_dir, "profile_job.yaml")
+    with open(job_yaml, 'w') as f:
+        f.write(JOB_YAML)
+    env = dict(os.environ, FAKE_BOLTZ_STAGE_SECONDS=str(args.stage_seconds),
+               FAKE_BOLTZ_MEMORY_MB=str(args.memory_mb), FAKE_BOLTZ_EXIT="3" if args.fail else "0")
+    cmd = build_predict_command(job_yaml, out_dir, {})
+    cmd[0:1] = [sys.executable, args.boltz] if args.boltz.endswith(".py") else [args.boltz]
+
+    progress = ProgressTracker()
+    profiler = ResourceProfiler(os.path.join(out_dir, "resources.json"), interval=args.interval,
+                                stage_fn=lambda: progress.stage)
+    result = run_streaming(cmd, os.path.join(out_dir, "boltz.log"), cwd=out_dir, env=env,
+                           on_line=progress.feed, on_start=profiler.start)
+    timeline = profiler.stop(result.returncode)
+    plot_timeline(timeline, os.path.join(out_dir, "resources.png"))
+
+    print(f"exit code {result.returncode}, {len(timeline['samples'])} samples every {args.interval}s")
+    print(f"{'stage':20} {'duration s':>10} {'cpu s':>7} {'peak RSS MB':>12} {'peak GPU MB':>12}")
+    for stage in timeline["stages"]:
+        gpu = f"{stage['peak_gpu_mb']:.0f}" if stage["peak_gpu_mb"] is not None else "-"
+        print(f"{stage['stage']:20} {stage['duration_s']:10.1f} {stage['cpu_s']:7.1f} "
+              f"{stage['peak_rss_mb']:12.0f} {gpu:>12}")
+    print(f"timeline: {os.path.join(out_dir, 'resources.json')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Times building, refreshing and querying the cross-job results index.
+
+Writes `--jobs` synthetic jobs (the bundled assets/pred_data prediction with
+`--samples` noisy samples each, as boltz lays them out) into a scratch data
+directory, then times: building the index from scratch, a rescan with no
+changes, a rescan after one job was re-run, and a filtered, sorted query,
+against re-ranking every job (what comparing jobs without the index takes).
+
+    python benchmarks/results_index.py --jobs 50 --samples 5
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "scripts"))
+from engine.artifacts import write_manifest  # noqa: E402
+from engine.predictions import predictions_dir  # noqa: E402
+from engine.ranking import rank_job  # noqa: E402
+from engine.results_index import ResultsIndex, job_names, write_run_record  # noqa: E402
+
+ASSETS = os.path.join(BENCH_DIR, "..", "assets")
+
+
+def write_job(data_dir, job_name, n_samples, rng):
+    import numpy as np
+
+    out_dir = predictions_dir(job_name, data_dir)
+    os.makedirs(out_dir, exist_ok=True)
+    with np.load(os.path.join(ASSETS, "pred_data", "plddt.npz")) as data:
+        plddt = data["plddt"]
+    with np.load(os.path.join(ASSETS, "pred_data", "pae.npz")) as data:
+        pae = data["pae"]
+    for i in range(n_samples):
+        shutil.copy(os.path.join(ASSETS, "pdb", "prot_lig.pdb"), f"{out_dir}/{job_name}_model_{i}.pdb")
+        noisy = np.clip(plddt + rng.normal(0, 0.05, plddt.shape), 0, 1).astype(np.float32)
+        np.savez_compressed(f"{out_dir}/plddt_{job_name}_model_{i}.npz", plddt=noisy)
+        np.savez_compressed(f"{out_dir}/pae_{job_name}_model_{i}.npz",
+                            pae=(pae * rng.uniform(0.8, 1.2)).astype(np.float32))
+        with open(f"{out_dir}/confidence_{job_name}_model_{i}.json", 'w') as f:
+            json.dump({"confidence_score": float(rng.uniform(0.4, 0.9)), "iptm": float(rng.uniform(0.3, 0.9))}, f)
+    params = {"recycling_steps": int(rng.choice([3, 10])), "sampling_steps": 200, "diffusion_samples": n_samples}
+    write_run_record(job_name, params, [{"duration_s": float(rng.uniform(60, 600)), "returncode": 0}],
+                     data_dir=data_dir)
+    write_manifest(job_name, data_dir)
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - started, result
+
+
+def main():
+    import numpy as np
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=50)
+    parser.add_argument("--samples", type=int, default=5)
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix="boltz_index_")
+    rng = np.random.default_rng(0)
+    for i in range(args.jobs):
+        write_job(data_dir, f"job{i:04d}", args.samples, rng)
+    index_file = os.path.join(data_dir, "results_index.sqlite")
+    print(f"{args.jobs} jobs x {args.samples} samples")
+
+    with ResultsIndex(index_file, data_dir) as index:
+        build, counts = timed(index.update)
+        assert counts["added"] == args.jobs, counts
+        rescan, counts = timed(index.update)
+        assert counts["unchanged"] == args.jobs, counts
+        write_job(data_dir, "job0000", args.samples, rng)
+        changed, counts = timed(index.update)
+        assert counts["updated"] == 1, counts
+        query, rows = timed(lambda: index.jobs("ligand_plddt > 0.5, recycling_steps = 10", "iptm", limit=20))
+    scan, _ = timed(lambda: [rank_job(name, data_dir=data_dir, write=False) for name in job_names(data_dir)])
+
+    print(f"{'build':>24} {build:8.3f} s")
+    print(f"{'rescan, no changes':>24} {rescan:8.3f} s")
+    print(f"{'rescan, one job re-run':>24} {changed:8.3f} s")
+    print(f"{'filtered query':>24} {query * 1000:8.2f} ms ({len(rows)} rows)")
+    print(f"{'re-rank every job':>24} {scan:8.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Times reading a large ligand library into a screen, and a small screen with and without the shared receptor MSA.
+
+Library: writes a synthetic SMILES file of `--library` entries, then reports
+the time and peak Python memory (tracemalloc) of reading it into the state
+file, of a resumed read with nothing new, and of the top-50 leaderboard query
+once every ligand has an affinity. Memory stays flat in the library size
+because entries are inserted `INGEST_CHUNK` at a time.
+
+Screen: runs `--ligands` ligands against one receptor with
+benchmarks/fake_boltz.py linked as `boltz`, sleeping the given seconds per
+stage. It runs once the way separate jobs would (every ligand job fetches
+the receptor MSA) and once with the receptor MSA computed a single time.
+
+    python benchmarks/screening.py --library 200000 --ligands 8 --msa-seconds 2
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "scripts"))
+from engine.batch import DONE  # noqa: E402
+from engine.params import DEFAULT_RUN_PARAMS  # noqa: E402
+from engine.screening import Screen  # noqa: E402
+
+FRAGMENTS = ["C", "CC", "c1ccccc1", "N", "O", "C(=O)O", "Cl", "F", "CN", "OC", "C#N", "S(=O)(=O)N"]
+RECEPTOR = """version: 1
+sequences:
+  - protein:
+      id: [A]
+      sequence: {sequence}
+"""
+
+
+def write_library(path, n, rng):
+    with open(path, 'w') as f:
+        f.write("smiles name\n")
+        for i in range(n):
+            f.write("".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(3, 8))) + f" cmpd{i}\n")
+
+
+def measured(fn):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak / 2 ** 20, result
+
+
+def bench_library(root, receptor, n, rng):
+    library = os.path.join(root, "library.smi")
+    write_library(library, n, rng)
+    size_mb = os.path.getsize(library) / 2 ** 20
+    with Screen("library", receptor, library, dict(DEFAULT_RUN_PARAMS), data_dir=root) as screen:
+        ingest, peak, added = measured(screen.ingest)
+        resume, _, again = measured(screen.ingest)
+        with screen.conn:
+            screen.conn.execute("UPDATE ligands SET status = ?, affinity_pred_value = (idx * 7919 % 1000) / 250.0 - 2",
+                                (DONE,))
+        query, _, rows = measured(lambda: screen.leaderboard(limit=50))
+    print(f"library: {added} ligands ({size_mb:.1f} MB) read in {ingest:.2f} s, peak Python memory {peak:.1f} MB")
+    print(f"resumed read, {again} new: {resume:.2f} s; top-{len(rows)} leaderboard query: {query * 1000:.1f} ms")
+
+
+def bench_screen(root, receptor, n, share_msa):
+    library = os.path.join(root, f"ligands_{n}.smi")
+    write_library(library, n, random.Random(1))
+    name = "shared" if share_msa else "separate"
+    with Screen(name, receptor, library, dict(DEFAULT_RUN_PARAMS), data_dir=root) as screen:
+        screen.ingest()
+        started = time.monotonic()
+        if share_msa:
+            screen.prepare_receptor()
+        counts = screen.run()
+        wall = time.monotonic() - started
+        queries = 0
+        for log in os.listdir(screen.log_dir):
+            with open(os.path.join(screen.log_dir, log), 'r') as f:
+                queries += "Generating MSA" in f.read()
+    return wall, counts[DONE], queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--library", type=int, default=200000)
+    parser.add_argument("--ligands", type=int, default=8)
+    parser.add_argument("--length", type=int, default=250, help="receptor residues")
+    parser.add_argument("--msa-seconds", type=float, default=2.0)
+    parser.add_argument("--process-seconds", type=float, default=0.3)
+    parser.add_argument("--inference-seconds", type=float, default=1.0)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="boltz_screen_")
+    rng = random.Random(0)
+    receptor = os.path.join(root, "receptor.yaml")
+    with open(receptor, 'w') as f:
+        f.write(RECEPTOR.format(sequence="".join(rng.choice("ACDEFGHIKLMNPQRSTVWY") for _ in range(args.length))))
+    bench_library(root, receptor, args.library, rng)
+
+    bin_dir = os.path.join(root, "bin")
+    os.makedirs(bin_dir)
+    os.symlink(os.path.join(BENCH_DIR, "fake_boltz.py"), os.path.join(bin_dir, "boltz"))
+    os.environ.update(PATH=f"{bin_dir}{os.pathsep}{os.environ['PATH']}", FAKE_BOLTZ_SLEEP="1", FAKE_BOLTZ_MEMORY_MB="0",
+                      FAKE_BOLTZ_MSA_SECONDS=str(args.msa_seconds),
+                      FAKE_BOLTZ_PROCESS_SECONDS=str(args.process_seconds),
+                      FAKE_BOLTZ_INFERENCE_SECONDS=str(args.inference_seconds))
+    print(f"screen: {args.ligands} ligands, stages {args.msa_seconds}s MSA + {args.process_seconds}s preprocessing + "
+          f"{args.inference_seconds}s inference")
+    print(f"{'receptor MSA':>14} {'wall s':>8} {'done':>5} {'MSA queries':>12}")
+    for share_msa in (False, True):
+        wall, done, queries = bench_screen(root, receptor, args.ligands, share_msa)
+        print(f"{'shared' if share_msa else 'per ligand':>14} {wall:8.1f} {done:5d} {queries:12d}")
+
+
+if __name__ == "__main__":
+    main()
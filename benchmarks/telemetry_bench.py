@@ -0,0 +1,99 @@
+"""Measures log_event overhead: synchronous requests.post vs. the background TelemetryClient.
+
+Runs a local stub HTTP server that answers each POST after a configurable
+delay, then times how long the caller is blocked per event and how long the
+background sender needs to drain the queue. A second pass points the client at
+a closed port to show the offline path spools instead of blocking.
+
+    python benchmarks/telemetry_bench.py --events 50 --delay 0.2
+"""
+import argparse
+import http.server
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+from engine.telemetry import TelemetryClient  # noqa: E402
+
+
+def start_stub_server(delay):
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        wbufsize = -1  # one write per response, avoids Nagle stalls on keep-alive
+        received = 0
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(delay)
+            Handler.received += 1
+            self.send_response(200)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"ok")
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, Handler
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def event(i):
+    return {"timestamp": time.strftime("%Y-%m-%d %H:%M:%S"), "session_id": "bench", "event": f"e{i}"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=50)
+    parser.add_argument("--delay", type=float, default=0.2, help="stub server latency per request (s)")
+    args = parser.parse_args()
+
+    import requests
+
+    server, handler = start_stub_server(args.delay)
+    url = f"http://127.0.0.1:{server.server_address[1]}/exec"
+
+    start = time.perf_counter()
+    for i in range(args.events):
+        requests.post(url, data=event(i))
+    sync_total = time.perf_counter() - start
+    print(f"sync requests.post : {sync_total / args.events * 1e3:8.2f} ms blocked/event, {sync_total:6.2f} s total")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        client = TelemetryClient(url, spool_file=os.path.join(tmp, "spool.jsonl"))
+        start = time.perf_counter()
+        for i in range(args.events):
+            client.log(event(i))
+        enqueue_total = time.perf_counter() - start
+        client.flush()
+        drain_total = time.perf_counter() - start
+        client.close()
+        print(f"TelemetryClient    : {enqueue_total / args.events * 1e6:8.2f} us blocked/event, "
+              f"{drain_total:6.2f} s to drain, sent={client.sent} spooled={client.spooled}")
+
+        offline = TelemetryClient(f"http://127.0.0.1:{free_port()}/exec", max_retries=2, backoff=0.05,
+                                  spool_file=os.path.join(tmp, "offline.jsonl"))
+        start = time.perf_counter()
+        for i in range(args.events):
+            offline.log(event(i))
+        enqueue_total = time.perf_counter() - start
+        offline.flush()
+        offline.close()
+        print(f"offline endpoint   : {enqueue_total / args.events * 1e6:8.2f} us blocked/event, "
+              f"sent={offline.sent} spooled={offline.spooled}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
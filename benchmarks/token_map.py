@@ -0,0 +1,73 @@
+"""Times building a token map against loading the cached one, and the per-chain pLDDT statistics.
+
+Uses synthetic assemblies of `--copies` chains (see pdb_reader.py) with
+`--samples` random pLDDT samples. Reports the time to parse the model and
+build the map, to load the cached .npz, and to compute mean pLDDT / % above
+70 / % above 90 of every chain and sample with a per-chain loop (as the
+report used to) and with token_map.chain_plddt_stats, checking that both
+agree.
+
+    python benchmarks/token_map.py --copies 5 20 50 --samples 25
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "scripts"))
+from engine.structure import read_structure  # noqa: E402
+from engine.token_map import build_token_map, chain_plddt_stats, chain_tokens  # noqa: E402
+from pdb_reader import CHAIN_IDS, timed, write_assembly  # noqa: E402
+
+
+def per_chain_loop(token_map, plddt):
+    stats = {}
+    for chain_id, idx in chain_tokens(token_map).items():
+        chain_plddt = plddt[:, idx]
+        stats[chain_id] = {
+            "mean_plddt": chain_plddt.mean(axis=1),
+            "pct_confident": (chain_plddt > 70).mean(axis=1) * 100,
+            "pct_very_high": (chain_plddt > 90).mean(axis=1) * 100,
+        }
+    return stats
+
+
+def load_cached(path):
+    import numpy as np
+
+    with np.load(path) as data:
+        return {key: data[key] for key in data.files}
+
+
+def main():
+    import numpy as np
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--copies", type=int, nargs="+", default=[5, 20, 50])
+    parser.add_argument("--samples", type=int, default=25)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="boltz_tokens_")
+    rng = np.random.default_rng(0)
+    print(f"{'chains':>7} {'tokens':>7} {'build s':>8} {'cached s':>9} {'loop ms':>8} {'reduceat ms':>12}")
+    for copies in args.copies:
+        copies = min(copies, len(CHAIN_IDS))
+        pdb_file = os.path.join(tmp_dir, f"assembly_{copies}.pdb")
+        write_assembly(pdb_file, copies)
+        build, token_map = timed(lambda: build_token_map(read_structure(pdb_file)))
+        cache_file = os.path.join(tmp_dir, f"assembly_{copies}_tokens.npz")
+        np.savez(cache_file, **token_map)
+        cached, _ = timed(load_cached, cache_file)
+        plddt = rng.uniform(30, 100, (args.samples, len(token_map["chain"]))).astype(np.float32)
+        loop, expected = timed(per_chain_loop, token_map, plddt)
+        reduced, result = timed(chain_plddt_stats, token_map, plddt)
+        for chain_id, chain_stats in expected.items():
+            for key, values in chain_stats.items():
+                assert np.allclose(result[chain_id][key], values, rtol=1e-5), f"{key} of chain {chain_id} differs"
+        print(f"{copies:>7} {len(token_map['chain']):>7} {build:8.3f} {cached:9.4f} "
+              f"{loop * 1000:8.2f} {reduced * 1000:12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Measures the run report viewer payload: inlined PDB text vs. the LOD payload.
+
+assets/pdb/prot_lig.pdb is tiled into larger complexes (one translated copy per
+chain pair). For each size this reports the bytes the viewer adds to the cell
+output, and the atoms 3Dmol has to parse before the first frame. When `node` is
+available it also times what the browser does before the first render: for
+the inlined PDB, parsing every atom record; for the LOD payload, base64 +
+gunzip of the coarse level and parsing its atoms. WebGL drawing is not
+included, and it scales with the same atom counts.
+
+    python benchmarks/viewer_payload.py --copies 1 4 16
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+from engine.viewer import build_viewer_payload  # noqa: E402
+
+ASSET_PDB = os.path.join(ROOT, "assets", "pdb", "prot_lig.pdb")
+CHAIN_IDS = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789"
+
+# Mirrors the browser path: atob + DecompressionStream ~ Buffer + gunzipSync,
+# and a minimal per-atom PDB parse standing in for 3Dmol's parser.
+NODE_SCRIPT = r"""
+const fs = require('fs'), zlib = require('zlib');
+const [inlinePath, coarsePath, runs] = process.argv.slice(2);
+function parse(text) {
+    const atoms = [];
+    for (const line of text.split('\n')) {
+        if (line.startsWith('ATOM') || line.startsWith('HETATM')) {
+            atoms.push([parseFloat(line.substr(30, 8)), parseFloat(line.substr(38, 8)),
+                        parseFloat(line.substr(46, 8)), line.substr(12, 4).trim()]);
+        }
+    }
+    return atoms.length;
+}
+function best(fn) {
+    let t = Infinity;
+    for (let i = 0; i < Number(runs); i++) {
+        const start = process.hrtime.bigint();
+        fn();
+        t = Math.min(t, Number(process.hrtime.bigint() - start) / 1e6);
+    }
+    return t;
+}
+const inline = JSON.parse(fs.readFileSync(inlinePath, 'utf8'));
+const coarse = fs.readFileSync(coarsePath, 'utf8');
+console.log(JSON.stringify({
+    inline_ms: best(() => parse(inline)),
+    lod_ms: best(() => parse(zlib.gunzipSync(Buffer.from(coarse, 'base64')).toString('utf8'))),
+}));
+"""
+
+
+def scaled_pdb(copies, spacing=60.0):
+    """Returns prot_lig.pdb tiled `copies` times along x, each copy with its own chain IDs."""
+    with open(ASSET_PDB, 'r') as f:
+        lines = f.read().splitlines()
+    atoms = [line for line in lines if line.startswith(("ATOM", "HETATM"))]
+    conects = [line for line in lines if line.startswith("CONECT")]
+    chains = sorted({line[21] for line in atoms})
+    out, serial = [], 0
+    for copy in range(copies):
+        offset = serial
+        chain_map = {c: CHAIN_IDS[(copy * len(chains) + i) % len(CHAIN_IDS)] for i, c in enumerate(chains)}
+        for line in atoms:
+            serial += 1
+            x = float(line[30:38]) + copy * spacing
+            out.append(f"{line[:6]}{serial % 100000:5d}{line[11:21]}{chain_map[line[21]]}{line[22:30]}{x:8.3f}{line[38:]}")
+        out.append("TER")
+        for line in conects:
+            fields = [int(line[i:i + 5]) for i in range(6, len(line.rstrip()), 5)]
+            out.append("CONECT" + "".join(f"{(v + offset) % 100000:5d}" for v in fields))
+    out.append("END")
+    return "\n".join(out) + "\n"
+
+
+def node_timings(inline_json, coarse_b64, runs):
+    if shutil.which("node") is None:
+        return None
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for name, data in (("inline.json", inline_json), ("coarse.b64", coarse_b64), ("bench.js", NODE_SCRIPT)):
+            paths.append(os.path.join(tmp, name))
+            with open(paths[-1], 'w') as f:
+                f.write(data)
+        proc = subprocess.run(["node", paths[2], paths[0], paths[1], str(runs)],
+                              capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--copies", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'copies':>6} {'atoms':>7} | {'inline KB':>9} {'LOD KB':>7} {'coarse KB':>9} | "
+          f"{'1st atoms':>9} {'encode ms':>9} | {'inline ms':>9} {'LOD ms':>7}")
+    for copies in args.copies:
+        pdb_data = scaled_pdb(copies)
+        inline_json = json.dumps(pdb_data)
+        start = time.perf_counter()
+        payload = build_viewer_payload(pdb_data, lod_min_atoms=0)
+        encode_ms = (time.perf_counter() - start) * 1e3
+        coarse_atoms = sum(1 for line in pdb_data.splitlines()
+                           if line.startswith("HETATM") or line.startswith("ATOM") and line[12:16].strip() in ("CA", "P"))
+        lod_bytes = len(payload["coarse"]) + len(payload["full"])
+        timings = node_timings(inline_json, payload["coarse"], args.runs)
+        node_cols = (f"{timings['inline_ms']:9.1f} {timings['lod_ms']:7.1f}" if timings
+                     else f"{'n/a':>9} {'n/a':>7}")
+        print(f"{copies:6d} {payload['atom_count']:7d} | {len(inline_json) / 1024:9.0f} {lod_bytes / 1024:7.0f} "
+              f"{len(payload['coarse']) / 1024:9.0f} | {coarse_atoms:9d} {encode_ms:9.1f} | {node_cols}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Per-job latency of a fresh `boltz` process vs. the warm worker.
+
+Runs `--jobs` small predictions with benchmarks/fake_boltz.py, which sleeps
+`--startup-seconds` at import to stand in for the torch import and checkpoint
+loading. The worker skips loading only for jobs with the same model arguments,
+which the stub does not model. They run first as one CLI process per job, then through `run_boltz()`
+against a stub worker started with `--max-jobs`. Once the worker recycles
+itself, the remaining jobs fall back to the CLI. That fallback shows up in the
+"via" column.
+
+    python benchmarks/warm_worker.py --jobs 6 --startup-seconds 3 --max-jobs 4
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "scripts"))
+from engine.params import build_predict_command  # noqa: E402
+from engine.worker import ping, run_boltz, shutdown, start_worker, wait_until_ready  # noqa: E402
+
+JOB_YAML = "version: 1\nsequences:\n  - protein:\n      id: A\n      sequence: MKTAYIAKQRQISFVKSHFSRQLEERLGLIEVQ\n"
+
+
+def run_jobs(label, n_jobs, work_dir, socket_path):
+    rows = []
+    for i in range(n_jobs):
+        job_dir = os.path.join(work_dir, f"{label}{i}")
+        os.makedirs(job_dir)
+        job_yaml = os.path.join(job_dir, "job.yaml")
+        with open(job_yaml, 'w') as f:
+            f.write(JOB_YAML)
+        via = "worker" if ping(socket_path) else "cli"
+        started = time.monotonic()
+        result = run_boltz(build_predict_command(job_yaml, job_dir, {}), os.path.join(job_dir, "boltz.log"),
+                           cwd=job_dir, socket_path=socket_path)
+        rows.append((label, i, via, time.monotonic() - started, result.returncode))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=6)
+    parser.add_argument("--startup-seconds", type=float, default=3.0)
+    parser.add_argument("--stage-seconds", type=float, default=0.5)
+    parser.add_argument("--max-jobs", type=int, default=4, help="worker recycles after this many jobs")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="boltz_worker_")
+    bin_dir = os.path.join(root, "bin")
+    os.makedirs(bin_dir)
+    stub = os.path.join(BENCH_DIR, "fake_boltz.py")
+    os.symlink(stub, os.path.join(bin_dir, "boltz"))
+    os.environ.update(PATH=f"{bin_dir}{os.pathsep}{os.environ['PATH']}", FAKE_BOLTZ_SLEEP="1",
+                      FAKE_BOLTZ_MEMORY_MB="0", FAKE_BOLTZ_STAGE_SECONDS=str(args.stage_seconds),
+                      FAKE_BOLTZ_STARTUP_SECONDS=str(args.startup_seconds))
+    socket_path = os.path.join(root, "worker.sock")
+
+    rows = run_jobs("cli", args.jobs, root, socket_path)
+    started = time.monotonic()
+    start_worker(socket_path, max_jobs=args.max_jobs, stub=stub, log_file=os.path.join(root, "worker.log"))
+    status = wait_until_ready(socket_path, timeout=60)
+    print(f"worker {status and status['pid']} ready after {time.monotonic() - started:.1f}s")
+    rows += run_jobs("warm", args.jobs, root, socket_path)
+    shutdown(socket_path)
+
+    print(f"{'run':>5} {'job':>4} {'via':>7} {'seconds':>8} {'exit':>5}")
+    for label, i, via, seconds, returncode in rows:
+        print(f"{label:>5} {i:4d} {via:>7} {seconds:8.2f} {returncode:5d}")
+    for label in ("cli", "warm"):
+        times = [r[3] for r in rows if r[0] == label]
+        print(f"{label}: {sum(times):.1f}s total, {sum(times) / len(times):.2f}s per job")
+    print(f"worker log: {os.path.join(root, 'worker.log')}")
+
+
+if __name__ == "__main__":
+    main()
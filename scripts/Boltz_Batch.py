@@ -0,0 +1,12 @@
+# @title Boltz2 Batch Engine
+import os
+import sys
+
+# Runs every job YAML in `batch_input` (a directory or a manifest file), shortest
+# first, with the shared settings of run_params.txt; a rerun resumes the queue.
+ENGINE_DIR = os.path.dirname(os.path.abspath(__file__))
+if ENGINE_DIR not in sys.path:
+    sys.path.insert(0, ENGINE_DIR)
+from engine.batch import main
+
+batch = main()
@@ -0,0 +1,13 @@
+# @title Boltz2 Screening Engine
+import os
+import sys
+
+# Screens the receptor in params.yaml (or `screen_receptor`) against the ligand
+# library in `screen_library` (SMILES, CSV or SDF), one affinity job per ligand.
+# Re-running the cell resumes an interrupted screen.
+ENGINE_DIR = os.path.dirname(os.path.abspath(__file__))
+if ENGINE_DIR not in sys.path:
+    sys.path.insert(0, ENGINE_DIR)
+from engine.screening import main
+
+leaderboard_file = main()
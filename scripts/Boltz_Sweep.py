@@ -0,0 +1,12 @@
+# @title Boltz2 Sweep Engine
+import os
+import sys
+
+# Runs the job in run_params.txt once per combination of `sweep_grid`, sharing
+# the MSA and preprocessing of the first variant with all the others.
+ENGINE_DIR = os.path.dirname(os.path.abspath(__file__))
+if ENGINE_DIR not in sys.path:
+    sys.path.insert(0, ENGINE_DIR)
+from engine.sweep import main
+
+sweep_dir = main()
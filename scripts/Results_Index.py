@@ -0,0 +1,14 @@
+# @title Results Index
+import os
+import sys
+
+# Indexes every job under /content/boltz_data, sweep variants and screened
+# ligands included (only new or changed ones are read again), and shows them
+# in one table; `index_filter`, `index_sort` and
+# `index_limit` in run_params.txt narrow and order it.
+ENGINE_DIR = os.path.dirname(os.path.abspath(__file__))
+if ENGINE_DIR not in sys.path:
+    sys.path.insert(0, ENGINE_DIR)
+from engine.results_index import main
+
+index_file = main()
@@ -0,0 +1,10 @@
+# @title Copy Results to Drive
+import os
+import sys
+
+ENGINE_DIR = os.path.dirname(os.path.abspath(__file__))
+if ENGINE_DIR not in sys.path:
+    sys.path.insert(0, ENGINE_DIR)
+from engine.export import copy_to_drive
+
+job_name = copy_to_drive()
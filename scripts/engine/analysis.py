@@ -0,0 +1,649 @@
+"""Confidence and affinity report behind the Analyse Results cell.
+
+matplotlib and NumPy are imported inside the functions that use them,
+so importing this module costs nothing until a report is actually rendered.
+"""
+from __future__ import annotations
+
+import io
+import json
+import os
+from typing import TYPE_CHECKING
+
+from .artifacts import add_artifacts, artifact_path, job_dir
+from .contacts import DEFAULT_CONTACT_CUTOFF, DEFAULT_CONTACT_MAX_PAE, chain_pair_contacts, load_contacts
+from .interface import interface_matrices, interface_pairs
+from .pae_pyramid import build_pae_pyramid, level_for_pixels, pae_region
+from .params import DATA_DIR, RUN_PARAMS_FILE, load_run_params
+from .predictions import load_confidence_stack, model_file, predictions_dir, token_block
+from .render_cache import DEFAULT_RENDER_CACHE_MAX_MB, RenderCache, render_key, write_png
+from .token_map import chain_plddt_stats, chain_tokens, ligand_mask, load_token_map, token_chains
+
+if TYPE_CHECKING:
+    import matplotlib.pyplot as plt
+
+# ==============================================================================
+# SECTION 1: AFFINITY PLOTTING CODE (from affinity.py)
+# ==============================================================================
+
+# --- Design Palette ---
+FIG_BG_COLOR = "#ffffff"
+CARD_BG_COLOR = "#ffffff"
+SUBTLE_TEXT_COLOR = "#2f2f2f"
+DIVIDER_COLOR = "#F3F3F3"
+MIN_COLOR = "#79CBF8"
+MAX_COLOR = "#0677DB"
+TITLE_COLOR = "#0A9CEB"
+
+# --- Helper Functions for Affinity Plotting ---
+def get_color_shade(min_hex: str, max_hex: str, value: float) -> str:
+    """Interpolates between two hex colors based on a value between 0 and 1."""
+    import matplotlib.colors as mcolors
+    min_rgb = mcolors.to_rgb(min_hex)
+    max_rgb = mcolors.to_rgb(max_hex)
+    new_rgb = [(1 - value) * min_rgb[i] + value * max_rgb[i] for i in range(3)]
+    return mcolors.to_hex(new_rgb)
+
+def get_prob_assessment(prob: float) -> str:
+    """Return a qualitative confidence assessment based on probability."""
+    if prob > 0.75: return "High Confidence Binder"
+    if prob > 0.4: return "Moderate Confidence Binder"
+    return "Low Confidence Binder"
+
+def get_affinity_assessment(aff_val: float) -> str:
+    """Return a qualitative binding strength based on the affinity value."""
+    if aff_val < -1: return "Strong Binder"
+    if aff_val < 1: return "Moderate Binder"
+    return "Weak Binder / Decoy"
+
+# --- Core Function to Draw a Single Affinity Card (MODIFIED FOR BETTER SPACING) ---
+def create_analysis_card(ax: plt.Axes, title: str, prob: float, aff_val: float, color: str):
+    """Draws a single, self-contained analysis card with a top-down layout."""
+    import numpy as np
+    from matplotlib.patches import FancyBboxPatch
+    ax.axis("off")
+    ax.set_aspect('equal', adjustable='box')
+    ax.add_patch(FancyBboxPatch((0.02, 0.02), 0.96, 0.96, facecolor=CARD_BG_COLOR,
+                                edgecolor=MAX_COLOR, boxstyle="round,pad=0,rounding_size=0.04",
+                                transform=ax.transAxes, linewidth=1))
+    
+    # Main Card Title
+    ax.text(0.5, 0.95, title, ha="center", va="center", fontsize=15, fontweight="bold", transform=ax.transAxes)
+    
+    # Horizontal Divider
+    ax.plot([0.05, 0.95], [0.5, 0.5], color=DIVIDER_COLOR, linestyle="--", linewidth=1.5, transform=ax.transAxes)
+
+    # Top Section: Hit Discovery
+    ax.text(0.5, 0.89, "Hit Discovery", ha="center", va="center", fontsize=14, color=TITLE_COLOR, transform=ax.transAxes)
+    donut_center, donut_radius, plot_linewidth = (0.5, 0.7), 0.12, 14
+    theta_track = np.linspace(0, 2 * np.pi, 200)
+    ax.plot(donut_center[0] + donut_radius * np.cos(theta_track), donut_center[1] + donut_radius * np.sin(theta_track),
+            color=DIVIDER_COLOR, linewidth=plot_linewidth, transform=ax.transAxes)
+    if prob > 0:
+        start_angle, end_angle = 90, 90 - (prob * 360)
+        theta_value = np.linspace(np.deg2rad(end_angle), np.deg2rad(start_angle), 200)
+        ax.plot(donut_center[0] + donut_radius * np.cos(theta_value), donut_center[1] + donut_radius * np.sin(theta_value),
+                color=color, linewidth=plot_linewidth, solid_capstyle='round', transform=ax.transAxes)
+    ax.text(donut_center[0], donut_center[1], f"{prob:.1%}", ha="center", va="center", fontsize=20, fontweight="bold", transform=ax.transAxes)
+    ax.text(0.5, 0.53, get_prob_assessment(prob), ha="center", va="center", fontsize=12, color=SUBTLE_TEXT_COLOR, style="italic", transform=ax.transAxes)
+
+    # Bottom Section: Lead Optimization
+    ax.text(0.5, 0.44, "Lead Optimization", ha="center", va="center", fontsize=14, color=TITLE_COLOR, transform=ax.transAxes)
+    ic50 = 10 ** aff_val
+    delta_g = (6 - aff_val) * 1.364
+    ax.text(0.5, 0.35, f"log₁₀(IC₅₀): {aff_val:.3f}", ha="center", va="center", fontsize=14, transform=ax.transAxes)
+    ax.text(0.5, 0.28, f"Predicted IC₅₀: {ic50:.2f} µM", ha="center", va="center", fontsize=14, fontweight="bold", transform=ax.transAxes)
+    ax.text(0.5, 0.21, f"ΔG: {delta_g:.2f} kcal/mol", ha="center", va="center", fontsize=14, transform=ax.transAxes)
+
+    meter_y_pos, meter_range = 0.13, [-3, 2]
+    norm_val = (aff_val - meter_range[0]) / (meter_range[1] - meter_range[0])
+    bar_fill = max(0, min(1, norm_val))
+    # Full bar width
+    bar_width = 0.4  
+    bar_height = 0.012  
+
+    # Center the bar horizontally
+    bar_x = 0.5 - bar_width / 2 
+    # Background bar (gray, rounded)
+    ax.add_patch(FancyBboxPatch((bar_x, meter_y_pos), bar_width, bar_height,
+                                boxstyle="round,pad=0.01,rounding_size=0.020",
+                                linewidth=0, facecolor=DIVIDER_COLOR,
+                                transform=ax.transAxes))
+
+    # Filled portion (colored, rounded)
+    ax.add_patch(FancyBboxPatch((bar_x, meter_y_pos), bar_width * bar_fill, bar_height,
+                                boxstyle="round,pad=0.01,rounding_size=0.020",
+                                linewidth=0, facecolor=color,
+                                transform=ax.transAxes))
+
+    ax.text(0.28, meter_y_pos + 0.01, "Weak", ha="right", va="center", fontsize=12, color=SUBTLE_TEXT_COLOR, transform=ax.transAxes)
+    ax.text(0.72, meter_y_pos + 0.01, "Strong", ha="left", va="center", fontsize=12, color=SUBTLE_TEXT_COLOR, transform=ax.transAxes)
+    ax.text(0.5, 0.06, get_affinity_assessment(aff_val), ha="center", va="center", fontsize=12, color=SUBTLE_TEXT_COLOR, style="italic", transform=ax.transAxes)
+
+
+# --- Main Function to Generate and Display Affinity Plot (MODIFIED FOR TALLER FIGURE) ---
+AFFINITY_PLOT_STYLE = {"figsize": (22, 10), "dpi": 300, "facecolor": FIG_BG_COLOR}
+
+
+def render_affinity_plot(card_data):
+    """Draws the three affinity cards side by side; returns the PNG bytes."""
+    from matplotlib.figure import Figure
+
+    # Increased the figure height from 9 to 10 for better vertical spacing
+    fig = Figure(figsize=AFFINITY_PLOT_STYLE["figsize"], constrained_layout=True)
+    fig.set_facecolor(AFFINITY_PLOT_STYLE["facecolor"])
+    axes = fig.subplots(1, 3)
+    for ax, data in zip(axes, card_data):
+        dynamic_color = get_color_shade(MIN_COLOR, MAX_COLOR, data["prob"])
+        create_analysis_card(ax, data["title"], data["prob"], data["aff_val"], dynamic_color)
+    return _png_bytes(fig, AFFINITY_PLOT_STYLE["dpi"], facecolor=AFFINITY_PLOT_STYLE["facecolor"])
+
+
+def generate_affinity_plot_html(job_name: str, plots_dir: str, cache: RenderCache | None = None) -> str:
+    """
+    Checks for 'affinity.json', generates the plot if it exists (or takes it from
+    the render cache), saves it to a file, and returns it as an HTML <img> tag
+    encoded in base64.
+    """
+    affinity_json_path = artifact_path(job_name, "affinity")
+    if affinity_json_path is None:
+        return ""
+
+    try:
+        with open(affinity_json_path, 'r') as f:
+            json_data = json.load(f)
+
+        card_data = [
+            {"title": "Ensemble Model Analysis", "prob": json_data["affinity_probability_binary"], "aff_val": json_data["affinity_pred_value"]},
+            {"title": "Model 1 Analysis", "prob": json_data["affinity_probability_binary1"], "aff_val": json_data["affinity_pred_value1"]},
+            {"title": "Model 2 Analysis", "prob": json_data["affinity_probability_binary2"], "aff_val": json_data["affinity_pred_value2"]},
+        ]
+        cache = cache or RenderCache(enabled=False)
+        key = render_key("affinity", cards=card_data, style=AFFINITY_PLOT_STYLE)
+        affinity_b64 = cache.png(key, lambda: render_affinity_plot(card_data),
+                                 os.path.join(plots_dir, f"{job_name}_affinity.png"))
+
+        # Return the plot with its own header and description as an HTML string
+        return f"""
+        <div class="dashboard-header">
+            <h2>Affinity Result: {job_name}</h2>
+            <p>
+                Binding affinity predictions from the ensemble model and its individual components. The report includes Hit Discovery Potential (probability of binding) and Lead Optimization metrics (predicted IC₅₀ and ΔG). Lower IC₅₀ and more negative ΔG values suggest stronger binding.
+            </p>
+        </div>
+        <div class="affinity-container" style="margin-bottom: 25px;">
+             <img src="data:image/png;base64,{affinity_b64}" alt="Affinity Analysis Plot" style="width:100%; border-radius: 10px; box-shadow: 0 4px 12px rgba(0,0,0,0.05);">
+        </div>
+        """
+    except (json.JSONDecodeError, KeyError) as e:
+        print(f"Warning: Could not process '{affinity_json_path}'. Error: {e}. Skipping affinity plot.")
+        return ""
+
+# ==============================================================================
+# SECTION 2: MODEL CONFIDENCE PLOTTING CODE (from MYCODE)
+# ==============================================================================
+
+CHAIN_COLORS = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf']
+COLOR_TO_CMAP = {'#1f77b4': 'Blues_r', '#ff7f0e': 'Oranges_r', '#2ca02c': 'Greens_r', '#d62728': 'Reds_r',
+                 '#9467bd': 'Purples_r', '#8c564b': 'YlOrBr_r', '#e377c2': 'RdPu_r', '#7f7f7f': 'Greys_r',
+                 '#bcbd22': 'summer_r', '#17becf': 'GnBu_r'}
+
+
+CHAIN_PLOT_STYLE = {
+    "plddt": {"figsize": (10, 4), "dpi": 150, "axis_color": '#777'},
+    "pae": {"figsize": (6, 6), "dpi": 150},
+}
+DEFAULT_PAE_REDUCE = "mean"
+
+
+def _png_bytes(fig, dpi, **savefig_kwargs):
+    """Rasterises a figure once and returns the PNG bytes."""
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=dpi, bbox_inches='tight', **savefig_kwargs)
+    return buf.getvalue()
+
+
+def render_chain_plot(task):
+    """Draws one chain figure (`task["kind"]` is "plddt" or "pae"); returns the PNG bytes.
+
+    `task` holds only the chain's own slice (`data`), so it is cheap to send
+    to a worker process. Figures are drawn without pyplot, so this runs on
+    the Agg canvas in any process.
+    """
+    import numpy as np
+    from matplotlib.figure import Figure
+
+    chain_id, chain_color, data = task["chain_id"], task["color"], task["data"]
+    label = task.get("label", f"Chain {chain_id}")
+    style = CHAIN_PLOT_STYLE[task["kind"]]
+    fig = Figure(figsize=style["figsize"])
+    ax = fig.add_subplot()
+
+    if task["kind"] == "plddt":
+        for spine in ['top', 'bottom', 'left', 'right']:
+            ax.spines[spine].set_color(style["axis_color"])
+        ax.plot(data, color=chain_color, linewidth=1)
+        ax.fill_between(np.arange(len(data)), data, color=chain_color, alpha=0.2)
+        ax.set_title(f"pLDDT for {label}", fontsize=14, fontweight='bold')
+        ax.set_xlabel(f"Residue Index ({label})", fontsize=12)
+        ax.set_ylabel("pLDDT Score", fontsize=12)
+        ax.set_xlim(0, len(data) - 1)
+        ax.set_ylim(0, 100)
+        ax.grid(False)
+    else:
+        # `data` is an already symmetrized pyramid level; `extent` keeps the axes in residues
+        im = ax.imshow(data, cmap=task["cmap"], origin='lower', interpolation='none', extent=task["extent"])
+        ax.set_title(f"PAE for {label}", fontsize=14, fontweight='bold')
+        ax.set_xlabel(f"Residue ({label})", fontsize=12)
+        ax.set_ylabel(f"Residue ({label})", fontsize=12)
+        fig.colorbar(im, ax=ax, fraction=0.046, pad=0.04).set_label("Expected Position Error (Å)", fontsize=12)
+    return _png_bytes(fig, style["dpi"])
+
+
+def chain_plot_key(task):
+    """Render-cache key of a chain figure: its data slice, chain id, colors and style."""
+    return render_key(task["kind"], [task["data"]], chain_id=task["chain_id"], label=task.get("label"),
+                      color=task["color"], cmap=task["cmap"], extent=task.get("extent"),
+                      style=CHAIN_PLOT_STYLE[task["kind"]])
+
+
+def _pae_pixels():
+    style = CHAIN_PLOT_STYLE["pae"]
+    return int(style["figsize"][0] * style["dpi"])
+
+
+def chain_pae_level(chain_pae, how=DEFAULT_PAE_REDUCE, pixels=None):
+    """Returns the PAE pyramid level of a chain block that matches the heatmap's pixel size, and its extent."""
+    pixels = pixels or _pae_pixels()
+    n = chain_pae.shape[0]
+    levels = build_pae_pyramid(chain_pae, how, min_size=pixels, keep_full=False)
+    return level_for_pixels(levels, pixels, n)["pae"], (-0.5, n - 0.5, -0.5, n - 0.5)
+
+
+def export_pae_zoom(job_name, model_id, start, stop, filename, how=DEFAULT_PAE_REDUCE, pixels=None):
+    """Saves the PAE heatmap of tokens [start, stop) of a model; small regions are drawn at full resolution."""
+    pixels = pixels or _pae_pixels()
+    pae = load_confidence_stack(job_name, [model_id])["pae"][0]
+    levels = build_pae_pyramid(pae, how, min_size=pixels)
+    region, extent = pae_region(levels, start, stop, pixels, pae.shape[0])
+    task = {"kind": "pae", "chain_id": None, "label": f"tokens {start}-{stop - 1}", "color": CHAIN_COLORS[0],
+            "cmap": COLOR_TO_CMAP[CHAIN_COLORS[0]], "data": region, "extent": extent}
+    write_png(filename, render_chain_plot(task))
+    return filename
+
+
+def _init_plot_worker():
+    import matplotlib
+    matplotlib.use("Agg")
+
+
+def render_all_chain_plots(tasks, processes=None):
+    """Renders chain figures in a process pool, in task order; serial for one task or worker.
+
+    `processes` defaults to one per CPU (at most one per chain). Falls back to
+    rendering in this process if the pool cannot be started.
+    """
+    workers = min(len(tasks), processes or os.cpu_count() or 1)
+    if workers > 1:
+        import concurrent.futures
+        import multiprocessing
+        from concurrent.futures.process import BrokenProcessPool
+
+        # forkserver avoids forking the (threaded) notebook kernel itself
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        try:
+            with concurrent.futures.ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context(method),
+                                                        initializer=_init_plot_worker) as pool:
+                return list(pool.map(render_chain_plot, tasks))
+        except (OSError, BrokenProcessPool) as e:
+            print(f"Warning: Parallel plotting failed ({e}). Rendering serially.")
+    return [render_chain_plot(task) for task in tasks]
+
+
+def create_dashboard_data(job_name, model_id=0, plots_dir='', stack=None, token_map=None, processes=None,
+                          cache=None, pae_reduce=DEFAULT_PAE_REDUCE):
+    """Generates pLDDT/PAE plots, saves them, and provides summary statistics.
+
+    One card per chain, ligands included. `stack` and `token_map` can be
+    passed in when the confidence arrays of all samples and the model's token
+    map (see token_map.py) were already loaded. Figures found in the
+    render `cache` are not drawn again; the rest are drawn in parallel (see
+    `render_all_chain_plots`), and `processes=1` draws them serially. Large
+    PAE blocks are drawn from a block-reduced level (`pae_reduce` is "mean"
+    or "min") with about one block per output pixel.
+    """
+    pdb_file = model_file(job_name, model_id)
+    if not os.path.exists(pdb_file):
+        raise FileNotFoundError(f"File not found: {pdb_file}")
+    if stack is None or model_id not in stack["model_ids"]:
+        stack = load_confidence_stack(job_name, [model_id])
+    sample = stack["model_ids"].index(model_id)
+    plddt_data = stack["plddt"][sample]
+    pae_data = stack["pae"][sample]
+    if token_map is None:
+        token_map = load_token_map(job_name, model_id)
+    if len(token_map["chain"]) != len(plddt_data):
+        print(f"Warning: Model {model_id} has {len(token_map['chain'])} tokens but its confidence arrays "
+              f"have {len(plddt_data)}. Skipping the per-chain plots.")
+        return []
+    cache = cache or RenderCache(enabled=False)
+
+    stats = chain_plddt_stats(token_map, plddt_data)
+    tasks = []
+    for i, (chain_id, idx) in enumerate(chain_tokens(token_map).items()):
+        chain_color = CHAIN_COLORS[i % len(CHAIN_COLORS)]
+        label = f"Ligand {chain_id}" if stats[chain_id]["mol_type"] == "ligand" else f"Chain {chain_id}"
+        chain_pae, extent = chain_pae_level(token_block(pae_data, idx), pae_reduce)
+        for kind, data in (("plddt", plddt_data[idx]), ("pae", chain_pae)):
+            tasks.append({
+                "kind": kind, "chain_id": chain_id, "label": label, "color": chain_color,
+                "cmap": COLOR_TO_CMAP.get(chain_color, 'Blues_r'), "data": data,
+                "extent": extent if kind == "pae" else None,
+                "file": os.path.join(plots_dir, f"{job_name}_model_{model_id}_chain_{chain_id}_{kind}.png"),
+            })
+
+    keys = [chain_plot_key(task) for task in tasks]
+    pngs = [cache.get(key) for key in keys]
+    misses = [i for i, png in enumerate(pngs) if png is None]
+    for i, png in zip(misses, render_all_chain_plots([tasks[i] for i in misses], processes)):
+        cache.put(keys[i], png)
+        pngs[i] = png
+    plots = [write_png(task["file"], png) for task, png in zip(tasks, pngs)]
+
+    all_chain_data = []
+    for task, plddt_b64, pae_b64 in zip(tasks[0::2], plots[0::2], plots[1::2]):
+        chain_stats = stats[task["chain_id"]]
+        all_chain_data.append({
+            "chain_id": task["chain_id"], "label": task["label"], "plddt_plot": plddt_b64, "pae_plot": pae_b64,
+            "mean_plddt": float(chain_stats["mean_plddt"]),
+            "pct_confident": float(chain_stats["pct_confident"]),
+            "pct_very_high": float(chain_stats["pct_very_high"]),
+        })
+    return all_chain_data
+
+
+def create_sample_summary_html(job_name, stack, token_map, ranking):
+    """Builds a table of every diffusion sample in ranked order; empty for single-sample runs.
+
+    The mean PAE comes from the ranking metrics, so no sample's PAE matrix is read again.
+    """
+    from .ranking import PAE_MAX
+
+    if len(stack["model_ids"]) < 2:
+        return ""
+    stats = {}
+    if len(token_map["chain"]) == stack["plddt"].shape[1]:
+        stats = chain_plddt_stats(token_map, stack["plddt"])
+    summary_keys = [key for key in ("confidence_score", "ptm", "iptm")
+                    if any(key in summary for summary in stack["summaries"])]
+    overall_plddt = stack["plddt"].mean(axis=1)
+
+    header = "<th>Score</th>" + "".join(f"<th>{key}</th>" for key in summary_keys)
+    header += "<th>Mean pLDDT</th><th>Mean PAE (Å)</th>"
+    header += "".join(f"<th>{'Ligand' if chain_stats['mol_type'] == 'ligand' else 'Chain'} {chain_id} pLDDT</th>"
+                      for chain_id, chain_stats in stats.items())
+    rows = ""
+    for entry in ranking["models"]:
+        i = stack["model_ids"].index(entry["model_id"])
+        summary = stack["summaries"][i]
+        cells = f"<td>{entry['score']:.3f}</td>" if entry["score"] is not None else "<td>-</td>"
+        cells += "".join(f"<td>{summary[key]:.3f}</td>" if key in summary else "<td>-</td>" for key in summary_keys)
+        mean_pae = f"{(1 - entry['metrics']['pae']) * PAE_MAX:.2f}" if "pae" in entry["metrics"] else "-"
+        cells += f"<td>{overall_plddt[i]:.2f}</td><td>{mean_pae}</td>"
+        cells += "".join(f"<td>{chain_stats['mean_plddt'][i]:.2f}</td>" for chain_stats in stats.values())
+        rows += f"<tr><td>#{entry['rank']}</td><td>Model {entry['model_id']}</td>{cells}</tr>"
+    weights = ", ".join(f"{key} {weight:g}" for key, weight in ranking["weights"].items())
+    return sample_table_template.format(job_name=job_name, n_samples=len(stack["model_ids"]),
+                                        weights=weights, header=header, rows=rows)
+
+
+INTERFACE_PLOT_STYLE = {"panel_size": 5.5, "dpi": 150, "annotate_max_chains": 12, "top_pairs": 10}
+# Interface residues listed per chain before the rest are counted
+MAX_LISTED_RESIDUES = 15
+
+
+def render_interface_plot(matrices):
+    """Draws the chain x chain mean PAE and ipTM-style matrices side by side; returns the PNG bytes."""
+    from matplotlib.figure import Figure
+
+    style = INTERFACE_PLOT_STYLE
+    labels = [f"{chain_id} (lig)" if is_ligand else chain_id
+              for chain_id, is_ligand in zip(matrices["chains"], matrices["ligand"])]
+    n = len(labels)
+    fig = Figure(figsize=(2 * style["panel_size"] + 1, style["panel_size"]), constrained_layout=True)
+    axes = fig.subplots(1, 2)
+    panels = [("mean_pae", "Mean inter-chain PAE (Å)", "Greens_r", 0, 30, "{:.1f}"),
+              ("iptm", "ipTM-style interface score", "Blues", 0, 1, "{:.2f}")]
+    for ax, (key, title, cmap, vmin, vmax, fmt) in zip(axes, panels):
+        values = matrices[key]
+        im = ax.imshow(values, cmap=cmap, vmin=vmin, vmax=vmax, interpolation='none')
+        ax.set_title(title, fontsize=13, fontweight='bold')
+        ax.set_xticks(range(n), labels, rotation=90 if n > 12 else 0, fontsize=9)
+        ax.set_yticks(range(n), labels, fontsize=9)
+        ax.set_xlabel("Scored chain", fontsize=11)
+        ax.set_ylabel("Aligned chain", fontsize=11)
+        if n <= style["annotate_max_chains"]:
+            for i in range(n):
+                for j in range(n):
+                    light = (values[i, j] - vmin) / (vmax - vmin) > 0.5
+                    if key == "mean_pae":
+                        light = not light
+                    ax.text(j, i, fmt.format(values[i, j]), ha="center", va="center", fontsize=8,
+                            color="#ffffff" if light else SUBTLE_TEXT_COLOR)
+        fig.colorbar(im, ax=ax, fraction=0.046, pad=0.04)
+    return _png_bytes(fig, style["dpi"])
+
+
+def _residue_list(chain_id, residues):
+    listed = ", ".join(residues[:MAX_LISTED_RESIDUES])
+    more = f" +{len(residues) - MAX_LISTED_RESIDUES} more" if len(residues) > MAX_LISTED_RESIDUES else ""
+    return f"<strong>{chain_id}:</strong> {listed}{more}"
+
+
+def create_interface_html(job_name, model_id, pae, plots_dir='', cache=None, token_map=None,
+                          contact_cutoff=DEFAULT_CONTACT_CUTOFF, contact_max_pae=DEFAULT_CONTACT_MAX_PAE):
+    """Builds the chain-pair interface section for one model; empty for single-chain models.
+
+    Chains come from the model's token map (ligands included as their own
+    chain); the section is skipped if the map does not match the PAE. Each
+    pair lists its residue contacts (see contacts.py) and the residues of
+    those whose PAE is at most `contact_max_pae`.
+    """
+    if token_map is None:
+        token_map = load_token_map(job_name, model_id)
+    chains, ligand = token_chains(token_map), ligand_mask(token_map)
+    if len(chains) != pae.shape[0] or len(set(chains.tolist())) < 2:
+        return ""
+    matrices = interface_matrices(pae, chains, ligand)
+    cache = cache or RenderCache(enabled=False)
+    key = render_key("interface", [matrices["mean_pae"], matrices["iptm"]], chains=matrices["chains"],
+                     ligand=matrices["ligand"].tolist(), style=INTERFACE_PLOT_STYLE)
+    plot_b64 = cache.png(key, lambda: render_interface_plot(matrices),
+                         os.path.join(plots_dir, f"{job_name}_model_{model_id}_interfaces.png"))
+    contacts = chain_pair_contacts(load_contacts(job_name, model_id, contact_cutoff, token_map),
+                                   token_map, pae, contact_max_pae)
+    rows = ""
+    for pair in interface_pairs(matrices)[:INTERFACE_PLOT_STYLE["top_pairs"]]:
+        found = contacts.get((pair["chain_a"], pair["chain_b"]), {"contacts": 0, "confident": 0})
+        residues = ""
+        if found["confident"]:
+            residues = (_residue_list(pair["chain_a"], found["residues_a"]) + "<br>"
+                        + _residue_list(pair["chain_b"], found["residues_b"]))
+        rows += (f"<tr><td>{pair['chain_a']}</td><td>{pair['chain_b']}</td><td>{pair['iptm']:.3f}</td>"
+                 f"<td>{pair['mean_pae']:.2f}</td><td>{pair['min_pae']:.2f}</td>"
+                 f"<td>{found['contacts']}</td><td>{found['confident']}</td>"
+                 f"<td style=\"text-align: left;\">{residues}</td></tr>")
+    return interface_template.format(job_name=job_name, model_id=model_id, n_chains=len(matrices["chains"]),
+                                     plot=plot_b64, rows=rows, cutoff=contact_cutoff, max_pae=contact_max_pae)
+
+# ==============================================================================
+# SECTION 3: HTML TEMPLATES & MAIN EXECUTION
+# ==============================================================================
+
+# --- HTML Templates ---
+main_html_template = """
+<style>
+    @import url('https://fonts.googleapis.com/css2?family=Roboto:wght@400;500;700&display=swap');
+    .dashboard-container {{ font-family: 'Roboto', sans-serif; background-color: #f8f9fa; border: 1px solid #dee2e6; border-radius: 12px; padding: 25px; margin: 10px; }}
+    .dashboard-header h2 {{ color: #145ABE; border-bottom: 2px solid #185FE2; padding-bottom: 10px; font-size: 1.8em; margin-top: 0; }}
+    .dashboard-header p {{ margin-bottom: 25px; color: #6c757d; line-height: 1.6; }}
+    .chain-card {{ background-color: #ffffff; border: 1px solid #e9ecef; border-radius: 10px; margin-bottom: 25px; box-shadow: 0 4px 12px rgba(0,0,0,0.05); overflow: hidden; }}
+    .card-header {{ padding: 15px 20px; background-color: #f8f9fa; display: flex; justify-content: space-between; align-items: center; border-bottom: 1px solid #e9ecef; }}
+    .card-header h3 {{ margin: 0; color: #343a40; font-size: 1.4em; }}
+    .stats-container {{ display: flex; gap: 20px; }}
+    .stat-item {{ color: #495057; font-size: 0.95em; }}
+    .stat-item strong {{ font-weight: 500; }}
+    .stat-item span {{ font-weight: 700; padding: 4px 8px; border-radius: 5px; color: #fff; }}
+    .plddt-high {{ background-color: #28a745; }}
+    .plddt-medium {{ background-color: #fd7e14; }}
+    .plddt-low {{ background-color: #dc3545; }}
+    .plot-grid {{ display: grid; grid-template-columns: 65% 35%; gap: 0; padding: 20px; }}
+    .plot-item {{ text-align: center; }}
+    .plot-item img {{ max-width: 100%; height: auto; border-radius: 5px; }}
+    .sample-table {{ width: 100%; border-collapse: collapse; margin-bottom: 25px; background-color: #ffffff; font-size: 0.95em; }}
+    .sample-table th, .sample-table td {{ border: 1px solid #e9ecef; padding: 8px 12px; text-align: center; }}
+    .sample-table th {{ background-color: #f1f3f5; color: #343a40; font-weight: 500; }}
+</style>
+<div class="dashboard-container">
+    <div class="dashboard-header">
+        <h2>Model Confidence: {job_name}</h2>
+        <p>
+            Summary statistics and confidence plots for each predicted protein chain.
+            Higher pLDDT scores and lower PAE values indicate a more reliable prediction.
+        </p>
+    </div>
+    {sample_section_html}
+    {interface_section_html}
+    {all_chain_html}
+    {affinity_section_html}
+</div>
+"""
+
+chain_card_template = """
+<div class="chain-card">
+    <div class="card-header">
+        <h3>{label}</h3>
+        <div class="stats-container">
+            <div class="stat-item"><strong>Mean pLDDT:</strong> <span class="{plddt_color_class}">{mean_plddt:.2f}</span></div>
+            <div class="stat-item"><strong>Confident (&gt;70):</strong> {pct_confident:.1f}%</div>
+            <div class="stat-item"><strong>Very High (&gt;90):</strong> {pct_very_high:.1f}%</div>
+        </div>
+    </div>
+    <div class="plot-grid">
+        <div class="plot-item"><img src="data:image/png;base64,{plddt_plot}" alt="pLDDT Plot"></div>
+        <div class="plot-item"><img src="data:image/png;base64,{pae_plot}" alt="PAE Plot"></div>
+    </div>
+</div>
+"""
+
+sample_table_template = """
+<div class="dashboard-header">
+    <h2>Diffusion Samples: {job_name}</h2>
+    <p>
+        Confidence of all {n_samples} samples, ranked by a composite score ({weights}).
+        The plots below show the top-ranked model.
+    </p>
+</div>
+<table class="sample-table">
+    <tr><th>Rank</th><th>Sample</th>{header}</tr>
+    {rows}
+</table>
+"""
+
+interface_template = """
+<div class="dashboard-header">
+    <h2>Chain Interfaces: {job_name}</h2>
+    <p>
+        Inter-chain PAE and an ipTM-style score for every pair of the {n_chains} chains of Model {model_id}.
+        Rows are the chain the structure is aligned on, columns the chain whose error is scored.
+        Higher scores and lower PAE indicate a more confidently placed interface.
+        Residues are in contact when heavy atoms are within {cutoff:g} Å; a contact is confident
+        when its PAE (mean of both directions) is at most {max_pae:g} Å, and only those residues are listed.
+    </p>
+</div>
+<div class="plot-item" style="margin-bottom: 15px;"><img src="data:image/png;base64,{plot}" alt="Chain Interface Plot"></div>
+<table class="sample-table">
+    <tr><th>Chain</th><th>Chain</th><th>ipTM-style</th><th>Mean PAE (Å)</th><th>Min PAE (Å)</th>
+        <th>Contacts</th><th>Confident</th><th>Interface Residues (confident contacts)</th></tr>
+    {rows}
+</table>
+"""
+
+
+def main(params_filepath=RUN_PARAMS_FILE):
+    """Entry point of the Analyse Results cell; returns the job name."""
+    from .colab import display_html
+    from .confidence_store import DEFAULT_STORE_DTYPE, ensure_confidence_store
+    from .ranking import manifest_path as ranking_path, rank_job
+
+    os.chdir(DATA_DIR)
+    params = load_run_params(params_filepath)
+    job_name = params.get("job_name")
+    try:
+        # 0. Define and create the output directory for plots
+        plots_dir = f"{job_dir(job_name)}/boltz_results_{job_name}/plots"
+        os.makedirs(plots_dir, exist_ok=True)
+
+        cache = RenderCache(max_mb=params.get("render_cache_max_mb", DEFAULT_RENDER_CACHE_MAX_MB),
+                            enabled=params.get("render_cache", True))
+
+        if params.get("confidence_store", True):
+            ensure_confidence_store(job_name, params.get("confidence_dtype", DEFAULT_STORE_DTYPE))
+
+        # 1. Rank every sample (writes ranking.json), then plot the top-ranked model
+        ranking = rank_job(job_name, params.get("ranking_weights"))
+        ids = [entry["model_id"] for entry in ranking["models"]]
+        if not ids:
+            raise FileNotFoundError(f"No model PDB files in {predictions_dir(job_name)}")
+        # Loaded in store order, so the PAE stack stays a view of the memory-mapped store
+        stack = load_confidence_stack(job_name, sorted(ids))
+        top_pae = stack["pae"][stack["model_ids"].index(ids[0])]
+        token_map = load_token_map(job_name, ids[0])
+        sample_html = create_sample_summary_html(job_name, stack, token_map, ranking)
+        interface_html = create_interface_html(job_name, ids[0], top_pae, plots_dir, cache, token_map,
+                                               params.get("contact_cutoff", DEFAULT_CONTACT_CUTOFF),
+                                               params.get("contact_max_pae", DEFAULT_CONTACT_MAX_PAE))
+        chain_data_list = create_dashboard_data(job_name=job_name, model_id=ids[0], plots_dir=plots_dir,
+                                                stack=stack, token_map=token_map,
+                                                processes=params.get("plot_workers"), cache=cache,
+                                                pae_reduce=params.get("pae_reduce", DEFAULT_PAE_REDUCE))
+
+        # 2. Generate the affinity plot HTML and save it
+        affinity_html = generate_affinity_plot_html(job_name=job_name, plots_dir=plots_dir, cache=cache)
+        if cache.enabled:
+            cache.evict()
+            print(f"Figures: {cache.hits} from the render cache, {cache.misses} rendered.")
+        add_artifacts(job_name, [ranking_path(job_name)] + [os.path.join(plots_dir, f) for f in os.listdir(plots_dir)])
+
+        if not chain_data_list and not affinity_html:
+            print("No data found to generate a report.")
+        else:
+            all_cards_html = ""
+            for chain_data in chain_data_list:
+                mean_plddt = chain_data['mean_plddt']
+                plddt_class = 'plddt-high' if mean_plddt >= 90 else ('plddt-medium' if mean_plddt >= 70 else 'plddt-low')
+                all_cards_html += chain_card_template.format(
+                    label=chain_data['label'],
+                    plddt_plot=chain_data['plddt_plot'],
+                    pae_plot=chain_data['pae_plot'],
+                    mean_plddt=mean_plddt,
+                    pct_confident=chain_data['pct_confident'],
+                    pct_very_high=chain_data['pct_very_high'],
+                    plddt_color_class=plddt_class
+                )
+
+            # 3. Assemble and display the final HTML report
+            final_html = main_html_template.format(
+                job_name=job_name,
+                sample_section_html=sample_html,
+                interface_section_html=interface_html,
+                all_chain_html=all_cards_html,
+                affinity_section_html=affinity_html
+            )
+            display_html(final_html)
+
+    except FileNotFoundError as e:
+        print(f"Error: A required file was not found. {e}")
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}")
+    return job_name
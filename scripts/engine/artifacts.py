@@ -0,0 +1,300 @@
+"""Per-job manifest of every file a run produced.
+
+The output tree of a job is walked once, right after the prediction, and
+`{job}/{job}_artifacts.json` lists each file with its kind, model id, size and
+SHA-256. Consumers look artifacts up in the manifest instead of globbing or
+rebuilding boltz's nested paths, and files written later (plots, rankings) are
+added to it. Paths are relative to the job folder, so the manifest stays valid
+in a Drive copy or a zip. Before a Drive copy or zip the manifest is brought
+up to date with the folder (files added or changed since it was written, e.g.
+logs or user files), and a Drive copy skips files whose size and modification
+time match the copy already there.
+
+Kinds: model, plddt, pae, pde, confidence, affinity, msa, processed, plot, log,
+report (other JSON/HTML), other, store (the memory-mappable copies of the
+confidence arrays, see confidence_store.py), tokens (the per-model token
+maps, see token_map.py) and contacts (the per-model inter-chain contacts, see
+contacts.py). Derived kinds can be rebuilt from the others; they
+are not hashed and are left out of Drive copies and zips unless asked for.
+"""
+import datetime
+import hashlib
+import json
+import os
+import re
+import shutil
+
+from .params import DATA_DIR
+
+MANIFEST_VERSION = 1
+PREDICTION_KINDS = ("plddt", "pae", "pde")
+DERIVED_KINDS = ("store", "tokens", "contacts")
+_cache = {}
+
+
+def job_dir(job_name, data_dir=DATA_DIR):
+    return f"{data_dir}/{job_name}"
+
+
+def manifest_path(job_name, data_dir=DATA_DIR):
+    return f"{job_dir(job_name, data_dir)}/{job_name}_artifacts.json"
+
+
+def _patterns(job_name):
+    job = re.escape(job_name)
+    return [
+        ("model", re.compile(rf"(?:^|/){job}_model_(\d+)\.(?:pdb|cif)$")),
+        (None, re.compile(rf"(?:^|/)({'|'.join(PREDICTION_KINDS)})_{job}_model_(\d+)\.npz$")),
+        ("confidence", re.compile(rf"(?:^|/)confidence_{job}_model_(\d+)\.json$")),
+        ("affinity", re.compile(rf"(?:^|/)affinity_{job}\.json$")),
+        ("store", re.compile(rf"(?:^|/)(?:(?:{'|'.join(PREDICTION_KINDS)})_{job}_models\.npy|{job}_confidence_store\.json)$")),
+        ("tokens", re.compile(rf"(?:^|/){job}_model_(\d+)_tokens\.npz$")),
+        ("contacts", re.compile(rf"(?:^|/){job}_model_(\d+)_contacts\.npz$")),
+    ]
+
+
+def classify(rel_path, job_name, patterns=None):
+    """Returns (kind, model_id) of a path relative to the job folder."""
+    for kind, pattern in patterns or _patterns(job_name):
+        match = pattern.search(rel_path)
+        if match:
+            if kind is None:
+                return match.group(1), int(match.group(2))
+            return kind, int(match.group(1)) if match.groups() else None
+    parts = rel_path.split("/")
+    if len(parts) > 1 and parts[0] == f"boltz_results_{job_name}" and parts[1] in ("msa", "processed"):
+        return parts[1], None
+    ext = os.path.splitext(rel_path)[1].lower()
+    if ext == ".png":
+        return "plot", None
+    if ext == ".log":
+        return "log", None
+    if ext in (".json", ".html"):
+        return "report", None
+    return "other", None
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _entry(root, rel_path, job_name, patterns=None, hash_files=True):
+    full = os.path.join(root, rel_path)
+    kind, model_id = classify(rel_path, job_name, patterns)
+    return {"path": rel_path, "kind": kind, "model_id": model_id, "size": os.path.getsize(full),
+            "sha256": _sha256(full) if hash_files and kind not in DERIVED_KINDS else None}
+
+
+def build_manifest(job_name, data_dir=DATA_DIR, hash_files=True):
+    """Walks the job folder once and returns the manifest dict."""
+    root = job_dir(job_name, data_dir)
+    own = os.path.basename(manifest_path(job_name, data_dir))
+    patterns = _patterns(job_name)
+    artifacts = []
+    for dirpath, dirs, files in os.walk(root):
+        dirs.sort()
+        for filename in sorted(files):
+            rel_path = os.path.relpath(os.path.join(dirpath, filename), root).replace(os.sep, "/")
+            if rel_path == own or filename.endswith(".tmp"):
+                continue
+            artifacts.append(_entry(root, rel_path, job_name, patterns, hash_files))
+    return {
+        "version": MANIFEST_VERSION,
+        "job_name": job_name,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "artifacts": artifacts,
+    }
+
+
+def _save(manifest, data_dir):
+    path = manifest_path(manifest["job_name"], data_dir)
+    manifest["total_bytes"] = sum(a["size"] for a in manifest["artifacts"])
+    with open(f"{path}.tmp", 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f"{path}.tmp", path)
+    _cache.pop(path, None)
+    return manifest
+
+
+def write_manifest(job_name, data_dir=DATA_DIR, hash_files=True):
+    """Builds and writes the manifest of a finished job; returns it."""
+    return _save(build_manifest(job_name, data_dir, hash_files), data_dir)
+
+
+def load_manifest(job_name, data_dir=DATA_DIR):
+    """Returns the job's manifest, writing it first for results that predate manifests.
+
+    Returns None when the job folder does not exist. Parsed manifests are
+    cached until the file changes.
+    """
+    path = manifest_path(job_name, data_dir)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        if not os.path.isdir(job_dir(job_name, data_dir)):
+            return None
+        write_manifest(job_name, data_dir)
+        stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = _cache.get(path)
+    if cached and cached[0] == key:
+        return cached[1]
+    with open(path, 'r') as f:
+        manifest = json.load(f)
+    manifest["_index"] = {}
+    for entry in manifest["artifacts"]:
+        manifest["_index"].setdefault((entry["kind"], entry["model_id"]), []).append(entry)
+    _cache[path] = (key, manifest)
+    return manifest
+
+
+def add_artifacts(job_name, paths, data_dir=DATA_DIR):
+    """Adds (or refreshes) files written after the manifest, e.g. plots; returns the manifest."""
+    manifest = load_manifest(job_name, data_dir)
+    if manifest is None:
+        return None
+    root = job_dir(job_name, data_dir)
+    entries = {a["path"]: a for a in manifest["artifacts"]}
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        rel_path = os.path.relpath(os.path.abspath(path), os.path.abspath(root)).replace(os.sep, "/")
+        entries[rel_path] = _entry(root, rel_path, job_name)
+    manifest = {k: v for k, v in manifest.items() if k != "_index"}
+    manifest["artifacts"] = sorted(entries.values(), key=lambda a: a["path"])
+    return _save(manifest, data_dir)
+
+
+def refresh_manifest(job_name, data_dir=DATA_DIR):
+    """Brings the manifest up to date with the job folder; returns (manifest, unlisted paths).
+
+    Files the manifest does not list are added, files modified since it was
+    saved are hashed again and deleted files are dropped; only those files
+    are read. Returns (None, []) when the job folder does not exist.
+    """
+    manifest = load_manifest(job_name, data_dir)
+    if manifest is None:
+        return None, []
+    root = job_dir(job_name, data_dir)
+    saved = os.stat(manifest_path(job_name, data_dir)).st_mtime_ns
+    listed = {a["path"]: a for a in manifest["artifacts"]}
+    on_disk = [a["path"] for a in build_manifest(job_name, data_dir, hash_files=False)["artifacts"]]
+    unlisted = [path for path in on_disk if path not in listed]
+    changed = []
+    for path in on_disk:
+        if path in listed:
+            stat = os.stat(os.path.join(root, path))
+            if stat.st_size != listed[path]["size"] or stat.st_mtime_ns > saved:
+                changed.append(path)
+    if not unlisted and not changed and len(on_disk) == len(listed):
+        return manifest, []
+    entries = {path: listed[path] for path in on_disk if path in listed}
+    patterns = _patterns(job_name)
+    for path in unlisted + changed:
+        entries[path] = _entry(root, path, job_name, patterns)
+    manifest = {k: v for k, v in manifest.items() if k != "_index"}
+    manifest["artifacts"] = sorted(entries.values(), key=lambda a: a["path"])
+    _save(manifest, data_dir)
+    return load_manifest(job_name, data_dir), unlisted
+
+
+def find(job_name, kind, model_id=None, data_dir=DATA_DIR):
+    """Returns the manifest entries of one kind (and model id), or [] without a manifest."""
+    manifest = load_manifest(job_name, data_dir)
+    if manifest is None:
+        return []
+    return manifest["_index"].get((kind, model_id), [])
+
+
+def artifact_path(job_name, kind, model_id=None, data_dir=DATA_DIR, ext=None):
+    """Returns the absolute path of an artifact, or None if the job has none."""
+    for entry in find(job_name, kind, model_id, data_dir):
+        if ext is None or entry["path"].endswith(ext):
+            return os.path.join(job_dir(job_name, data_dir), entry["path"])
+    return None
+
+
+def model_ids(job_name, data_dir=DATA_DIR):
+    """Ids of the job's models, in numeric order."""
+    manifest = load_manifest(job_name, data_dir)
+    if manifest is None:
+        return []
+    return sorted({a["model_id"] for a in manifest["artifacts"] if a["kind"] == "model"})
+
+
+def _selected(manifest, kinds):
+    if kinds is None:
+        return [a for a in manifest["artifacts"] if a["kind"] not in DERIVED_KINDS]
+    return [a for a in manifest["artifacts"] if a["kind"] in kinds]
+
+
+def _unchanged(source, target):
+    """True when `target` has the size and (to the second) modification time of `source`."""
+    try:
+        src, dst = os.stat(source), os.stat(target)
+    except OSError:
+        return False
+    return src.st_size == dst.st_size and abs(src.st_mtime - dst.st_mtime) < 1
+
+
+def sync_artifacts(job_name, dest_dir, data_dir=DATA_DIR, kinds=None):
+    """Copies the job's artifacts to `dest_dir` (e.g. on Drive), skipping files already there.
+
+    The manifest is refreshed first, so files written after it are copied
+    too. A file is skipped when the copy in `dest_dir` has its size and
+    modification time (copies keep the source's); files that are no longer
+    part of the job and are listed by the manifest of an earlier copy are
+    removed. Returns (copied, skipped) counts.
+    """
+    manifest, _ = refresh_manifest(job_name, data_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"No results found for job '{job_name}' in {data_dir}.")
+    root = job_dir(job_name, data_dir)
+    dest_manifest = os.path.join(dest_dir, os.path.basename(manifest_path(job_name, data_dir)))
+    previous = {}
+    if os.path.exists(dest_manifest):
+        with open(dest_manifest, 'r') as f:
+            previous = {a["path"]: a for a in json.load(f).get("artifacts", [])}
+    selected = _selected(manifest, kinds)
+    copied = skipped = 0
+    for entry in selected:
+        target = os.path.join(dest_dir, entry["path"])
+        previous.pop(entry["path"], None)
+        if _unchanged(os.path.join(root, entry["path"]), target):
+            skipped += 1
+            continue
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copy2(os.path.join(root, entry["path"]), target)
+        copied += 1
+    for stale in previous:
+        try:
+            os.remove(os.path.join(dest_dir, stale))
+        except OSError:
+            pass
+    copy = {k: v for k, v in manifest.items() if k != "_index"}
+    copy["artifacts"] = selected
+    with open(dest_manifest, 'w') as f:
+        json.dump(copy, f, indent=2)
+    return copied, skipped
+
+
+def zip_artifacts(job_name, zip_file, data_dir=DATA_DIR, kinds=None):
+    """Writes the job's artifacts (and its refreshed manifest) into a zip; returns the zip path."""
+    import zipfile
+
+    manifest, _ = refresh_manifest(job_name, data_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"No results found for job '{job_name}' in {data_dir}.")
+    root = job_dir(job_name, data_dir)
+    with zipfile.ZipFile(f"{zip_file}.tmp", 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        for entry in _selected(manifest, kinds):
+            # Compressed numpy archives and images do not shrink any further
+            compress = zipfile.ZIP_STORED if entry["path"].endswith((".npz", ".png")) else zipfile.ZIP_DEFLATED
+            zf.write(os.path.join(root, entry["path"]), entry["path"], compress_type=compress)
+        zf.write(manifest_path(job_name, data_dir), os.path.basename(manifest_path(job_name, data_dir)))
+    os.replace(f"{zip_file}.tmp", zip_file)
+    return zip_file
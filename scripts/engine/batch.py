@@ -0,0 +1,413 @@
+"""Persistent batch queue that runs many job YAMLs through `boltz predict`.
+
+Jobs are scheduled shortest-first by token count and their status is kept in a
+JSON state file, so an interrupted batch resumes where it stopped when the cell
+is run again. Optionally the MSA and preprocessing stages of upcoming jobs are
+prefetched while the current job runs inference.
+"""
+import datetime
+import glob
+import heapq
+import html
+import json
+import os
+import queue
+import re
+import shutil
+import threading
+import time
+
+from .cache import DEFAULT_CACHE_MAX_GB, PredictionCache, prediction_cache_key
+from .console import Color, fail, ok
+from .msa_store import DEFAULT_MSA_STORE_MAX_GB, MSAStore, harvest_msas, inject_cached_msas
+from .params import DATA_DIR, RUN_PARAMS_FILE, build_predict_command, load_run_params, prepare_job_yaml
+from .retry import attempt_suffix, run_with_retries
+
+JOB_TYPE = "Boltz Batch Execution"
+BATCH_STATE_FILE = f"{DATA_DIR}/batch_queue.json"
+BATCH_LOG_DIR = f"{DATA_DIR}/batch_logs"
+BATCH_INPUT_DIR = f"{DATA_DIR}/batch_jobs"
+
+# CCD ligands are resolved by boltz, so we only know their size after the run.
+CCD_TOKEN_ESTIMATE = 30
+SMILES_ATOM_PATTERN = re.compile(r"\[[^\]]+\]|Br|Cl|[BCNOPSFI]|[bcnops]")
+
+PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+
+
+def count_tokens(yaml_path):
+    """Estimates the number of boltz tokens (residues + ligand heavy atoms) in a job YAML."""
+    import yaml
+    with open(yaml_path, 'r') as f:
+        data = yaml.safe_load(f) or {}
+    total = 0
+    for entry in data.get("sequences", []):
+        for kind, spec in entry.items():
+            ids = spec.get("id", [])
+            copies = len(ids) if isinstance(ids, list) else 1
+            if kind in ("protein", "dna", "rna"):
+                size = len(re.sub(r"\s+", "", str(spec.get("sequence", ""))))
+            elif "smiles" in spec:
+                size = len(SMILES_ATOM_PATTERN.findall(str(spec["smiles"])))
+            else:
+                size = CCD_TOKEN_ESTIMATE
+            total += size * max(copies, 1)
+    return total
+
+
+def discover_jobs(source):
+    """Returns the job YAML paths in a directory, or listed one per line in a manifest file."""
+    if os.path.isdir(source):
+        paths = glob.glob(os.path.join(source, "*.yaml")) + glob.glob(os.path.join(source, "*.yml"))
+        return sorted(paths)
+    base = os.path.dirname(os.path.abspath(source))
+    paths = []
+    with open(source, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            paths.append(line if os.path.isabs(line) else os.path.join(base, line))
+    return paths
+
+
+def _now():
+    return datetime.datetime.now().isoformat(timespec="seconds")
+
+
+class BatchQueue:
+    """A shortest-job-first queue of boltz jobs backed by a JSON state file."""
+
+    def __init__(self, params, work_dir=DATA_DIR, state_file=BATCH_STATE_FILE, log_dir=BATCH_LOG_DIR, cache=None,
+                 msa_store=None):
+        self.params = params
+        self.cache = cache
+        self.msa_store = msa_store
+        self.work_dir = work_dir
+        self.state_file = state_file
+        self.log_dir = log_dir
+        self.jobs = {}
+        self._heap = []
+        self._counter = 0
+        self._lock = threading.Lock()
+        self._prepared = set()
+        self._load()
+
+    # --- State handling ---
+    def _load(self):
+        if os.path.exists(self.state_file):
+            with open(self.state_file, 'r') as f:
+                self.jobs = json.load(f).get("jobs", {})
+        for name, job in self.jobs.items():
+            # A job that was running when the kernel died has to start over.
+            if job["status"] == RUNNING:
+                job["status"] = PENDING
+            if job["status"] == PENDING:
+                self._push(name)
+
+    def _save(self):
+        # Called with `_lock` held; every change to a job dict is made under it too, since
+        # json.dump walks the dicts while it writes
+        tmp_file = f"{self.state_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump({"jobs": self.jobs}, f, indent=2)
+        os.replace(tmp_file, self.state_file)
+
+    def _push(self, name):
+        heapq.heappush(self._heap, (self.jobs[name]["tokens"], self._counter, name))
+        self._counter += 1
+
+    # --- Public API ---
+    def add(self, yaml_path, retry_failed=True):
+        """Queues a job YAML; finished jobs are kept, failed ones are re-queued."""
+        name = os.path.splitext(os.path.basename(yaml_path))[0]
+        source = os.path.abspath(yaml_path)
+        with self._lock:
+            job = self.jobs.get(name)
+            if job and job["source"] != source:
+                raise ValueError(f"Job name '{name}' is used by both '{job['source']}' and '{source}'.")
+            if job and (job["status"] in (PENDING, RUNNING, DONE) or not retry_failed):
+                return job
+            self.jobs[name] = {
+                "name": name,
+                "source": source,
+                "tokens": count_tokens(yaml_path),
+                "status": PENDING,
+                "returncode": None,
+                "queued_at": _now(),
+                "started_at": None,
+                "finished_at": None,
+                "out_dir": os.path.join(self.work_dir, name),
+                "log_file": os.path.join(self.log_dir, f"{name}.log"),
+                "models": [],
+                "attempts": [],
+            }
+            self._push(name)
+            self._save()
+            return self.jobs[name]
+
+    def add_from(self, source, retry_failed=True):
+        """Queues every job YAML found in a directory or manifest file."""
+        return [self.add(path, retry_failed=retry_failed) for path in discover_jobs(source)]
+
+    def summary(self):
+        """Returns job counts per status."""
+        counts = {PENDING: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        for job in self.jobs.values():
+            counts[job["status"]] += 1
+        return counts
+
+    def run(self, max_concurrent=1, on_update=None, prefetch_depth=0):
+        """Runs queued jobs with at most `max_concurrent` boltz processes at a time.
+
+        With `prefetch_depth` > 0 a prefetch worker computes the MSAs and
+        processed inputs of up to that many upcoming jobs on the CPU while the
+        current ones run inference (see pipeline.py).
+        """
+        n_workers = max(1, int(max_concurrent))
+        if prefetch_depth and int(prefetch_depth) > 0:
+            ready = queue.Queue(maxsize=int(prefetch_depth))
+            workers = [threading.Thread(target=self._prefetcher, args=(ready, n_workers, on_update))]
+            workers += [threading.Thread(target=self._worker, args=(ready.get, on_update)) for _ in range(n_workers)]
+        else:
+            workers = [threading.Thread(target=self._worker, args=(lambda: self._take_job(on_update), on_update))
+                       for _ in range(n_workers)]
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+        return self.summary()
+
+    # --- Execution ---
+    def _next_job(self):
+        with self._lock:
+            while self._heap:
+                _, _, name = heapq.heappop(self._heap)
+                job = self.jobs[name]
+                if job["status"] == PENDING:
+                    job["status"] = RUNNING
+                    job["started_at"] = _now()
+                    self._save()
+                    return job
+            return None
+
+    def _take_job(self, on_update):
+        job = self._next_job()
+        if job is not None and on_update:
+            on_update(job)
+        return job
+
+    def _prefetcher(self, ready, n_consumers, on_update):
+        from .pipeline import prefetch_inputs
+
+        try:
+            while True:
+                job = self._take_job(on_update)
+                if job is None:
+                    return
+                try:
+                    self._prepare_job(job)
+                    if not job.get("cached"):
+                        started = time.monotonic()
+                        prefetched = prefetch_inputs(
+                            self._param_file(job), job["name"], job["out_dir"], self.params,
+                            os.path.join(self.log_dir, f"{job['name']}.prefetch.log"))
+                        with self._lock:
+                            job["prefetched"] = prefetched
+                            job["prefetch_s"] = round(time.monotonic() - started, 2)
+                except Exception:
+                    pass  # the inference worker prepares the job again and reports the error
+                # Blocks while `prefetch_depth` prefetched jobs are waiting for inference
+                ready.put(job)
+        finally:
+            for _ in range(n_consumers):
+                ready.put(None)
+
+    def _worker(self, next_job, on_update):
+        from .artifacts import write_manifest
+
+        while True:
+            job = next_job()
+            if job is None:
+                return
+            returncode = self._run_job(job)
+            try:
+                if os.path.isdir(job["out_dir"]):
+                    write_manifest(job["name"], os.path.dirname(job["out_dir"]))
+                models = self._find_models(job) if returncode == 0 else []
+            except Exception:
+                self._log_exception(job, "Could not read the results")
+                returncode, models = -1, []
+            with self._lock:
+                job["returncode"] = returncode
+                job["status"] = DONE if returncode == 0 else FAILED
+                job["finished_at"] = _now()
+                job["models"] = models
+                self._save()
+            if on_update:
+                on_update(job)
+
+    def _param_file(self, job):
+        return os.path.join(self.work_dir, f"{job['name']}.yaml")
+
+    def _prepare_job(self, job):
+        """Writes the job YAML, then restores a cached result or injects stored MSAs."""
+        name = job["name"]
+        # A retried job must not keep the outcome of its previous preparation
+        with self._lock:
+            job["cached"] = job["msa_reused"] = False
+        os.makedirs(self.log_dir, exist_ok=True)
+        if os.path.exists(job["out_dir"]):
+            shutil.rmtree(job["out_dir"])
+        param_file = self._param_file(job)
+        prepare_job_yaml(job["source"], param_file)
+        if self.cache and self.cache.restore(prediction_cache_key(param_file, self.params), name, job["out_dir"]):
+            with self._lock:
+                job["cached"] = True
+        elif self.msa_store:
+            msa_reused = bool(inject_cached_msas(param_file, self.msa_store))
+            with self._lock:
+                job["msa_reused"] = msa_reused
+        self._prepared.add(name)
+
+    def _run_job(self, job):
+        from .results_index import write_run_record
+        from .worker import run_boltz
+
+        name = job["name"]
+        param_file = self._param_file(job)
+        try:
+            if name not in self._prepared:
+                self._prepare_job(job)
+            self._prepared.discard(name)
+            if job.get("cached"):
+                write_run_record(name, self.params, [], cached=True, data_dir=self.work_dir)
+                return 0
+
+            def attempt(params, number):
+                # Processed inputs (prefetched or from a failed attempt) are kept, partial predictions are not
+                shutil.rmtree(f"{job['out_dir']}/boltz_results_{name}/predictions", ignore_errors=True)
+                log_file = os.path.join(self.log_dir, f"{name}{attempt_suffix(number)}.log")
+                cmd = build_predict_command(param_file, name, params)
+                return run_boltz(cmd, log_file, cwd=self.work_dir, tail_lines=20)
+
+            result, final_params, attempts = run_with_retries(attempt, self.params)
+            with self._lock:
+                job["attempts"] = attempts
+                job["log_file"] = result.log_file
+            if os.path.isdir(job["out_dir"]):
+                write_run_record(name, final_params, attempts, data_dir=self.work_dir)
+            if result.returncode == 0:
+                if self.msa_store:
+                    harvest_msas(param_file, job["out_dir"], name, self.msa_store)
+                if self.cache:
+                    self.cache.store(prediction_cache_key(param_file, final_params), name, job["out_dir"])
+            return result.returncode
+        except Exception:
+            # A bad job YAML or parameter fails this job only; the worker moves on to the next one
+            self._log_exception(job, "Failed to run boltz")
+            return -1
+
+    def _log_exception(self, job, what):
+        import traceback
+
+        os.makedirs(os.path.dirname(job["log_file"]), exist_ok=True)
+        with open(job["log_file"], 'a') as log:
+            log.write(f"\n{what}:\n{traceback.format_exc()}\n")
+
+    @staticmethod
+    def _find_models(job):
+        from .predictions import model_files
+
+        return model_files(job["name"], data_dir=os.path.dirname(job["out_dir"]))
+
+
+def batch_table_html(jobs, best_models):
+    """Returns the per-job status table of a batch, shortest jobs first."""
+    rows = ""
+    for job in sorted(jobs, key=lambda j: j["tokens"]):
+        status_class = "ok" if job["status"] == DONE else ("err" if job["status"] == FAILED else "")
+        best = best_models.get(job["name"])
+        best_cells = (f"<td>#{best['rank']} Model {best['model_id']}</td><td>{best['score']:.3f}</td>"
+                      if best and best["score"] is not None else "<td></td><td></td>")
+        rows += f"""
+    <tr>
+        <td>{html.escape(job['name'])}</td><td>{job['tokens']}</td>
+        <td class="{status_class}">{job['status']}</td>
+        <td>{job['started_at'] or ''}</td><td>{job['finished_at'] or ''}</td>
+        <td>{len(job['models'])}</td>{best_cells}<td>{html.escape(job['log_file'])}</td>
+    </tr>"""
+    return f"""
+<style>
+    .batch-table {{ font-family: 'Roboto', sans-serif; border-collapse: collapse; margin: 10px; }}
+    .batch-table th, .batch-table td {{ border: 1px solid #e0e0e0; padding: 6px 12px; text-align: left; }}
+    .batch-table th {{ background-color: #f5f5f5; color: #145ABE; }}
+    .batch-table .ok {{ color: #388e3c; font-weight: bold; }}
+    .batch-table .err {{ color: #d32f2f; font-weight: bold; }}
+</style>
+<table class="batch-table">
+    <tr><th>Job</th><th>Tokens</th><th>Status</th><th>Started</th><th>Finished</th><th>Models</th><th>Best Model</th><th>Score</th><th>Log</th></tr>
+    {rows}
+</table>
+"""
+
+
+def main(params_filepath=RUN_PARAMS_FILE):
+    """Entry point of the Boltz2 Batch cell; returns the queue.
+
+    run_params.txt supplies the shared run settings; `batch_input` points at a
+    directory of job YAMLs or a manifest file listing one YAML path per line.
+    """
+    from .colab import display_html
+    from .ranking import rank_campaign
+    from .telemetry import log_event
+
+    # 1. Set up parameters
+    os.chdir(DATA_DIR)
+    params = load_run_params(params_filepath)
+    batch_input = params.get("batch_input", BATCH_INPUT_DIR)
+    if not os.path.exists(batch_input):
+        raise FileNotFoundError(f"Cannot proceed: The batch input '{batch_input}' does not exist.")
+    log_event(job_type=JOB_TYPE, job_name=batch_input, event=" ")
+
+    # 2. Queue the jobs (already finished jobs from a previous run are kept)
+    cache = (PredictionCache(max_gb=params.get("cache_max_gb", DEFAULT_CACHE_MAX_GB))
+             if params.get("use_cache", True) else None)
+    msa_store = (MSAStore(max_gb=params.get("msa_store_max_gb", DEFAULT_MSA_STORE_MAX_GB))
+                 if params.get("use_msa_store", True) else None)
+    batch = BatchQueue(params, cache=cache, msa_store=msa_store)
+    batch.add_from(batch_input)
+    counts = batch.summary()
+    print(f"{Color.CYAN}[i] {len(batch.jobs)} jobs in queue: {counts[DONE]} done, "
+          f"{counts[PENDING]} pending, {counts[FAILED]} failed.{Color.RESET}")
+
+    # 3. Run the queue, shortest jobs first
+    print_lock = threading.Lock()
+
+    def report(job):
+        with print_lock:
+            if job["status"] == RUNNING:
+                print(f"[{Color.YELLOW}…{Color.RESET}] {job['name']} started ({job['tokens']} tokens)")
+            elif job["status"] == DONE:
+                source = " (from cache)" if job.get("cached") else ""
+                ok(f"{job['name']} finished{source}, {len(job['models'])} model(s)")
+            else:
+                fail(f"{job['name']} failed (exit code {job['returncode']}), see {job['log_file']}")
+
+    # MSAs and processed inputs of up to `prefetch_depth` upcoming jobs are prepared on the CPU during inference
+    counts = batch.run(max_concurrent=params.get("max_concurrent_jobs", 1), on_update=report,
+                       prefetch_depth=params.get("prefetch_depth", 0))
+    print(f"{Color.CYAN}[i] Batch complete: {counts[DONE]} done, {counts[FAILED]} failed.{Color.RESET}")
+
+    # 4. Rank the models of all finished jobs against each other
+    ranking_file = f"{batch.work_dir}/batch_ranking.json"
+    ranking = rank_campaign([job["name"] for job in batch.jobs.values() if job["status"] == DONE],
+                            weights=params.get("ranking_weights"), data_dir=batch.work_dir, out_file=ranking_file)
+    best_models = {}
+    for entry in ranking["models"]:
+        best_models.setdefault(entry["job_name"], entry)
+    print(f"{Color.CYAN}[i] Ranked {len(ranking['models'])} models, manifest: {ranking_file}{Color.RESET}")
+
+    # 5. Per-job status table
+    display_html(batch_table_html(batch.jobs.values(), best_models))
+    return batch
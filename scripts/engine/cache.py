@@ -0,0 +1,190 @@
+"""Content-addressed cache of finished boltz predictions.
+
+Entries are keyed by a hash of the canonicalized job YAML and the run
+parameters that affect inference, so re-running an identical job restores the
+stored output directory (hard-linked when possible) instead of predicting again.
+The cache is capped in size and evicts least recently used entries.
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+
+from .params import DATA_DIR, DEFAULT_RUN_PARAMS
+
+CACHE_DIR = f"{DATA_DIR}/.prediction_cache"
+CACHE_VERSION = 1
+DEFAULT_CACHE_MAX_GB = 10
+
+# Run parameters that change the prediction; everything else is bookkeeping.
+CACHE_PARAM_KEYS = [
+    "recycling_steps", "sampling_steps", "diffusion_samples", "step_scale",
+    "max_msa_seqs", "msa_pairing_strategy", "use_potentials",
+]
+# Per-entry fields that do not change the prediction (e.g. local MSA paths).
+IGNORED_ENTRY_KEYS = {"msa"}
+
+
+def _boltz_version():
+    try:
+        from importlib.metadata import version
+        return version("boltz")
+    except Exception:
+        return None
+
+
+def _canonical_entry(kind, spec):
+    canon = {}
+    for key, value in spec.items():
+        if key in IGNORED_ENTRY_KEYS:
+            continue
+        if key == "id":
+            value = [str(i).upper().replace(" ", "") for i in (value if isinstance(value, list) else [value])]
+        elif key == "sequence":
+            value = re.sub(r"\s+", "", str(value)).upper()
+        elif key == "ccd":
+            value = str(value).upper().replace(" ", "")
+        elif key == "smiles":
+            value = str(value).replace(" ", "")
+        canon[key] = value
+    return {kind: canon}
+
+
+def canonicalize_job(yaml_path):
+    """Returns the job YAML reduced to the fields that determine the prediction."""
+    import yaml
+    with open(yaml_path, 'r') as f:
+        data = yaml.safe_load(f) or {}
+    sequences = [_canonical_entry(kind, spec)
+                 for entry in data.get("sequences", []) for kind, spec in entry.items()]
+    canon = {"sequences": sequences}
+    for key in ("properties", "constraints", "templates"):
+        if key in data:
+            canon[key] = data[key]
+    return canon
+
+
+def prediction_cache_key(yaml_path, params):
+    """Hashes the canonical job and the inference-relevant run parameters."""
+    p = {**DEFAULT_RUN_PARAMS, **params}
+    payload = {
+        "version": CACHE_VERSION,
+        "boltz": _boltz_version(),
+        "job": canonicalize_job(yaml_path),
+        "params": {key: p[key] for key in CACHE_PARAM_KEYS},
+    }
+    blob = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()
+
+
+def _rename_pattern(name):
+    return re.compile(rf"(?<![A-Za-z0-9]){re.escape(name)}(?![A-Za-z0-9])")
+
+
+def _link_tree(src_dir, dst_dir, old_name=None, new_name=None):
+    """Hard-links (or copies across devices) a tree, renaming job-name path parts."""
+    pattern = _rename_pattern(old_name) if old_name and old_name != new_name else None
+    for root, dirs, files in os.walk(src_dir):
+        rel = os.path.relpath(root, src_dir)
+        if pattern and rel != ".":
+            rel = pattern.sub(new_name, rel)
+        target_root = os.path.normpath(os.path.join(dst_dir, rel))
+        os.makedirs(target_root, exist_ok=True)
+        for filename in files:
+            target_name = pattern.sub(new_name, filename) if pattern else filename
+            src, dst = os.path.join(root, filename), os.path.join(target_root, target_name)
+            try:
+                os.link(src, dst)
+            except OSError:
+                shutil.copy2(src, dst)
+
+
+def _tree_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for filename in files:
+            total += os.path.getsize(os.path.join(root, filename))
+    return total
+
+
+class PredictionCache:
+    """An LRU-evicted, size-capped store of job output directories."""
+
+    def __init__(self, cache_dir=CACHE_DIR, max_gb=DEFAULT_CACHE_MAX_GB):
+        self.cache_dir = cache_dir
+        self.max_bytes = int(float(max_gb) * 1024 ** 3)
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def _read_meta(self, key):
+        meta_file = os.path.join(self._entry_dir(key), "meta.json")
+        try:
+            with open(meta_file, 'r') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def _write_meta(self, key, meta):
+        meta_file = os.path.join(self._entry_dir(key), "meta.json")
+        with open(f"{meta_file}.tmp", 'w') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(f"{meta_file}.tmp", meta_file)
+
+    def restore(self, key, job_name, output_path):
+        """Restores a cached entry into `output_path`; returns False on a miss."""
+        meta = self._read_meta(key)
+        results_dir = os.path.join(self._entry_dir(key), "results")
+        if meta is None or not os.path.isdir(results_dir):
+            return False
+        if os.path.exists(output_path):
+            shutil.rmtree(output_path)
+        _link_tree(results_dir, output_path, old_name=meta["job_name"], new_name=job_name)
+        meta["last_used"] = time.time()
+        meta["hits"] = meta.get("hits", 0) + 1
+        self._write_meta(key, meta)
+        return True
+
+    def store(self, key, job_name, output_path):
+        """Adds a finished job directory to the cache, then enforces the size cap."""
+        entry_dir = self._entry_dir(key)
+        tmp_dir = f"{entry_dir}.tmp"
+        for path in (tmp_dir, entry_dir):
+            if os.path.exists(path):
+                shutil.rmtree(path)
+        _link_tree(output_path, os.path.join(tmp_dir, "results"))
+        os.replace(tmp_dir, entry_dir)
+        now = time.time()
+        self._write_meta(key, {
+            "job_name": job_name,
+            "size": _tree_size(os.path.join(entry_dir, "results")),
+            "created": now,
+            "last_used": now,
+            "hits": 0,
+        })
+        self.evict()
+
+    def entries(self):
+        """Returns (key, meta) pairs for every valid cache entry."""
+        if not os.path.isdir(self.cache_dir):
+            return []
+        entries = []
+        for key in os.listdir(self.cache_dir):
+            meta = self._read_meta(key)
+            if meta is not None:
+                entries.append((key, meta))
+        return entries
+
+    def evict(self):
+        """Removes least recently used entries until the cache fits in its size cap."""
+        entries = sorted(self.entries(), key=lambda item: item[1]["last_used"])
+        total = sum(meta["size"] for _, meta in entries)
+        removed = []
+        while entries and total > self.max_bytes:
+            key, meta = entries.pop(0)
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+            total -= meta["size"]
+            removed.append(key)
+        return removed
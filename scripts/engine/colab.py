@@ -0,0 +1,64 @@
+"""Lazy wrappers around the Colab and IPython APIs.
+
+Importing this module is free; google.colab, googleapiclient and IPython are
+only imported when a function needs them.
+"""
+import functools
+
+
+@functools.lru_cache(maxsize=None)
+def get_user_info():
+    """Authenticates once per kernel and returns the Google account (email, name)."""
+    try:
+        from google.colab import auth
+        from googleapiclient.discovery import build
+    except ImportError:
+        return None, "unknown"
+    auth.authenticate_user()
+    user_info = build('oauth2', 'v2').userinfo().get().execute()
+    return user_info.get('email', None), user_info.get('name', "unknown")
+
+
+def display_html(markup, display_id=None):
+    """Renders an HTML string in the notebook output; with `display_id` it can be replaced later."""
+    from IPython.display import display, HTML
+    display(HTML(markup), display_id=display_id)
+
+
+def update_html(markup, display_id):
+    """Replaces the output shown by display_html with the same `display_id`."""
+    from IPython.display import update_display, HTML
+    update_display(HTML(markup), display_id=display_id)
+
+
+def register_callback(name, fn):
+    """Exposes `fn` to output JavaScript as google.colab.kernel.invokeFunction(name).
+
+    Returns False outside Colab, where outputs cannot call back into the kernel.
+    """
+    try:
+        from google.colab import output
+    except ImportError:
+        return False
+    output.register_callback(name, fn)
+    return True
+
+
+def mount_drive(mount_point="/content/drive"):
+    """Mounts Google Drive; returns False outside Colab."""
+    try:
+        from google.colab import drive
+    except ImportError:
+        return False
+    drive.mount(mount_point)
+    return True
+
+
+def download_file(path):
+    """Sends a file to the browser as a download; returns False outside Colab."""
+    try:
+        from google.colab import files
+    except ImportError:
+        return False
+    files.download(path)
+    return True
@@ -0,0 +1,131 @@
+"""Uncompressed, memory-mappable copies of a job's confidence arrays.
+
+boltz writes the pLDDT, PAE and PDE of every sample as a compressed .npz, so
+each np.load decompresses the whole matrix into RAM. The store stacks the
+samples of each kind into one `{kind}_{job}_models.npy` next to the
+predictions (optionally as float16), which is opened with mmap_mode="r":
+taking a sample or a contiguous chain block then reads only those pages and
+copies nothing. `{job}_confidence_store.json` records the model order, the
+dtype and the source npz files, so a store that no longer matches the
+predictions is ignored and rebuilt.
+"""
+import json
+import os
+
+from . import artifacts
+from .params import DATA_DIR
+from .predictions import predictions_dir
+
+STORE_VERSION = 1
+STORE_KINDS = artifacts.PREDICTION_KINDS
+STORE_DTYPES = ("float32", "float16")
+DEFAULT_STORE_DTYPE = "float32"
+
+
+def store_file(job_name, kind, data_dir=DATA_DIR):
+    return f"{predictions_dir(job_name, data_dir)}/{kind}_{job_name}_models.npy"
+
+
+def index_file(job_name, data_dir=DATA_DIR):
+    return f"{predictions_dir(job_name, data_dir)}/{job_name}_confidence_store.json"
+
+
+def _source(entry):
+    return {"path": entry["path"], "size": entry["size"], "sha256": entry["sha256"]}
+
+
+def _sources(job_name, data_dir):
+    """Returns the model ids and, per kind, the npz manifest entries of every model."""
+    ids = artifacts.model_ids(job_name, data_dir)
+    sources = {}
+    for kind in STORE_KINDS:
+        entries = [artifacts.find(job_name, kind, model_id, data_dir) for model_id in ids]
+        entries = [next((e for e in found if e["path"].endswith(".npz")), None) for found in entries]
+        if ids and all(entries):
+            sources[kind] = entries
+    return ids, sources
+
+
+def write_confidence_store(job_name, dtype=DEFAULT_STORE_DTYPE, data_dir=DATA_DIR):
+    """Converts the job's confidence npz files into stacked .npy files; returns the index.
+
+    Samples are decompressed one at a time straight into the output file, so
+    peak memory is a single matrix whatever the number of samples.
+    """
+    import numpy as np
+
+    if dtype not in STORE_DTYPES:
+        raise ValueError(f"Unknown confidence store dtype '{dtype}'; use one of {', '.join(STORE_DTYPES)}.")
+    ids, sources = _sources(job_name, data_dir)
+    if "plddt" not in sources or "pae" not in sources:
+        raise FileNotFoundError(f"No pLDDT/PAE files for the models of '{job_name}'")
+    root = artifacts.job_dir(job_name, data_dir)
+    index = {"version": STORE_VERSION, "job_name": job_name, "model_ids": ids, "dtype": dtype, "kinds": {}}
+    written = []
+    for kind, entries in sources.items():
+        path = store_file(job_name, kind, data_dir)
+        out = None
+        for i, entry in enumerate(entries):
+            with np.load(os.path.join(root, entry["path"])) as data:
+                array = data[kind]
+            if out is None:
+                out = np.lib.format.open_memmap(f"{path}.tmp", mode="w+", dtype=dtype,
+                                                shape=(len(entries),) + array.shape)
+            out[i] = array
+        out.flush()
+        del out
+        os.replace(f"{path}.tmp", path)
+        index["kinds"][kind] = {"file": os.path.basename(path), "sources": [_source(e) for e in entries]}
+        written.append(path)
+    path = index_file(job_name, data_dir)
+    with open(f"{path}.tmp", 'w') as f:
+        json.dump(index, f, indent=2)
+    os.replace(f"{path}.tmp", path)
+    artifacts.add_artifacts(job_name, written + [path], data_dir)
+    return index
+
+
+def _read_index(job_name, data_dir):
+    try:
+        with open(index_file(job_name, data_dir), 'r') as f:
+            index = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    return index if index.get("version") == STORE_VERSION else None
+
+
+def _is_current(index, job_name, data_dir):
+    ids, sources = _sources(job_name, data_dir)
+    if index["model_ids"] != ids or set(index["kinds"]) != set(sources):
+        return False
+    return all(index["kinds"][kind]["sources"] == [_source(e) for e in entries]
+               for kind, entries in sources.items())
+
+
+def open_confidence_store(job_name, data_dir=DATA_DIR):
+    """Memory-maps the job's store; returns None when it is missing or out of date.
+
+    The result has `model_ids`, `dtype` and one read-only (samples x ...)
+    array per stored kind.
+    """
+    import numpy as np
+
+    index = _read_index(job_name, data_dir)
+    if index is None or not _is_current(index, job_name, data_dir):
+        return None
+    store = {"model_ids": index["model_ids"], "dtype": index["dtype"]}
+    for kind, info in index["kinds"].items():
+        try:
+            store[kind] = np.load(os.path.join(predictions_dir(job_name, data_dir), info["file"]), mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+    return store
+
+
+def ensure_confidence_store(job_name, dtype=DEFAULT_STORE_DTYPE, data_dir=DATA_DIR):
+    """Opens the job's store, (re)writing it first if it is missing, stale or of another dtype."""
+    store = open_confidence_store(job_name, data_dir)
+    if store is None or store["dtype"] != dtype:
+        write_confidence_store(job_name, dtype, data_dir)
+        store = open_confidence_store(job_name, data_dir)
+    return store
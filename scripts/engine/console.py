@@ -0,0 +1,57 @@
+"""Terminal output helpers shared by the notebook cells."""
+import contextlib
+import sys
+import threading
+import time
+
+
+# ANSI color codes for colored output
+class Color:
+    CYAN = "\033[96m"
+    GREEN = "\033[92m"
+    YELLOW = "\033[93m"
+    RED = "\033[91m"
+    BLUE = "\033[94m"
+    MAGENTA = "\033[95m"
+    RESET = "\033[0m"
+
+
+def loader(msg, stop_event, progress=None):
+    """Displays a CLI loading animation, followed by the live progress if given."""
+    symbols = ["⠋","⠙","⠹","⠸","⠼","⠴","⠦","⠧","⠇","⠏"]
+    i = 0
+    width = 0
+    while not stop_event.is_set():
+        line = f"{msg} {progress.describe()}" if progress else msg
+        width = max(width, len(line))
+        sys.stdout.write(f"\r[{symbols[i % len(symbols)]}] {line.ljust(width)}   ")
+        sys.stdout.flush()
+        time.sleep(0.1)
+        i += 1
+    sys.stdout.write("\r" + " " * (width + 10) + "\r")
+    sys.stdout.flush()
+
+
+@contextlib.contextmanager
+def spinner(msg, progress=None):
+    """Runs `loader` in a background thread for the duration of the block."""
+    stop_event = threading.Event()
+    t = threading.Thread(target=loader, args=(msg, stop_event, progress))
+    t.start()
+    try:
+        yield
+    finally:
+        stop_event.set()
+        t.join()
+
+
+def ok(msg):
+    print(f"[{Color.GREEN}✔{Color.RESET}] {msg}")
+
+
+def fail(msg):
+    print(f"[{Color.RED}✘{Color.RESET}] {msg}")
+
+
+def warn(msg):
+    print(f"[{Color.YELLOW}!{Color.RESET}] {msg}")
@@ -0,0 +1,198 @@
+"""Inter-chain residue contacts of a model from a cell-list neighbor search.
+
+Heavy atoms are hashed into cubic cells as wide as the cutoff, so every pair
+within the cutoff lies in the same or a neighboring cell. Each cell is
+compared with itself and its 13 forward neighbors, all atoms at once per
+offset, so the work grows with the number of atoms rather than its square.
+Atom pairs between different chains are then folded into token pairs
+(residues and ligand atoms, as in the token map) with their minimum
+distance.
+
+The contacts of a model are cached as `{job}_model_{i}_contacts.npz`, tagged
+with the model file and cutoff like the token map. Joined with the PAE of the
+two tokens they give the confident contacts of each chain pair, which is what
+the report lists.
+"""
+import os
+
+from . import artifacts
+from .params import DATA_DIR
+from .predictions import model_file, predictions_dir
+from .structure import read_structure
+from .token_map import MOL_TYPES, load_token_map, model_source
+
+CONTACTS_VERSION = 1
+# Heavy-atom distance (Å) below which two residues are in contact
+DEFAULT_CONTACT_CUTOFF = 5.0
+# Mean PAE (Å) of the two directions below which a contact counts as confident
+DEFAULT_CONTACT_MAX_PAE = 10.0
+_ARRAYS = ("token_a", "token_b", "distance", "labels")
+
+
+def _offsets():
+    """The cell itself and the 13 neighbors that come after it, so each cell pair is visited once."""
+    import numpy as np
+
+    grid = np.stack(np.meshgrid([-1, 0, 1], [-1, 0, 1], [-1, 0, 1], indexing="ij"), axis=-1).reshape(-1, 3)
+    forward = [tuple(o) for o in grid if tuple(o) > (0, 0, 0)]
+    return np.array([(0, 0, 0)] + forward, dtype=np.int64)
+
+
+def neighbor_pairs(xyz, cutoff, groups=None):
+    """Atom pairs (i < j) closer than `cutoff`, with their distances.
+
+    With `groups` (one label per atom) only pairs from different groups are
+    returned. Returns three arrays: i, j and the distance.
+    """
+    import numpy as np
+
+    xyz = np.asarray(xyz, dtype=np.float64)
+    if len(xyz) < 2:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros(0, dtype=np.float32)
+    cells = np.floor((xyz - xyz.min(axis=0)) / cutoff).astype(np.int64)
+    dims = cells.max(axis=0) + 1
+    key = (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
+    order = np.argsort(key, kind="stable")
+    key, cells, points = key[order], cells[order], xyz[order]
+    group = None if groups is None else np.asarray(groups)[order]
+    occupied, starts, counts = np.unique(key, return_index=True, return_counts=True)
+    atoms = np.arange(len(key))
+
+    found_i, found_j, found_d = [], [], []
+    for offset in _offsets():
+        neighbor = cells + offset
+        inside = np.all((neighbor >= 0) & (neighbor < dims), axis=1)
+        neighbor_key = (neighbor[:, 0] * dims[1] + neighbor[:, 1]) * dims[2] + neighbor[:, 2]
+        slot = np.minimum(np.searchsorted(occupied, neighbor_key), len(occupied) - 1)
+        hit = inside & (occupied[slot] == neighbor_key)
+        a, slot = atoms[hit], slot[hit]
+        n_candidates = counts[slot]
+        # Pair every atom with every atom of its neighbor cell
+        i = np.repeat(a, n_candidates)
+        run_start = np.cumsum(n_candidates) - n_candidates
+        j = np.repeat(starts[slot] - run_start, n_candidates) + np.arange(n_candidates.sum())
+        keep = j > i if not offset.any() else np.ones(len(i), dtype=bool)
+        if group is not None:
+            keep &= group[i] != group[j]
+        i, j = i[keep], j[keep]
+        d = np.sqrt(((points[i] - points[j]) ** 2).sum(axis=1))
+        close = d < cutoff
+        found_i.append(order[i[close]])
+        found_j.append(order[j[close]])
+        found_d.append(d[close].astype(np.float32))
+    i, j, d = np.concatenate(found_i), np.concatenate(found_j), np.concatenate(found_d)
+    swap = i > j
+    i[swap], j[swap] = j[swap], i[swap]
+    return i, j, d
+
+
+def atom_tokens(token_map, n_atoms):
+    """Token index of every atom of the model; -1 for atoms outside any token (e.g. ligand hydrogens)."""
+    import numpy as np
+
+    start, stop = token_map["atom_start"], token_map["atom_stop"]
+    owner = np.full(n_atoms, -1, dtype=np.int64)
+    lengths = stop - start
+    tokens = np.repeat(np.arange(len(start)), lengths)
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    owner[np.repeat(start, lengths) + offsets] = tokens
+    return owner
+
+
+def token_labels(structure, token_map):
+    """Residue name and number of each polymer token (e.g. LYS45), atom name of each ligand token."""
+    import numpy as np
+
+    first = token_map["atom_start"]
+    ligand = token_map["mol_type"] == MOL_TYPES.index("ligand")
+    residues = np.char.add(structure["res_name"][first], token_map["resseq"].astype(str))
+    return np.where(ligand, structure["atom_name"][first], residues)
+
+
+def token_contacts(structure, token_map, cutoff=DEFAULT_CONTACT_CUTOFF):
+    """Inter-chain token contacts: token pairs (a < b) with a heavy-atom pair closer than `cutoff`.
+
+    Returns `token_a`, `token_b`, their minimum heavy-atom `distance` and the
+    `labels` of all tokens (see token_labels).
+    """
+    import numpy as np
+
+    owner = atom_tokens(token_map, len(structure["chain"]))
+    heavy = np.flatnonzero((owner >= 0) & (structure["element"] != "H"))
+    i, j, d = neighbor_pairs(structure["xyz"][heavy], cutoff, token_map["chain"][owner[heavy]])
+    a, b = owner[heavy[i]], owner[heavy[j]]
+    a, b = np.minimum(a, b), np.maximum(a, b)
+    # One entry per token pair, at its closest atom pair
+    pair = a * len(token_map["chain"]) + b
+    order = np.lexsort((d, pair))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = pair[order][1:] != pair[order][:-1]
+    keep = order[first]
+    return {"token_a": a[keep], "token_b": b[keep], "distance": d[keep],
+            "labels": token_labels(structure, token_map)}
+
+
+def contacts_file(job_name, model_id, data_dir=DATA_DIR):
+    return f"{predictions_dir(job_name, data_dir)}/{job_name}_model_{model_id}_contacts.npz"
+
+
+def load_contacts(job_name, model_id, cutoff=DEFAULT_CONTACT_CUTOFF, token_map=None, data_dir=DATA_DIR):
+    """Returns the inter-chain contacts of a model, computing and caching them if needed."""
+    import numpy as np
+
+    source = model_source(job_name, model_id, data_dir)
+    path = contacts_file(job_name, model_id, data_dir)
+    if source is not None:
+        try:
+            with np.load(path) as data:
+                if (int(data["version"]) == CONTACTS_VERSION and str(data["source"]) == source
+                        and float(data["cutoff"]) == cutoff):
+                    return {key: data[key] for key in _ARRAYS}
+        except (OSError, KeyError, ValueError):
+            pass
+    if token_map is None:
+        token_map = load_token_map(job_name, model_id, data_dir)
+    contacts = token_contacts(read_structure(model_file(job_name, model_id, data_dir)), token_map, cutoff)
+    if source is not None:
+        with open(f"{path}.tmp", 'wb') as f:
+            np.savez(f, version=CONTACTS_VERSION, source=source, cutoff=cutoff, **contacts)
+        os.replace(f"{path}.tmp", path)
+        artifacts.add_artifacts(job_name, [path], data_dir)
+    return contacts
+
+
+def contact_pae(contacts, pae):
+    """Mean PAE of the two directions of every contact."""
+    a, b = contacts["token_a"], contacts["token_b"]
+    return (pae[a, b].astype("float32") + pae[b, a]) / 2
+
+
+def chain_pair_contacts(contacts, token_map, pae, max_pae=DEFAULT_CONTACT_MAX_PAE):
+    """Contacts of each chain pair, with the residues that make its confident ones.
+
+    Returns {(chain_a, chain_b): {"contacts", "confident", "residues_a",
+    "residues_b"}}, chain pairs in token-map order and residues in sequence
+    order.
+    """
+    import numpy as np
+
+    chain_ids = token_map["chain_ids"].tolist()
+    chain = token_map["chain"]
+    confident = contact_pae(contacts, pae) <= max_pae
+    a, b = contacts["token_a"], contacts["token_b"]
+    # Name each pair by its chains in token-map order
+    swap = chain[a] > chain[b]
+    a, b = np.where(swap, b, a), np.where(swap, a, b)
+    ca, cb = chain[a], chain[b]
+    pairs = {}
+    for x, y in sorted(set(zip(ca.tolist(), cb.tolist()))):
+        in_pair = (ca == x) & (cb == y)
+        sure = in_pair & confident
+        pairs[(chain_ids[x], chain_ids[y])] = {
+            "contacts": int(in_pair.sum()),
+            "confident": int(sure.sum()),
+            "residues_a": contacts["labels"][np.unique(a[sure])].tolist(),
+            "residues_b": contacts["labels"][np.unique(b[sure])].tolist(),
+        }
+    return pairs
@@ -0,0 +1,59 @@
+"""Copy to Drive and zip download of a job's results, driven by its artifact manifest."""
+import os
+
+from .artifacts import refresh_manifest, sync_artifacts, zip_artifacts
+from .console import Color, fail, ok, warn
+from .params import DATA_DIR, RUN_PARAMS_FILE, load_run_params
+
+DRIVE_RESULTS_DIR = "/content/drive/MyDrive/Boltz2_Results"
+ZIP_DIR = "/content"
+
+
+def _job_name(params_filepath):
+    return load_run_params(params_filepath).get("job_name", "boltz2_job")
+
+
+def _size_mb(manifest):
+    return manifest.get("total_bytes", 0) / 2 ** 20
+
+
+def _load(job_name):
+    """Returns the job's manifest brought up to date with its folder, or None without results."""
+    manifest, unlisted = refresh_manifest(job_name)
+    if manifest is None:
+        fail(f"No results found for job '{job_name}' in {DATA_DIR}.")
+    elif unlisted:
+        shown = ", ".join(unlisted[:5]) + (", ..." if len(unlisted) > 5 else "")
+        warn(f"{len(unlisted)} files written after the manifest were added to it: {shown}")
+    return manifest
+
+
+def copy_to_drive(params_filepath=RUN_PARAMS_FILE, drive_dir=DRIVE_RESULTS_DIR):
+    """Entry point of the Copy Results to Drive cell; returns the job name."""
+    from .colab import mount_drive
+
+    job_name = _job_name(params_filepath)
+    manifest = _load(job_name)
+    if manifest is None:
+        return job_name
+    mount_drive()
+    drive_output_dir = f"{drive_dir}/{job_name}"
+    # Files whose size and modification time match the copy already on Drive are skipped
+    copied, skipped = sync_artifacts(job_name, drive_output_dir)
+    ok(f"{copied} files copied ({skipped} unchanged, {_size_mb(manifest):.1f} MB in total).")
+    print(f"{Color.GREEN}All results copied to Google Drive: {drive_output_dir}{Color.RESET}")
+    return job_name
+
+
+def download_zip(params_filepath=RUN_PARAMS_FILE, zip_dir=ZIP_DIR):
+    """Entry point of the Download Results (.zip) cell; returns the job name."""
+    from .colab import download_file
+
+    job_name = _job_name(params_filepath)
+    manifest = _load(job_name)
+    if manifest is None:
+        return job_name
+    zip_file = zip_artifacts(job_name, os.path.join(zip_dir, f"{job_name}.zip"))
+    download_file(zip_file)
+    print(f"{Color.GREEN}Download successful! All results from '{job_name}' are saved in '{zip_file}'{Color.RESET}")
+    return job_name
@@ -0,0 +1,192 @@
+"""On-disk store of per-sequence MSAs, so repeated proteins skip the MSA server.
+
+MSAs that boltz fetched from the server are harvested after a successful run
+and stored under a hash of the protein sequence. Later jobs with the same
+protein get the stored file injected as the `msa:` path in their YAML, and
+boltz only queries the server for the sequences that are still missing.
+
+Paired MSAs depend on the partner chains, so only jobs with a single distinct
+protein sequence (monomers, homo-oligomers, protein-ligand complexes) read
+from or write to the store.
+"""
+import csv
+import glob
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+
+from .params import DATA_DIR
+
+MSA_STORE_DIR = f"{DATA_DIR}/.msa_store"
+DEFAULT_MSA_STORE_MAX_GB = 5
+MSA_EXTENSIONS = (".csv", ".a3m")
+
+
+def normalize_sequence(sequence):
+    return re.sub(r"\s+", "", str(sequence)).upper()
+
+
+def sequence_key(sequence):
+    """Returns the store key of a protein sequence."""
+    return hashlib.sha256(normalize_sequence(sequence).encode("utf-8")).hexdigest()
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def msa_query_sequence(path):
+    """Returns the first (query) sequence of a boltz CSV or A3M alignment."""
+    with open(path, 'r') as f:
+        if path.endswith(".csv"):
+            for row in csv.DictReader(f):
+                return normalize_sequence(row.get("sequence", "")).replace("-", "")
+        else:
+            lines = []
+            for line in f:
+                if line.startswith(">"):
+                    if lines:
+                        break
+                    continue
+                lines.append(line.strip())
+            return normalize_sequence("".join(lines)).replace("-", "")
+    return ""
+
+
+class MSAStore:
+    """An LRU-evicted, size-capped directory of MSAs keyed by sequence hash."""
+
+    def __init__(self, store_dir=MSA_STORE_DIR, max_gb=DEFAULT_MSA_STORE_MAX_GB):
+        self.store_dir = store_dir
+        self.max_bytes = int(float(max_gb) * 1024 ** 3)
+
+    def _meta_file(self, key):
+        return os.path.join(self.store_dir, f"{key}.json")
+
+    def _read_meta(self, key):
+        try:
+            with open(self._meta_file(key), 'r') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def _write_meta(self, key, meta):
+        meta_file = self._meta_file(key)
+        with open(f"{meta_file}.tmp", 'w') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(f"{meta_file}.tmp", meta_file)
+
+    def remove(self, key):
+        for path in glob.glob(os.path.join(self.store_dir, f"{key}.*")):
+            os.remove(path)
+
+    def lookup(self, sequence):
+        """Returns the stored MSA path for a sequence, or None on a miss or corrupt entry."""
+        key = sequence_key(sequence)
+        meta = self._read_meta(key)
+        if meta is None:
+            return None
+        path = os.path.join(self.store_dir, meta["filename"])
+        if (not os.path.exists(path) or _file_sha256(path) != meta["sha256"]
+                or meta["sequence"] != normalize_sequence(sequence)):
+            self.remove(key)
+            return None
+        meta["last_used"] = time.time()
+        meta["hits"] = meta.get("hits", 0) + 1
+        self._write_meta(key, meta)
+        return path
+
+    def store(self, sequence, msa_path):
+        """Copies an MSA file into the store after checking its query sequence."""
+        sequence = normalize_sequence(sequence)
+        extension = os.path.splitext(msa_path)[1].lower()
+        if extension not in MSA_EXTENSIONS or msa_query_sequence(msa_path) != sequence:
+            return None
+        os.makedirs(self.store_dir, exist_ok=True)
+        key = sequence_key(sequence)
+        filename = f"{key}{extension}"
+        path = os.path.join(self.store_dir, filename)
+        shutil.copyfile(msa_path, f"{path}.tmp")
+        os.replace(f"{path}.tmp", path)
+        now = time.time()
+        self._write_meta(key, {
+            "sequence": sequence,
+            "filename": filename,
+            "sha256": _file_sha256(path),
+            "size": os.path.getsize(path),
+            "created": now,
+            "last_used": now,
+            "hits": 0,
+        })
+        self.evict()
+        return path
+
+    def evict(self):
+        """Removes least recently used MSAs until the store fits in its size cap."""
+        if not os.path.isdir(self.store_dir):
+            return []
+        entries = []
+        for meta_file in glob.glob(os.path.join(self.store_dir, "*.json")):
+            key = os.path.basename(meta_file)[:-len(".json")]
+            meta = self._read_meta(key)
+            if meta is not None:
+                entries.append((key, meta))
+        entries.sort(key=lambda item: item[1]["last_used"])
+        total = sum(meta["size"] for _, meta in entries)
+        removed = []
+        while entries and total > self.max_bytes:
+            key, meta = entries.pop(0)
+            self.remove(key)
+            total -= meta["size"]
+            removed.append(key)
+        return removed
+
+
+def _protein_entries(data):
+    return [entry["protein"] for entry in data.get("sequences", []) if "protein" in entry]
+
+
+def inject_cached_msas(param_file, store):
+    """Points protein entries of a job YAML at stored MSAs; returns the injected paths."""
+    import yaml
+    with open(param_file, 'r') as f:
+        data = yaml.safe_load(f) or {}
+    proteins = _protein_entries(data)
+    sequences = {normalize_sequence(p.get("sequence", "")) for p in proteins}
+    if len(sequences) != 1 or any("msa" in p for p in proteins):
+        return []
+    path = store.lookup(sequences.pop())
+    if path is None:
+        return []
+    for protein in proteins:
+        protein["msa"] = path
+    with open(param_file, 'w') as f:
+        yaml.safe_dump(data, f, sort_keys=False, default_flow_style=None)
+    return [path]
+
+
+def harvest_msas(param_file, output_path, job_name, store):
+    """Stores the server-generated MSAs of a finished single-protein job."""
+    import yaml
+    with open(param_file, 'r') as f:
+        data = yaml.safe_load(f) or {}
+    proteins = _protein_entries(data)
+    sequences = {normalize_sequence(p.get("sequence", "")) for p in proteins}
+    if len(sequences) != 1 or any("msa" in p for p in proteins):
+        return []
+    sequence = sequences.pop()
+    stored = []
+    for msa_file in glob.glob(f"{output_path}/boltz_results_{job_name}/msa/*.csv"):
+        if msa_query_sequence(msa_file) == sequence:
+            path = store.store(sequence, msa_file)
+            if path:
+                stored.append(path)
+            break
+    return stored
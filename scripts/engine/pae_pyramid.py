@@ -0,0 +1,119 @@
+"""Multi-resolution pyramid of a PAE matrix.
+
+A PAE heatmap is drawn into a few hundred pixels, so drawing every token of a
+4,000-token complex only costs memory and rasterisation time. The pyramid
+holds the symmetrized matrix at full resolution (level 0) and block-reduced
+copies at 2x, 4x, ... coarser levels, each block being the mean (or min) of
+the tokens it covers. The report draws the coarsest level that still has at
+least one block per output pixel and skips level 0 when it is not drawn;
+zoom-in exports of a small region draw from the full-resolution level.
+"""
+PAE_REDUCTIONS = ("mean", "min")
+DEFAULT_MIN_SIZE = 64
+
+
+def symmetrize_pae(pae):
+    """Returns `pae + pae.T` with the original diagonal, as float32, with a single temporary."""
+    import numpy as np
+
+    sym = np.add(pae, pae.T, dtype=np.float32)
+    sym[np.diag_indices_from(sym)] = np.diagonal(pae)
+    return sym
+
+
+def _pairs(matrix, axis, ufunc):
+    """Combines neighbouring rows (axis 0) or columns (axis 1); an odd last one is kept as is."""
+    index = (slice(None),) * axis
+    out = matrix[index + (slice(0, None, 2),)].copy()
+    odd = matrix[index + (slice(1, None, 2),)]
+    head = out[index + (slice(0, odd.shape[axis]),)]
+    ufunc(head, odd, out=head)
+    return out
+
+
+def _weights(n):
+    import numpy as np
+
+    return _pairs(np.ones(n, dtype=np.float32), 0, np.add)
+
+
+def halve(matrix, how="mean", weights=None):
+    """Reduces 2 x 2 blocks of a square matrix; the last block may be partial.
+
+    `weights` are the number of tokens behind each row/column of `matrix`
+    (from an earlier reduction), so means of means stay exact. Returns the
+    reduced matrix and the weights of its rows/columns.
+    """
+    import numpy as np
+
+    if how not in PAE_REDUCTIONS:
+        raise ValueError(f"Unknown PAE reduction '{how}'; use one of {', '.join(PAE_REDUCTIONS)}.")
+    new_weights = _pairs(weights if weights is not None else np.ones(matrix.shape[0], dtype=np.float32), 0, np.add)
+    if how == "min":
+        return _pairs(_pairs(matrix, 0, np.minimum), 1, np.minimum), new_weights
+    weighted = matrix * np.outer(weights, weights) if weights is not None else matrix
+    sums = _pairs(_pairs(weighted, 0, np.add), 1, np.add)
+    return sums / np.outer(new_weights, new_weights), new_weights
+
+
+def _symmetric_half_mean(pae):
+    """First reduced level of the symmetrized mean, built from `pae` without symmetrizing it.
+
+    Block sums of `pae + pae.T` are `S + S.T` for the block sums `S` of `pae`;
+    diagonal blocks then count their diagonal once instead of twice.
+    """
+    import numpy as np
+
+    sums = _pairs(_pairs(pae.astype(np.float32, copy=False), 0, np.add), 1, np.add)
+    sym = sums + sums.T
+    sym[np.diag_indices_from(sym)] -= _pairs(np.diagonal(pae).astype(np.float32), 0, np.add)
+    weights = _weights(pae.shape[0])
+    return sym / np.outer(weights, weights), weights
+
+
+def build_pae_pyramid(pae, how="mean", min_size=DEFAULT_MIN_SIZE, keep_full=True):
+    """Returns the pyramid levels of a (raw, asymmetric) PAE matrix, finest first.
+
+    Each level is a dict with `block` (tokens per block side) and `pae`. Levels
+    halve the resolution until the matrix is at most `min_size` blocks wide.
+    With `keep_full=False` the full-resolution level is left out when the next
+    level is still at least `min_size` wide; mean reductions then never build
+    the symmetrized full matrix.
+    """
+    half_size = -(-pae.shape[0] // 2)
+    skip_full = not keep_full and half_size >= min_size
+    if skip_full and how == "mean":
+        half, weights = _symmetric_half_mean(pae)
+        levels = [{"block": 2, "pae": half}]
+    else:
+        levels, weights = [{"block": 1, "pae": symmetrize_pae(pae)}], None
+    while levels[-1]["pae"].shape[0] > min_size:
+        reduced, weights = halve(levels[-1]["pae"], how, weights)
+        levels.append({"block": levels[-1]["block"] * 2, "pae": reduced})
+    if skip_full and levels[0]["block"] == 1:
+        levels = levels[1:]
+    return levels
+
+
+def level_for_pixels(levels, pixels, n_tokens):
+    """Picks the coarsest level that still has at least `pixels` blocks across `n_tokens`."""
+    chosen = levels[0]
+    for level in levels[1:]:
+        if -(-n_tokens // level["block"]) < pixels:
+            break
+        chosen = level
+    return chosen
+
+
+def pae_region(levels, start, stop, pixels, n_tokens):
+    """Crops tokens [start, stop) of both axes from the level matching `pixels`.
+
+    Small regions come from the full-resolution level. Returns the cropped
+    matrix and its extent in token coordinates (for `imshow(extent=...)`).
+    """
+    level = level_for_pixels(levels, pixels, stop - start)
+    block = level["block"]
+    first, last = start // block, -(-stop // block)
+    region = level["pae"][first:last, first:last]
+    low, high = first * block - 0.5, min(last * block, n_tokens) - 0.5
+    return region, (low, high, low, high)
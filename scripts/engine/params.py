@@ -0,0 +1,66 @@
+"""Run parameter parsing and `boltz predict` command construction."""
+import re
+
+DATA_DIR = "/content/boltz_data"
+RUN_PARAMS_FILE = f"{DATA_DIR}/run_params.txt"
+
+# Defaults used when a key is missing from run_params.txt
+DEFAULT_RUN_PARAMS = {
+    "job_name": "boltz2_job",
+    "use_potentials": False,
+    "override": False,
+    "recycling_steps": 3,
+    "sampling_steps": 50,
+    "diffusion_samples": 1,
+    "step_scale": 10.0,
+    "max_msa_seqs": 254,
+    "msa_pairing_strategy": "unpaired_paired",
+}
+
+
+def parse_value(value_str):
+    """Converts a string value from the params file to the appropriate Python type."""
+    value_str = value_str.strip()
+    if value_str.lower() == 'true': return True
+    if value_str.lower() == 'false': return False
+    if value_str.startswith('"') and value_str.endswith('"'): return value_str[1:-1]
+    try:
+        return float(value_str) if '.' in value_str else int(value_str)
+    except ValueError:
+        return value_str
+
+
+def load_run_params(params_filepath=RUN_PARAMS_FILE):
+    """Reads a `key = value` params file, filling in defaults for missing keys."""
+    params = dict(DEFAULT_RUN_PARAMS)
+    with open(params_filepath, 'r') as f:
+        for line in f:
+            if '=' in line:
+                key, value_str = line.split('=', 1)
+                params[key.strip()] = parse_value(value_str)
+    return params
+
+
+def prepare_job_yaml(source_file, param_file):
+    """Copies a job YAML, folding `sequence: |-` block scalars onto a single line."""
+    with open(source_file, 'r') as f:
+        text = f.read()
+    text = re.sub(r'sequence: \|-\n\s*', 'sequence: ', text)
+    with open(param_file, 'w') as f:
+        f.write(text)
+    return param_file
+
+
+def build_predict_command(param_file, out_dir, params):
+    """Builds the `boltz predict` argument list for a job YAML and its run parameters."""
+    p = {**DEFAULT_RUN_PARAMS, **params}
+    cmd = [
+        "boltz", "predict", param_file, "--use_msa_server", "--out_dir", out_dir,
+        "--recycling_steps", str(p["recycling_steps"]), "--sampling_steps", str(p["sampling_steps"]),
+        "--diffusion_samples", str(p["diffusion_samples"]), "--step_scale", str(p["step_scale"]),
+        "--max_msa_seqs", str(p["max_msa_seqs"]), "--msa_pairing_strategy", p["msa_pairing_strategy"],
+        "--output_format", "pdb"
+    ]
+    if p["use_potentials"]: cmd.append("--use_potentials")
+    if p["override"]: cmd.append("--override")
+    return cmd
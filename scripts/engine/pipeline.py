@@ -0,0 +1,71 @@
+"""Prefetch of MSAs and processed inputs ahead of GPU inference.
+
+boltz has no preprocess-only command, but it skips inputs whose processed
+records already exist in the output directory. The prefetch stage runs
+`boltz predict` with `--accelerator cpu` and stops it as soon as the processed
+manifest is written, before any inference. The later GPU run of the same job
+finds the processed inputs and MSAs there and starts straight at inference.
+
+The batch queue runs prefetch and inference as a two-stage pipeline: one
+prefetch worker stays at most `prefetch_depth` jobs ahead of the inference
+workers, blocking (backpressure) when that many prefetched jobs are waiting.
+"""
+import json
+import os
+import shutil
+import threading
+
+from .params import build_predict_command
+from .stream import run_streaming
+
+POLL_INTERVAL = 0.2
+
+
+def processed_paths(output_path, job_name):
+    root = f"{output_path}/boltz_results_{job_name}/processed"
+    return f"{root}/manifest.json", f"{root}/records/{job_name}.json"
+
+
+def processed_ready(output_path, job_name):
+    """True when boltz has finished writing the processed inputs of a job."""
+    manifest, record = processed_paths(output_path, job_name)
+    if not (os.path.exists(manifest) and os.path.exists(record)):
+        return False
+    # The manifest is the last file written; a partial one does not parse yet
+    try:
+        with open(manifest, 'r') as f:
+            json.load(f)
+    except (OSError, ValueError):
+        return False
+    return True
+
+
+def prefetch_inputs(param_file, job_name, output_path, params, log_file, poll_interval=POLL_INTERVAL):
+    """Runs the MSA and preprocessing stages of a job on the CPU; True if the processed inputs exist.
+
+    `output_path` is the directory that holds `boltz_results_{job}`, i.e. the
+    `--out_dir` the inference run will use.
+    """
+    if processed_ready(output_path, job_name):
+        return True
+    os.makedirs(output_path, exist_ok=True)
+    cmd = build_predict_command(param_file, output_path, params) + ["--accelerator", "cpu"]
+    done = threading.Event()
+
+    def watch(proc):
+        def poll():
+            while not done.wait(poll_interval):
+                if proc.poll() is not None:
+                    return
+                if processed_ready(output_path, job_name):
+                    proc.terminate()
+                    return
+        threading.Thread(target=poll, name="prefetch-watch", daemon=True).start()
+
+    try:
+        run_streaming(cmd, log_file, on_start=watch)
+    finally:
+        done.set()
+    # A CPU run that got as far as writing predictions must not be mistaken for the GPU result
+    shutil.rmtree(f"{output_path}/boltz_results_{job_name}/predictions", ignore_errors=True)
+    return processed_ready(output_path, job_name)
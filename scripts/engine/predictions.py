@@ -0,0 +1,109 @@
+"""Discovery and loading of the models boltz wrote for a job.
+
+boltz writes one `{job}_model_{i}.pdb` per diffusion sample (ranked by
+confidence, model 0 first), with matching `plddt_`, `pae_` and `confidence_`
+files. They are looked up in the job's artifact manifest. Confidence arrays of
+all samples are loaded as stacked NumPy arrays so per-sample metrics are
+computed in one vectorized pass; when the job has a confidence store they are
+memory-mapped from it instead of decompressed (see confidence_store.py).
+"""
+import json
+
+from . import artifacts
+from .params import DATA_DIR
+
+
+def predictions_dir(job_name, data_dir=DATA_DIR):
+    return f"{data_dir}/{job_name}/boltz_results_{job_name}/predictions/{job_name}"
+
+
+def model_file(job_name, model_id, data_dir=DATA_DIR):
+    """Path of a model PDB from the manifest (boltz's path for a model that is not listed)."""
+    path = artifacts.artifact_path(job_name, "model", int(model_id), data_dir, ext=".pdb")
+    return path or f"{predictions_dir(job_name, data_dir)}/{job_name}_model_{model_id}.pdb"
+
+
+def model_ids(job_name, data_dir=DATA_DIR):
+    """Returns the ids of every model PDB of the job, in numeric order."""
+    return [i for i in artifacts.model_ids(job_name, data_dir)
+            if artifacts.artifact_path(job_name, "model", i, data_dir, ext=".pdb")]
+
+
+def model_files(job_name, data_dir=DATA_DIR):
+    return [model_file(job_name, i, data_dir) for i in model_ids(job_name, data_dir)]
+
+
+def _positions(ids, store_ids):
+    """Indexes samples of the store: a slice (a view) when they are consecutive."""
+    positions = [store_ids.index(model_id) for model_id in ids]
+    if positions == list(range(positions[0], positions[-1] + 1)):
+        return slice(positions[0], positions[-1] + 1)
+    return positions
+
+
+def load_confidence_stack(job_name, ids=None, data_dir=DATA_DIR):
+    """Loads the pLDDT and PAE arrays of several samples.
+
+    Returns a dict with `model_ids`, `plddt` (samples x tokens, on a 0-100
+    scale), `pae` (samples x tokens x tokens) and `summaries` (the parsed
+    confidence JSON of each sample, or {} when boltz did not write one).
+    With an up-to-date confidence store, `pae` is a read-only view of the
+    memory-mapped file (float16 if the store was written so) when `ids` are
+    consecutive in the store's numeric order; any other order copies them.
+    """
+    import numpy as np
+
+    from .confidence_store import open_confidence_store
+
+    ids = model_ids(job_name, data_dir) if ids is None else list(ids)
+    store = open_confidence_store(job_name, data_dir)
+    if store is not None and ids and set(ids) <= set(store["model_ids"]):
+        positions = _positions(ids, store["model_ids"])
+        plddt = store["plddt"][positions] * np.float32(100)
+        pae = np.asarray(store["pae"][positions])
+    else:
+        plddt, pae = [], []
+        for model_id in ids:
+            plddt_file = artifacts.artifact_path(job_name, "plddt", model_id, data_dir)
+            pae_file = artifacts.artifact_path(job_name, "pae", model_id, data_dir)
+            for kind, f in (("pLDDT", plddt_file), ("PAE", pae_file)):
+                if f is None:
+                    raise FileNotFoundError(f"No {kind} file for model {model_id} of '{job_name}'")
+            with np.load(plddt_file) as data:
+                plddt.append(data["plddt"])
+            with np.load(pae_file) as data:
+                pae.append(data["pae"])
+        plddt = np.stack(plddt).astype(np.float32) * 100
+        pae = np.stack(pae).astype(np.float32)
+    summaries = []
+    for model_id in ids:
+        confidence_file = artifacts.artifact_path(job_name, "confidence", model_id, data_dir)
+        summary = {}
+        if confidence_file:
+            with open(confidence_file, 'r') as f:
+                summary = json.load(f)
+        summaries.append(summary)
+    return {
+        "model_ids": ids,
+        "plddt": np.asarray(plddt, dtype=np.float32),
+        "pae": pae,
+        "summaries": summaries,
+    }
+
+
+def token_index(indices):
+    """Indexes a chain's tokens: a slice (so blocks are views) when they are contiguous."""
+    import numpy as np
+
+    if isinstance(indices, slice):
+        return indices
+    indices = np.asarray(indices)
+    if len(indices) and indices[-1] - indices[0] == len(indices) - 1 and np.all(np.diff(indices) == 1):
+        return slice(int(indices[0]), int(indices[-1]) + 1)
+    return indices
+
+
+def token_block(matrix, indices):
+    """The square block of a tokens x tokens matrix over `indices`; a view when they are contiguous."""
+    idx = token_index(indices)
+    return matrix[idx, idx] if isinstance(idx, slice) else matrix[idx[:, None], idx[None, :]]
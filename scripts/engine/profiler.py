@@ -0,0 +1,244 @@
+"""Per-stage resource profile of the boltz subprocess.
+
+A background thread samples the child's process tree from /proc at a fixed
+interval: CPU time (including reaped children), resident memory and, when
+`nvidia-smi` is available, GPU memory in use. Each sample is tagged with the
+boltz stage parsed from the output stream, so a slow or killed run shows which
+stage used the time and memory. The timeline is rewritten to disk every few
+samples, so it survives a run that is killed part-way.
+"""
+import json
+import os
+import shutil
+import subprocess
+import threading
+import time
+
+DEFAULT_INTERVAL = 1.0
+AUTOSAVE_EVERY = 10
+UNKNOWN_STAGE = "Starting"
+
+
+def _clock_ticks():
+    try:
+        return os.sysconf("SC_CLK_TCK")
+    except (ValueError, OSError, AttributeError):
+        return 100
+
+
+def _page_size():
+    try:
+        return os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return 4096
+
+
+def available():
+    """True where /proc can be sampled (Linux)."""
+    return os.path.isdir("/proc/self")
+
+
+def _proc_table():
+    """Returns {pid: (ppid, cpu_ticks, rss_pages)} for every readable process."""
+    table = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", 'r') as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The command name may contain spaces and parentheses; fields follow the last ')'
+        fields = stat[stat.rfind(")") + 2:].split()
+        if len(fields) < 22:
+            continue
+        cpu_ticks = sum(int(v) for v in fields[11:15])  # utime, stime, cutime, cstime
+        table[int(entry)] = (int(fields[1]), cpu_ticks, int(fields[21]))
+    return table
+
+
+def _tree(table, root):
+    children = {}
+    for pid, (ppid, _, _) in table.items():
+        children.setdefault(ppid, []).append(pid)
+    pids, stack = [], [root]
+    while stack:
+        pid = stack.pop()
+        if pid in table:
+            pids.append(pid)
+            stack.extend(children.get(pid, []))
+    return pids
+
+
+def gpu_memory_mb():
+    """Returns the GPU memory in use (MB, summed over devices), or None without nvidia-smi."""
+    if shutil.which("nvidia-smi") is None:
+        return None
+    try:
+        out = subprocess.run(["nvidia-smi", "--query-gpu=memory.used", "--format=csv,noheader,nounits"],
+                             capture_output=True, text=True, timeout=5, check=True).stdout
+        return sum(float(v) for v in out.split())
+    except (subprocess.SubprocessError, OSError, ValueError):
+        return None
+
+
+class ResourceProfiler:
+    """Samples a process tree in the background until `stop()` is called."""
+
+    def __init__(self, out_file=None, interval=DEFAULT_INTERVAL, stage_fn=None):
+        self.out_file = out_file
+        self.interval = interval
+        self.stage_fn = stage_fn or (lambda: None)
+        self.samples = []
+        self.pid = None
+        self.returncode = None
+        self._ticks = _clock_ticks()
+        self._page = _page_size()
+        self._gpu = shutil.which("nvidia-smi") is not None
+        self._stop = threading.Event()
+        self._thread = None
+        self._started = None
+
+    def start(self, proc):
+        """Starts sampling a running `subprocess.Popen` (usable as an `on_start` hook)."""
+        if not available():
+            return
+        self.pid = proc.pid
+        self._started = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="resource-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self, returncode=None):
+        """Takes a last sample, stops the thread and writes the timeline; returns it."""
+        self.returncode = returncode
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            # After the join so it cannot race the thread; a no-op once the tree has exited
+            self.sample()
+        timeline = self.timeline()
+        self.save()
+        return timeline
+
+    def _run(self):
+        while True:
+            self.sample()
+            if len(self.samples) % AUTOSAVE_EVERY == 0:
+                self.save()
+            if self._stop.wait(self.interval):
+                return
+
+    def sample(self):
+        table = _proc_table()
+        pids = _tree(table, self.pid)
+        if not pids:
+            return None
+        cpu_s = sum(table[pid][1] for pid in pids) / self._ticks
+        now = round(time.monotonic() - self._started, 2)
+        previous = self.samples[-1] if self.samples else None
+        cpu_pct = None
+        if previous and now > previous["t"]:
+            cpu_pct = round(100 * max(0.0, cpu_s - previous["cpu_s"]) / (now - previous["t"]), 1)
+        record = {
+            "t": now,
+            "stage": self.stage_fn() or UNKNOWN_STAGE,
+            "cpu_s": round(cpu_s, 2),
+            "cpu_pct": cpu_pct,
+            "rss_mb": round(sum(table[pid][2] for pid in pids) * self._page / 2 ** 20, 1),
+            "gpu_mb": gpu_memory_mb() if self._gpu else None,
+            "procs": len(pids),
+        }
+        self.samples.append(record)
+        return record
+
+    def stage_summary(self):
+        """Returns per-stage duration, CPU seconds and peak memory, in stage order."""
+        stages = []
+        for i, s in enumerate(self.samples):
+            if not stages or stages[-1]["stage"] != s["stage"]:
+                stages.append({"stage": s["stage"], "start": s["t"], "end": s["t"], "cpu_start": s["cpu_s"],
+                               "cpu_s": 0.0, "peak_rss_mb": 0.0, "peak_gpu_mb": None})
+            stage = stages[-1]
+            stage["end"] = self.samples[i + 1]["t"] if i + 1 < len(self.samples) else s["t"]
+            stage["cpu_s"] = round(s["cpu_s"] - stage["cpu_start"], 2)
+            stage["peak_rss_mb"] = max(stage["peak_rss_mb"], s["rss_mb"])
+            if s["gpu_mb"] is not None:
+                stage["peak_gpu_mb"] = max(stage["peak_gpu_mb"] or 0.0, s["gpu_mb"])
+        for stage in stages:
+            stage["duration_s"] = round(stage["end"] - stage["start"], 2)
+            del stage["cpu_start"]
+        return stages
+
+    def timeline(self):
+        return {
+            "pid": self.pid,
+            "interval": self.interval,
+            "returncode": self.returncode,
+            "samples": list(self.samples),
+            "stages": self.stage_summary(),
+        }
+
+    def save(self):
+        if not self.out_file or not self.samples:
+            return
+        with open(f"{self.out_file}.tmp", 'w') as f:
+            json.dump(self.timeline(), f, indent=2)
+        os.replace(f"{self.out_file}.tmp", self.out_file)
+
+
+def plot_timeline(timeline, png_file=None):
+    """Draws RSS/GPU memory and CPU use over time, shaded by stage; returns PNG bytes."""
+    import io
+    from matplotlib.figure import Figure
+
+    samples = timeline["samples"]
+    t = [s["t"] for s in samples]
+    fig = Figure(figsize=(10, 4))
+    mem_ax = fig.add_subplot(2, 1, 1)
+    cpu_ax = fig.add_subplot(2, 1, 2, sharex=mem_ax)
+    mem_ax.plot(t, [s["rss_mb"] for s in samples], color="#1976d2", label="RSS")
+    if any(s["gpu_mb"] is not None for s in samples):
+        mem_ax.plot(t, [s["gpu_mb"] or 0 for s in samples], color="#d32f2f", label="GPU")
+    mem_ax.set_ylabel("Memory (MB)")
+    mem_ax.legend(loc="upper left", fontsize=8)
+    cpu_ax.plot(t, [s["cpu_pct"] or 0 for s in samples], color="#388e3c")
+    cpu_ax.set_ylabel("CPU (%)")
+    cpu_ax.set_xlabel("Time (s)")
+    shades = ["#f5f5f5", "#e3f2fd"]
+    for i, stage in enumerate(timeline["stages"]):
+        for ax in (mem_ax, cpu_ax):
+            ax.axvspan(stage["start"], max(stage["end"], stage["start"] + 1e-3), color=shades[i % 2], zorder=0)
+        mem_ax.text(stage["start"], 1.02, stage["stage"], transform=mem_ax.get_xaxis_transform(), fontsize=8)
+    fig.tight_layout()
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=110)
+    if png_file:
+        with open(png_file, 'wb') as f:
+            f.write(buf.getvalue())
+    return buf.getvalue()
+
+
+def resource_section_html(timeline, png_file=None):
+    """Returns the report section with the resource plot and a per-stage table."""
+    import base64
+    import html
+
+    if not timeline or not timeline["samples"]:
+        return ""
+    plot_b64 = base64.b64encode(plot_timeline(timeline, png_file)).decode("utf-8")
+    rows = ""
+    for stage in timeline["stages"]:
+        gpu = f"{stage['peak_gpu_mb']:.0f}" if stage["peak_gpu_mb"] is not None else "-"
+        rows += (f"<tr><td>{html.escape(stage['stage'])}</td><td>{stage['duration_s']:.1f}</td>"
+                 f"<td>{stage['cpu_s']:.1f}</td><td>{stage['peak_rss_mb']:.0f}</td><td>{gpu}</td></tr>")
+    return f"""
+    <div class="section">
+        <h2>Resource Usage</h2>
+        <img src="data:image/png;base64,{plot_b64}" alt="Resource timeline" style="max-width:100%;">
+        <table class="report-table">
+            <tr><th>Stage</th><th>Duration (s)</th><th>CPU (s)</th><th>Peak RSS (MB)</th><th>Peak GPU (MB)</th></tr>
+            {rows}
+        </table>
+    </div>
+    """
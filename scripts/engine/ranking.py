@@ -0,0 +1,207 @@
+"""Confidence-based ranking of the models of a job or a whole screening campaign.
+
+boltz orders its samples by its own confidence score, which is not always the
+metric a user cares about (e.g. ligand pLDDT for a docking screen). Each model
+gets a set of metrics scaled so that higher is better:
+
+    confidence_score, ptm, iptm, ligand_iptm, protein_iptm  (confidence JSON)
+    plddt          mean pLDDT / 100
+    ligand_plddt   mean pLDDT of ligand tokens / 100
+    interface_pae  1 - mean inter-chain PAE / PAE_MAX
+    pae            1 - mean PAE / PAE_MAX
+
+The composite score is the weighted mean of the metrics a model has; metrics
+it lacks (no ligand, no confidence JSON) are left out of its mean. Metrics of
+all samples of a job are computed in one pass over the stacked arrays, and the
+cached token map of model 0 (see token_map.py) serves every sample, so ranking
+thousands of models never parses a PDB per model.
+
+The ranked manifest is written to `boltz_results_{job}/ranking.json`.
+"""
+import json
+import os
+
+from .interface import chain_codes
+from .params import DATA_DIR
+from .predictions import load_confidence_stack, model_file, model_ids, predictions_dir
+from .token_map import ligand_mask, load_token_map, token_chains
+
+# boltz clips PAE at 31.75 Å
+PAE_MAX = 31.75
+SUMMARY_METRICS = ["confidence_score", "ptm", "iptm", "ligand_iptm", "protein_iptm"]
+ARRAY_METRICS = ["plddt", "ligand_plddt", "interface_pae", "pae"]
+METRICS = SUMMARY_METRICS + ARRAY_METRICS
+DEFAULT_WEIGHTS = {"iptm": 0.4, "ligand_plddt": 0.3, "interface_pae": 0.3}
+MANIFEST_VERSION = 1
+
+
+def parse_weights(value):
+    """Parses ranking weights from a dict or a "metric:weight, ..." string."""
+    if not value:
+        return dict(DEFAULT_WEIGHTS)
+    if isinstance(value, dict):
+        weights = {key: float(weight) for key, weight in value.items()}
+    else:
+        weights = {}
+        for item in str(value).split(","):
+            key, _, weight = item.partition(":")
+            weights[key.strip()] = float(weight) if weight.strip() else 1.0
+    unknown = set(weights) - set(METRICS)
+    if unknown:
+        raise ValueError(f"Unknown ranking metrics: {', '.join(sorted(unknown))}. Choose from {', '.join(METRICS)}.")
+    return weights
+
+
+def compute_metrics(stack, chains, ligand):
+    """Returns a (samples x METRICS) array of metrics; NaN where a metric does not apply."""
+    import numpy as np
+
+    n_samples, n_tokens = stack["plddt"].shape
+    metrics = np.full((n_samples, len(METRICS)), np.nan, dtype=np.float64)
+    for j, key in enumerate(SUMMARY_METRICS):
+        metrics[:, j] = [summary.get(key, np.nan) for summary in stack["summaries"]]
+    plddt, pae = stack["plddt"], stack["pae"]
+    offset = len(SUMMARY_METRICS)
+    # The one pass over every PAE matrix; the inter-chain mean reuses it
+    pae_sums = pae.sum(axis=(1, 2), dtype=np.float64)
+    metrics[:, offset + 3] = 1 - pae_sums / pae.shape[1] ** 2 / PAE_MAX
+    if len(chains) != n_tokens:
+        # Token map does not match the arrays (e.g. modified residues); keep the per-token metrics out
+        return metrics
+    metrics[:, offset] = plddt.mean(axis=1) / 100
+    if ligand.any():
+        metrics[:, offset + 1] = plddt[:, ligand].mean(axis=1) / 100
+    inter_chain_pae = mean_inter_chain_pae(pae, chains, pae_sums)
+    if inter_chain_pae is not None:
+        metrics[:, offset + 2] = 1 - inter_chain_pae / PAE_MAX
+    return metrics
+
+
+def mean_inter_chain_pae(pae, chains, pae_sums=None):
+    """Mean PAE over the inter-chain token pairs of each sample, or None for a single chain.
+
+    The whole-matrix sum (`pae_sums` when already computed) minus the sums of
+    the intra-chain diagonal blocks, so no samples x N^2 mask or copy is built.
+    """
+    import numpy as np
+
+    labels, codes = chain_codes(chains)
+    sizes = np.bincount(codes, minlength=len(labels))
+    n_pairs = len(codes) ** 2 - int((sizes ** 2).sum())
+    if n_pairs == 0:
+        return None
+    intra = np.zeros(pae.shape[0], dtype=np.float64)
+    if np.all(np.diff(codes) >= 0):
+        # boltz's tokens are grouped by chain: the diagonal blocks are views
+        bounds = np.concatenate(([0], np.cumsum(sizes)))
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            intra += pae[:, start:stop, start:stop].sum(axis=(1, 2), dtype=np.float64)
+    else:
+        for code in range(len(labels)):
+            idx = np.flatnonzero(codes == code)
+            intra += pae[:, idx[:, None], idx].sum(axis=(1, 2), dtype=np.float64)
+    if pae_sums is None:
+        pae_sums = pae.sum(axis=(1, 2), dtype=np.float64)
+    return (pae_sums - intra) / n_pairs
+
+
+def composite_scores(metrics, weights):
+    """Weighted mean of the available metrics of each row."""
+    import numpy as np
+
+    w = np.array([weights.get(key, 0.0) for key in METRICS])
+    available = ~np.isnan(metrics) & (w != 0)
+    total = (np.where(available, metrics, 0.0) * w).sum(axis=1)
+    norm = (available * np.abs(w)).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(norm > 0, total / norm, np.nan)
+
+
+def manifest_path(job_name, data_dir=DATA_DIR):
+    return f"{data_dir}/{job_name}/boltz_results_{job_name}/ranking.json"
+
+
+def _entries(job_name, ids, metrics, scores, data_dir):
+    import numpy as np
+
+    entries = []
+    for i, model_id in enumerate(ids):
+        entries.append({
+            "job_name": job_name,
+            "model_id": int(model_id),
+            "pdb_file": model_file(job_name, model_id, data_dir),
+            "score": None if np.isnan(scores[i]) else round(float(scores[i]), 6),
+            "metrics": {key: round(float(v), 6) for key, v in zip(METRICS, metrics[i]) if not np.isnan(v)},
+        })
+    return entries
+
+
+def _sort_and_number(entries):
+    # Unscored models go last; ties keep boltz's own order
+    entries.sort(key=lambda e: (e["score"] is None, -(e["score"] or 0.0), e["job_name"], e["model_id"]))
+    for rank, entry in enumerate(entries, start=1):
+        entry["rank"] = rank
+    return entries
+
+
+def rank_job(job_name, weights=None, data_dir=DATA_DIR, write=True):
+    """Ranks every model of a job and writes the ranked manifest; returns it."""
+    weights = parse_weights(weights)
+    ids = model_ids(job_name, data_dir)
+    if not ids:
+        raise FileNotFoundError(f"No model PDB files in {predictions_dir(job_name, data_dir)}")
+    stack = load_confidence_stack(job_name, ids, data_dir)
+    token_map = load_token_map(job_name, ids[0], data_dir)
+    chains, ligand = token_chains(token_map), ligand_mask(token_map)
+    metrics = compute_metrics(stack, chains, ligand)
+    entries = _sort_and_number(_entries(job_name, ids, metrics, composite_scores(metrics, weights), data_dir))
+    manifest = {"version": MANIFEST_VERSION, "job_name": job_name, "weights": weights, "models": entries}
+    if write:
+        path = manifest_path(job_name, data_dir)
+        with open(f"{path}.tmp", 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(f"{path}.tmp", path)
+    return manifest
+
+
+def read_ranking(job_name, data_dir=DATA_DIR):
+    """Returns the ranked manifest of a job, or None if it has not been ranked."""
+    try:
+        with open(manifest_path(job_name, data_dir), 'r') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def ranked_model_ids(job_name, weights=None, data_dir=DATA_DIR):
+    """Model ids best first; falls back to boltz's order if the job cannot be ranked."""
+    if not model_ids(job_name, data_dir):
+        return []
+    try:
+        return [entry["model_id"] for entry in rank_job(job_name, weights, data_dir)["models"]]
+    except (FileNotFoundError, KeyError, ValueError) as e:
+        print(f"Warning: Could not rank models of '{job_name}' ({e}). Using Boltz's order.")
+        return model_ids(job_name, data_dir)
+
+
+def rank_campaign(job_names, weights=None, data_dir=DATA_DIR, out_file=None):
+    """Ranks the models of many jobs against each other.
+
+    Each job is ranked (and its manifest written) on its own, so only one job's
+    PAE stack is in memory at a time; the per-job entries are then merged.
+    Jobs without models are reported under `skipped`.
+    """
+    weights = parse_weights(weights)
+    entries, skipped = [], []
+    for job_name in job_names:
+        try:
+            entries.extend(rank_job(job_name, weights, data_dir)["models"])
+        except FileNotFoundError as e:
+            skipped.append({"job_name": job_name, "error": str(e)})
+    manifest = {"version": MANIFEST_VERSION, "weights": weights,
+                "models": _sort_and_number(entries), "skipped": skipped}
+    if out_file:
+        with open(f"{out_file}.tmp", 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(f"{out_file}.tmp", out_file)
+    return manifest
@@ -0,0 +1,138 @@
+"""Content-addressed cache of rendered analysis figures.
+
+A figure is keyed by a hash of the arrays it is drawn from, its kind, and
+every setting that changes the pixels (chain id, colors, size, dpi, the
+matplotlib version). Re-running the Analyse Results cell on unchanged
+predictions then reads the PNGs back instead of drawing them again. Entries
+are single PNG files; the cache is capped in size and evicts the least
+recently used files.
+"""
+import base64
+import hashlib
+import json
+import os
+
+from .params import DATA_DIR
+
+RENDER_CACHE_DIR = f"{DATA_DIR}/.render_cache"
+# Bump when the drawing code changes, so stale figures are not served.
+RENDER_VERSION = 2
+DEFAULT_RENDER_CACHE_MAX_MB = 500
+
+
+def _matplotlib_version():
+    try:
+        from importlib.metadata import version
+        return version("matplotlib")
+    except Exception:
+        return None
+
+
+def render_key(kind, arrays=(), **settings):
+    """Hashes the input arrays (dtype, shape and bytes) and the render settings of a figure."""
+    import numpy as np
+
+    digest = hashlib.sha256()
+    header = {"version": RENDER_VERSION, "matplotlib": _matplotlib_version(), "kind": kind, "settings": settings}
+    digest.update(json.dumps(header, sort_keys=True, default=str).encode("utf-8"))
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        digest.update(f"{array.dtype.str}{array.shape}".encode("utf-8"))
+        digest.update(array.data)
+    return digest.hexdigest()
+
+
+def _write_bytes(path, data):
+    with open(f"{path}.tmp", 'wb') as f:
+        f.write(data)
+    os.replace(f"{path}.tmp", path)
+
+
+class RenderCache:
+    """An LRU-evicted, size-capped store of PNG bytes; `enabled=False` renders every time."""
+
+    def __init__(self, cache_dir=RENDER_CACHE_DIR, max_mb=DEFAULT_RENDER_CACHE_MAX_MB, enabled=True):
+        self.cache_dir = cache_dir
+        self.max_bytes = int(float(max_mb) * 1024 ** 2)
+        self.enabled = enabled
+        self.hits = self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.png")
+
+    def get(self, key):
+        """Returns the cached PNG bytes, or None on a miss."""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            self.misses += 1
+            return None
+        os.utime(path)  # last use, for eviction
+        self.hits += 1
+        return data
+
+    def put(self, key, data):
+        """Stores PNG bytes; call `evict` once the report is done to enforce the size cap."""
+        if not self.enabled:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        _write_bytes(self._path(key), data)
+
+    def evict(self):
+        """Removes least recently used figures until the cache fits in its size cap."""
+        try:
+            names = [n for n in os.listdir(self.cache_dir) if n.endswith(".png")]
+        except OSError:
+            return []
+        entries = []
+        for name in names:
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        removed = []
+        while entries and total > self.max_bytes:
+            _, size, name = entries.pop(0)
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                pass
+            total -= size
+            removed.append(name)
+        return removed
+
+    def png(self, key, render, filename=None):
+        """Returns a figure's PNG base64-encoded, rendering it only on a miss.
+
+        `render` is called without arguments and returns the PNG bytes. The
+        bytes are also written to `filename` unless it already holds them.
+        """
+        data = self.get(key)
+        if data is None:
+            data = render()
+            self.put(key, data)
+        return write_png(filename, data)
+
+
+def _same_file(path, data):
+    try:
+        if os.path.getsize(path) != len(data):
+            return False
+        with open(path, 'rb') as f:
+            return f.read() == data
+    except OSError:
+        return False
+
+
+def write_png(filename, data):
+    """Writes PNG bytes to `filename` (unless it already holds them); returns them base64-encoded."""
+    if filename and not _same_file(filename, data):
+        _write_bytes(filename, data)
+    return base64.b64encode(data).decode('utf-8')
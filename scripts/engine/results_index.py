@@ -0,0 +1,412 @@
+"""Cross-job results index of the whole workspace in one SQLite file.
+
+Every job folder under the data directory (one holding `boltz_results_{job}`)
+gets a row in `jobs`, and so does every sweep variant and screened ligand,
+keyed by its folder path (`{job}_sweep/v00/{job}`, `{job}_screen/jobs/lig*`).
+The row holds its run parameters, runtime, the metrics and composite score
+of its best-ranked model, its affinity prediction and its best chain
+interface. That model's per-chain pLDDT statistics go to `chains`,
+and its chain-pair interface summaries to `interfaces`. Parameters and
+metrics are plain columns, so the dashboard filters and sorts with indexed SQL
+instead of opening every job.
+
+Updates are incremental. A job is skipped while its manifest and run record
+keep their mtime and size. When they change, only a changed fingerprint
+(the manifest entries of the prediction files plus the run record) re-reads
+the job, so plots added to a manifest do not. Jobs that are gone are
+dropped; a change of ranking weights re-scores everything.
+"""
+import datetime
+import hashlib
+import html
+import json
+import os
+import re
+import sqlite3
+
+from . import artifacts
+from .interface import interface_matrices, interface_pairs
+from .params import DATA_DIR, DEFAULT_RUN_PARAMS, RUN_PARAMS_FILE, load_run_params, parse_value
+from .predictions import load_confidence_stack, model_ids
+from .ranking import METRICS, parse_weights, rank_job
+from .token_map import chain_plddt_stats, ligand_mask, load_token_map, token_chains
+
+INDEX_FILE = f"{DATA_DIR}/results_index.sqlite"
+INDEX_VERSION = 2
+# Run parameters that change a prediction, one column each
+PARAM_COLUMNS = [key for key in DEFAULT_RUN_PARAMS if key not in ("job_name", "override")]
+AFFINITY_COLUMNS = ["affinity_pred_value", "affinity_probability_binary"]
+# Manifest kinds whose change means the job's results changed (plots, reports and derived files do not)
+RESULT_KINDS = ("model", "plddt", "pae", "confidence", "affinity")
+DEFAULT_SORT = "score"
+DEFAULT_LIMIT = 100
+_SQL_TYPES = {bool: "INTEGER", int: "INTEGER", float: "REAL", str: "TEXT"}
+_FILTER_CLAUSE = re.compile(r"^\s*(\w+)\s*(>=|<=|!=|=|>|<)\s*(.+?)\s*$")
+
+JOB_COLUMNS = {
+    "job_name": "TEXT PRIMARY KEY", "status": "TEXT", "n_models": "INTEGER", "n_tokens": "INTEGER",
+    "n_chains": "INTEGER", "runtime_s": "REAL", "attempts": "INTEGER", "cached": "INTEGER",
+    "finished_at": "TEXT", "best_model": "INTEGER", "score": "REAL",
+    **{key: "REAL" for key in METRICS},
+    **{key: "REAL" for key in AFFINITY_COLUMNS},
+    "best_interface": "TEXT", "best_interface_iptm": "REAL",
+    **{key: _SQL_TYPES[type(DEFAULT_RUN_PARAMS[key])] for key in PARAM_COLUMNS},
+    "params": "TEXT", "stat": "TEXT", "fingerprint": "TEXT", "indexed_at": "TEXT",
+}
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS jobs ({", ".join(f"{name} {kind}" for name, kind in JOB_COLUMNS.items())});
+CREATE TABLE IF NOT EXISTS chains (
+    job_name TEXT, model_id INTEGER, chain_id TEXT, mol_type TEXT, n_tokens INTEGER,
+    mean_plddt REAL, pct_confident REAL, pct_very_high REAL, PRIMARY KEY (job_name, chain_id));
+CREATE TABLE IF NOT EXISTS interfaces (
+    job_name TEXT, model_id INTEGER, chain_a TEXT, chain_b TEXT, iptm REAL, mean_pae REAL, min_pae REAL,
+    PRIMARY KEY (job_name, chain_a, chain_b));
+CREATE INDEX IF NOT EXISTS jobs_score ON jobs (score);
+CREATE INDEX IF NOT EXISTS chains_plddt ON chains (mean_plddt);
+CREATE INDEX IF NOT EXISTS interfaces_iptm ON interfaces (iptm);
+"""
+
+
+def run_record_file(job_name, data_dir=DATA_DIR):
+    return f"{artifacts.job_dir(job_name, data_dir)}/{job_name}_run.json"
+
+
+def write_run_record(job_name, params, attempts, cached=False, data_dir=DATA_DIR):
+    """Records the settings and runtime of a finished run next to its results.
+
+    `params` are the settings of the last attempt (those that produced the
+    result); the runtime is the sum of all attempts.
+    """
+    record = {
+        "job_name": job_name,
+        "params": {key: params[key] for key in PARAM_COLUMNS if key in params},
+        "attempts": len(attempts),
+        "runtime_s": round(sum(a["duration_s"] for a in attempts), 2),
+        "returncode": attempts[-1]["returncode"] if attempts else 0,
+        "cached": cached,
+        "finished_at": datetime.datetime.now().isoformat(timespec="seconds"),
+    }
+    path = run_record_file(job_name, data_dir)
+    with open(f"{path}.tmp", 'w') as f:
+        json.dump(record, f, indent=2)
+    os.replace(f"{path}.tmp", path)
+    return record
+
+
+def _read_json(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def _run_info(job_name, data_dir):
+    """Run record of a job; falls back to the attempts file of runs that predate records."""
+    record = _read_json(run_record_file(job_name, data_dir))
+    if record is not None:
+        return record
+    attempts = _read_json(f"{artifacts.job_dir(job_name, data_dir)}/{job_name}_attempts.json")
+    if not attempts:
+        return {}
+    return {"params": attempts[-1]["params"], "attempts": len(attempts),
+            "runtime_s": round(sum(a["duration_s"] for a in attempts), 2),
+            "returncode": attempts[-1]["returncode"]}
+
+
+def _job_folders(folder, prefix=""):
+    """Job folders (those holding `boltz_results_{name}`) directly under `folder`, prefixed."""
+    try:
+        with os.scandir(folder) as entries:
+            return [prefix + e.name for e in entries
+                    if e.is_dir() and os.path.isdir(f"{e.path}/boltz_results_{e.name}")]
+    except OSError:
+        return []
+
+
+def job_names(data_dir=DATA_DIR):
+    """Job folders of `data_dir` as paths relative to it, sorted.
+
+    Top-level jobs are their name; sweep variants (the folders listed in
+    sweep.json) and screened ligands are `{job}_sweep/vNN/{job}` and
+    `{job}_screen/jobs/{ligand job}`.
+    """
+    names = _job_folders(data_dir)
+    with os.scandir(data_dir) as entries:
+        folders = sorted(e.name for e in entries if e.is_dir())
+    for folder in folders:
+        if folder.endswith("_sweep"):
+            sweep = _read_json(f"{data_dir}/{folder}/sweep.json") or {}
+            for variant in sweep.get("variants", []):
+                names += _job_folders(f"{data_dir}/{folder}/{variant['name']}", f"{folder}/{variant['name']}/")
+        elif folder.endswith("_screen") and os.path.isfile(f"{data_dir}/{folder}/screen.sqlite"):
+            names += _job_folders(f"{data_dir}/{folder}/jobs", f"{folder}/jobs/")
+    return sorted(names)
+
+
+def _split_job(data_dir, path):
+    """Job name and data directory of a job path from job_names."""
+    folder, _, name = path.rpartition("/")
+    return name, f"{data_dir}/{folder}" if folder else data_dir
+
+
+def _stat(job_name, data_dir):
+    """mtime and size of the files whose change can mean new results."""
+    parts = []
+    for path in (artifacts.manifest_path(job_name, data_dir), run_record_file(job_name, data_dir),
+                 f"{artifacts.job_dir(job_name, data_dir)}/{job_name}_attempts.json"):
+        try:
+            st = os.stat(path)
+            parts.append(f"{st.st_mtime_ns}:{st.st_size}")
+        except OSError:
+            parts.append("-")
+    return "|".join(parts)
+
+
+def _fingerprint(job_name, data_dir):
+    """Hash of the job's result files (from the manifest) and its run record."""
+    manifest = artifacts.load_manifest(job_name, data_dir)
+    digest = hashlib.sha256()
+    for entry in manifest["artifacts"] if manifest else []:
+        if entry["kind"] in RESULT_KINDS:
+            digest.update(f"{entry['path']}:{entry['size']}:{entry['sha256']}\n".encode("utf-8"))
+    digest.update(json.dumps(_run_info(job_name, data_dir), sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def summarize_job(job_name, weights=None, data_dir=DATA_DIR):
+    """Reads one job into its `jobs` row and its `chains` and `interfaces` rows."""
+    run = _run_info(job_name, data_dir)
+    params = run.get("params", {})
+    row = {"job_name": job_name, "n_models": len(model_ids(job_name, data_dir)),
+           "runtime_s": run.get("runtime_s"), "attempts": run.get("attempts"),
+           "cached": int(bool(run.get("cached"))) if run else None, "finished_at": run.get("finished_at"),
+           "params": json.dumps(params, sort_keys=True),
+           **{key: params.get(key) for key in PARAM_COLUMNS}}
+    if not row["n_models"]:
+        row["status"] = "failed" if run.get("returncode") else "no models"
+        return row, [], []
+
+    row["status"] = "done"
+    best = rank_job(job_name, weights, data_dir, write=False)["models"][0]
+    row.update(best_model=best["model_id"], score=best["score"], **best["metrics"])
+    affinity = _read_json(artifacts.artifact_path(job_name, "affinity", None, data_dir) or "")
+    if affinity:
+        row.update({key: affinity.get(key) for key in AFFINITY_COLUMNS})
+
+    stack = load_confidence_stack(job_name, [best["model_id"]], data_dir)
+    token_map = load_token_map(job_name, best["model_id"], data_dir)
+    n_tokens = stack["plddt"].shape[1]
+    row.update(n_tokens=n_tokens, n_chains=len(token_map["chain_ids"]))
+    if len(token_map["chain"]) != n_tokens:
+        # Token map does not match the arrays; keep the job-level metrics only
+        return row, [], []
+    chains = [{"job_name": job_name, "model_id": best["model_id"], "chain_id": chain_id,
+               "mol_type": stats["mol_type"], "n_tokens": stats["n_tokens"],
+               "mean_plddt": float(stats["mean_plddt"][0]), "pct_confident": float(stats["pct_confident"][0]),
+               "pct_very_high": float(stats["pct_very_high"][0])}
+              for chain_id, stats in chain_plddt_stats(token_map, stack["plddt"]).items()]
+    pairs = []
+    if len(chains) > 1:
+        matrices = interface_matrices(stack["pae"][0], token_chains(token_map), ligand_mask(token_map))
+        pairs = [{"job_name": job_name, "model_id": best["model_id"], **pair} for pair in interface_pairs(matrices)]
+        row.update(best_interface=f"{pairs[0]['chain_a']}-{pairs[0]['chain_b']}", best_interface_iptm=pairs[0]["iptm"])
+    return row, chains, pairs
+
+
+def parse_filter(text, columns=JOB_COLUMNS):
+    """Turns "iptm > 0.7, ligand_plddt >= 0.6" (clauses joined by "," or "and") into SQL and arguments."""
+    clauses, args = [], []
+    for part in re.split(r",|\band\b", str(text or ""), flags=re.IGNORECASE):
+        if not part.strip():
+            continue
+        match = _FILTER_CLAUSE.match(part)
+        if not match or match.group(1) not in columns:
+            raise ValueError(f"Cannot filter on '{part.strip()}'; use <column> <op> <value> with a column "
+                             f"of: {', '.join(columns)}.")
+        column, op, value = match.groups()
+        clauses.append(f"{column} {op} ?")
+        args.append(parse_value(value))
+    return " AND ".join(clauses), args
+
+
+class ResultsIndex:
+    """The workspace's results index; `update()` brings it in line with the job folders."""
+
+    def __init__(self, path=INDEX_FILE, data_dir=DATA_DIR, weights=None):
+        self.path = path
+        self.data_dir = data_dir
+        self.weights = parse_weights(weights)
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        version = self._meta("version")
+        if version is not None and int(version) != INDEX_VERSION:
+            self.conn.executescript("DROP TABLE IF EXISTS jobs; DROP TABLE IF EXISTS chains; "
+                                    "DROP TABLE IF EXISTS interfaces; DROP TABLE IF EXISTS meta;")
+        self.conn.executescript(SCHEMA)
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (str(INDEX_VERSION),))
+
+    def _meta(self, key):
+        try:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        except sqlite3.OperationalError:
+            return None
+        return row[0] if row else None
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _store(self, row, chains, pairs):
+        with self.conn:
+            self._delete(row["job_name"])
+            names = [name for name in JOB_COLUMNS if name in row]
+            self.conn.execute(f"INSERT INTO jobs ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})",
+                              [row[name] for name in names])
+            for table, rows in (("chains", chains), ("interfaces", pairs)):
+                if rows:
+                    names = list(rows[0])
+                    self.conn.executemany(
+                        f"INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})",
+                        [[r[name] for name in names] for r in rows])
+
+    def _delete(self, job_name):
+        for table in ("jobs", "chains", "interfaces"):
+            self.conn.execute(f"DELETE FROM {table} WHERE job_name = ?", (job_name,))
+
+    def update(self, on_error=None):
+        """Indexes new and changed jobs and drops removed ones; returns the counts per outcome."""
+        weights = json.dumps(self.weights, sort_keys=True)
+        rescore = self._meta("weights") != weights
+        known = {r["job_name"]: (r["stat"], r["fingerprint"])
+                 for r in self.conn.execute("SELECT job_name, stat, fingerprint FROM jobs")}
+        names = job_names(self.data_dir)
+        counts = {"added": 0, "updated": 0, "unchanged": 0, "removed": 0, "failed": 0}
+        for path in names:
+            job_name, data_dir = _split_job(self.data_dir, path)
+            stat = _stat(job_name, data_dir)
+            if not rescore and known.get(path, (None,))[0] == stat:
+                counts["unchanged"] += 1
+                continue
+            fingerprint = None
+            try:
+                fingerprint = _fingerprint(job_name, data_dir)
+                if not rescore and path in known and known[path][1] == fingerprint:
+                    with self.conn:
+                        self.conn.execute("UPDATE jobs SET stat = ? WHERE job_name = ?",
+                                          (_stat(job_name, data_dir), path))
+                    counts["unchanged"] += 1
+                    continue
+                row, chains, pairs = summarize_job(job_name, self.weights, data_dir)
+            except Exception as e:
+                # Any damaged output (truncated npz, bad zip, short arrays) fails this job only.
+                # Kept as an error row, so the job is not read again until it changes
+                row, chains, pairs = {"status": "error"}, [], []
+                counts["failed"] += 1
+                if on_error:
+                    on_error(path, e)
+            # Rows of sweep variants and screened ligands are keyed by their path, not the bare job name
+            for r in (row, *chains, *pairs):
+                r["job_name"] = path
+            # Reading the job can add derived files (token maps) to its manifest; record the state after
+            row.update(stat=_stat(job_name, data_dir), fingerprint=fingerprint,
+                       indexed_at=datetime.datetime.now().isoformat(timespec="seconds"))
+            self._store(row, chains, pairs)
+            if row["status"] != "error":
+                counts["updated" if path in known else "added"] += 1
+        with self.conn:
+            for job_name in set(known) - set(names):
+                self._delete(job_name)
+                counts["removed"] += 1
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('weights', ?)", (weights,))
+        return counts
+
+    def jobs(self, where=None, order_by=DEFAULT_SORT, descending=True, limit=None):
+        """Job rows matching a filter (see parse_filter), sorted by a column with missing values last."""
+        if order_by not in JOB_COLUMNS:
+            raise ValueError(f"Cannot sort by '{order_by}'; use one of: {', '.join(JOB_COLUMNS)}.")
+        clause, args = parse_filter(where)
+        sql = f"SELECT * FROM jobs {'WHERE ' + clause if clause else ''} "
+        sql += f"ORDER BY {order_by} IS NULL, {order_by} {'DESC' if descending else 'ASC'}, job_name"
+        if limit:
+            sql += " LIMIT ?"
+            args.append(int(limit))
+        return [dict(r) for r in self.conn.execute(sql, args)]
+
+    def chains(self, job_names):
+        """Per-chain rows of the given jobs, as {job name: [rows in chain order]}."""
+        found = {name: [] for name in job_names}
+        if found:
+            sql = f"SELECT * FROM chains WHERE job_name IN ({', '.join('?' * len(found))}) ORDER BY job_name, rowid"
+            for r in self.conn.execute(sql, list(found)):
+                found[r["job_name"]].append(dict(r))
+        return found
+
+
+def _cell(value, fmt="{:.3f}"):
+    if value is None:
+        return "<td>-</td>"
+    return f"<td>{fmt.format(value) if isinstance(value, float) else html.escape(str(value))}</td>"
+
+
+def index_table_html(rows, chains, total, where, order_by):
+    """The dashboard table: one row per job, best model first, with its chains' pLDDT."""
+    body = ""
+    for r in rows:
+        status_class = "ok" if r["status"] == "done" else "err"
+        chain_text = " · ".join(f"{c['chain_id']}{' (lig)' if c['mol_type'] == 'ligand' else ''} "
+                                f"{c['mean_plddt']:.1f}" for c in chains.get(r["job_name"], []))
+        interface = (f"{r['best_interface']} ({r['best_interface_iptm']:.2f})"
+                     if r["best_interface"] else None)
+        body += (f"<tr><td>{html.escape(r['job_name'])}</td><td class=\"{status_class}\">{r['status']}</td>"
+                 + _cell(r["n_models"]) + _cell(r["n_tokens"]) + _cell(r["runtime_s"], "{:.0f}")
+                 + _cell(r["best_model"]) + _cell(r["score"]) + _cell(r["iptm"]) + _cell(r["plddt"])
+                 + _cell(r["ligand_plddt"]) + _cell(r["interface_pae"]) + _cell(interface)
+                 + _cell(r["affinity_pred_value"], "{:.2f}") + _cell(r["affinity_probability_binary"])
+                 + _cell(r["recycling_steps"]) + _cell(r["sampling_steps"]) + _cell(r["diffusion_samples"])
+                 + f"<td>{html.escape(chain_text)}</td></tr>")
+    shown = f"{len(rows)} of {total} jobs" + (f" matching <code>{html.escape(where)}</code>" if where else "")
+    return f"""
+<style>
+    .index-table {{ font-family: 'Roboto', sans-serif; border-collapse: collapse; margin: 10px; }}
+    .index-table th, .index-table td {{ border: 1px solid #e0e0e0; padding: 6px 12px; text-align: left; }}
+    .index-table th {{ background-color: #f5f5f5; color: #145ABE; }}
+    .index-table .ok {{ color: #388e3c; font-weight: bold; }}
+    .index-table .err {{ color: #d32f2f; font-weight: bold; }}
+</style>
+<h3>Results index: {shown}, sorted by {html.escape(order_by)}</h3>
+<table class="index-table">
+    <tr><th>Job</th><th>Status</th><th>Models</th><th>Tokens</th><th>Runtime (s)</th><th>Best Model</th>
+        <th>Score</th><th>ipTM</th><th>pLDDT</th><th>Ligand pLDDT</th><th>Interface PAE</th>
+        <th>Best Interface</th><th>Affinity</th><th>Binding Prob.</th><th>Recycling</th><th>Sampling</th>
+        <th>Samples</th><th>Chain pLDDT</th></tr>
+    {body}
+</table>
+"""
+
+
+def main(params_filepath=RUN_PARAMS_FILE):
+    """Entry point of the Results Index cell; returns the index file."""
+    from .colab import display_html
+    from .console import Color, warn
+
+    params = load_run_params(params_filepath)
+    where = params.get("index_filter", "")
+    order_by = params.get("index_sort", DEFAULT_SORT)
+    with ResultsIndex(params.get("index_file", INDEX_FILE), weights=params.get("ranking_weights")) as index:
+        counts = index.update(on_error=lambda job_name, e: warn(f"Could not index '{job_name}': {e}"))
+        print(f"{Color.CYAN}[i] Results index: {counts['added']} added, {counts['updated']} updated, "
+              f"{counts['unchanged']} unchanged, {counts['removed']} removed, {counts['failed']} unreadable "
+              f"({index.path}).{Color.RESET}")
+        total = index.conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+        rows = index.jobs(where, order_by, descending=params.get("index_descending", True),
+                          limit=params.get("index_limit", DEFAULT_LIMIT))
+        display_html(index_table_html(rows, index.chains([r["job_name"] for r in rows]), total, where, order_by))
+        return index.path
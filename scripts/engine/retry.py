@@ -0,0 +1,156 @@
+"""Failure classification and retry policy for `boltz predict` runs.
+
+The common failures are a CUDA (or host) out-of-memory on large complexes and
+timeouts or errors from the remote MSA server. The first is fixed by asking
+for less: each OOM moves one step down a ladder of reduced run parameters.
+The second is transient: the same run is retried after an exponential
+backoff. Anything else (bad input, a crash we do not recognize) is final.
+
+Every attempt is recorded with its parameters, failure class, duration and
+log file, so the report can show how the result was obtained.
+"""
+import os
+import re
+import time
+
+OOM = "oom"
+MSA_ERROR = "msa"
+ERROR = "error"
+
+# Checked in order: an MSA warning earlier in a log must not hide the OOM that killed the run.
+FAILURE_PATTERNS = [
+    (OOM, re.compile(r"CUDA out of memory|OutOfMemoryError|CUDA error: out of memory|"
+                     r"CUBLAS_STATUS_ALLOC_FAILED|std::bad_alloc|\bMemoryError\b", re.IGNORECASE)),
+    (MSA_ERROR, re.compile(r"api\.colabfold\.com|Max retries exceeded|ConnectionError|"
+                           r"ReadTimeout|ConnectTimeout|RemoteDisconnected|Too Many Requests|"
+                           r"50[234] Server Error", re.IGNORECASE)),
+]
+# Return codes of a process killed by the kernel OOM killer (SIGKILL)
+OOM_KILL_CODES = {-9, 137}
+
+# Each step caps the listed parameters; steps that would not lower anything are skipped.
+DEFAULT_OOM_LADDER = [
+    {"diffusion_samples": 1},
+    {"max_msa_seqs": 128},
+    {"max_msa_seqs": 64, "sampling_steps": 25},
+]
+# Recorded with every attempt, besides the parameters the ladder touches
+RETRY_PARAM_KEYS = ("diffusion_samples", "max_msa_seqs", "sampling_steps")
+DEFAULT_MSA_RETRIES = 3
+DEFAULT_MSA_BACKOFF = 30.0
+
+
+def classify_failure(returncode, log_file=None, lines=()):
+    """Returns None for success, else OOM, MSA_ERROR or ERROR from the exit code and output."""
+    if returncode == 0:
+        return None
+    if returncode in OOM_KILL_CODES:
+        return OOM
+    found = set()
+    if log_file and os.path.exists(log_file):
+        with open(log_file, 'r', errors="replace") as f:
+            lines = f.readlines()
+    for line in lines:
+        for kind, pattern in FAILURE_PATTERNS:
+            if kind not in found and pattern.search(line):
+                found.add(kind)
+    for kind, _ in FAILURE_PATTERNS:
+        if kind in found:
+            return kind
+    return ERROR
+
+
+def parse_ladder(value):
+    """Parses an OOM ladder from a list of dicts or a "k=v, k=v; k=v" string."""
+    if not value:
+        return [dict(step) for step in DEFAULT_OOM_LADDER]
+    if isinstance(value, list):
+        return [dict(step) for step in value]
+    ladder = []
+    for step in str(value).split(";"):
+        caps = {}
+        for item in step.split(","):
+            if "=" in item:
+                key, number = item.split("=", 1)
+                caps[key.strip()] = float(number) if "." in number else int(number)
+        if caps:
+            ladder.append(caps)
+    return ladder
+
+
+class RetryPolicy:
+    """Decides whether and how a failed attempt is retried."""
+
+    def __init__(self, oom_ladder=None, max_msa_retries=DEFAULT_MSA_RETRIES, msa_backoff=DEFAULT_MSA_BACKOFF,
+                 backoff_factor=2.0):
+        self.oom_ladder = parse_ladder(oom_ladder)
+        self.max_msa_retries = max_msa_retries
+        self.msa_backoff = msa_backoff
+        self.backoff_factor = backoff_factor
+
+    @classmethod
+    def from_params(cls, params):
+        return cls(oom_ladder=params.get("oom_ladder"),
+                   max_msa_retries=params.get("max_msa_retries", DEFAULT_MSA_RETRIES),
+                   msa_backoff=params.get("msa_retry_backoff", DEFAULT_MSA_BACKOFF))
+
+    def next_attempt(self, failure, params, attempts):
+        """Returns (params, delay_seconds, note, ladder_step) for the next attempt, or None to give up."""
+        if failure == MSA_ERROR:
+            retries = sum(1 for a in attempts if a["failure"] == MSA_ERROR)
+            if retries > self.max_msa_retries:
+                return None
+            delay = self.msa_backoff * self.backoff_factor ** (retries - 1)
+            return dict(params), delay, f"MSA server error, retrying in {delay:g}s", None
+        if failure == OOM:
+            used = [a["ladder_step"] for a in attempts if a.get("ladder_step") is not None]
+            for index in range(max(used, default=-1) + 1, len(self.oom_ladder)):
+                caps = self.oom_ladder[index]
+                changed = {key: cap for key, cap in caps.items() if key in params and cap < params[key]}
+                if changed:
+                    note = "Out of memory, retrying with " + ", ".join(f"{k}={v}" for k, v in changed.items())
+                    return {**params, **changed}, 0.0, note, index
+        return None
+
+
+def run_with_retries(attempt_fn, params, policy=None, on_retry=None, sleep=time.sleep):
+    """Runs `attempt_fn(params, attempt_number)` until it succeeds or the policy gives up.
+
+    `attempt_fn` returns a StreamResult. `on_retry(note, attempt_number)` is
+    called before each retry. Returns (result, final_params, attempts).
+    """
+    policy = policy or RetryPolicy.from_params(params)
+    recorded = sorted(set(RETRY_PARAM_KEYS).union(*policy.oom_ladder))
+    current = dict(params)
+    attempts = []
+    while True:
+        number = len(attempts) + 1
+        started = time.monotonic()
+        result = attempt_fn(current, number)
+        failure = classify_failure(result.returncode, result.log_file, result.tail)
+        attempts.append({
+            "attempt": number,
+            "params": {key: current[key] for key in recorded if key in current},
+            "returncode": result.returncode,
+            "failure": failure,
+            "duration_s": round(time.monotonic() - started, 2),
+            "log_file": result.log_file,
+        })
+        if failure is None:
+            break
+        plan = policy.next_attempt(failure, current, attempts)
+        if plan is None:
+            break
+        current, delay, note, ladder_step = plan
+        attempts[-1]["next"] = note
+        attempts[-1]["ladder_step"] = ladder_step
+        if on_retry:
+            on_retry(note, number + 1)
+        if delay:
+            sleep(delay)
+    return result, current, attempts
+
+
+def attempt_suffix(number):
+    """File-name suffix of an attempt's log and profile: '' for the first attempt."""
+    return "" if number == 1 else f".attempt{number}"
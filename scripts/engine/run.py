@@ -0,0 +1,182 @@
+"""Single-job driver behind the Boltz2 Engine cell.
+
+Nothing runs at import time: parameters are read, the user is authenticated
+and telemetry is queued only when `main()` is called.
+"""
+import html
+import json
+import os
+import shutil
+
+from .cache import DEFAULT_CACHE_MAX_GB, PredictionCache, prediction_cache_key
+from .console import Color, fail, ok, spinner, warn
+from .msa_store import DEFAULT_MSA_STORE_MAX_GB, MSAStore, harvest_msas, inject_cached_msas
+from .params import DATA_DIR, RUN_PARAMS_FILE, build_predict_command, load_run_params, prepare_job_yaml
+from .retry import attempt_suffix, run_with_retries
+
+SOURCE_YAML = f"{DATA_DIR}/params.yaml"
+JOB_TYPE = "Boltz Execution"
+
+
+def prepare_param_file(job_name, source_file=SOURCE_YAML):
+    """Writes the job YAML from params.yaml, or checks that a job YAML already exists."""
+    param_file = f'{DATA_DIR}/{job_name}.yaml'
+    if os.path.exists(source_file):
+        prepare_job_yaml(source_file, param_file)
+    elif not os.path.exists(param_file):
+        raise FileNotFoundError(f"Cannot proceed: The parameter file '{param_file}' does not exist.")
+    return param_file
+
+
+def run_prediction(job_name, param_file, params):
+    """Runs (or restores from cache) one prediction, retrying recoverable failures.
+
+    Returns the StreamResult of the last attempt, the resource timeline of
+    that attempt's boltz process and the list of attempts (the timeline is
+    None and the list empty when the job was restored from cache).
+    """
+    from .profiler import DEFAULT_INTERVAL, ResourceProfiler
+    from .results_index import write_run_record
+    from .stream import ProgressTracker, StreamResult, read_tail
+    from .worker import run_boltz
+
+    output_path = f"{DATA_DIR}/{job_name}"
+    log_file = f"{output_path}/{job_name}_boltz.log"
+    if os.path.exists(output_path):
+        shutil.rmtree(output_path)
+
+    # Identical inputs and run settings are restored from the prediction cache
+    use_cache = params.get("use_cache", True)
+    cache = PredictionCache(max_gb=params.get("cache_max_gb", DEFAULT_CACHE_MAX_GB))
+    cache_key = prediction_cache_key(param_file, params)
+    if use_cache and cache.restore(cache_key, job_name, output_path):
+        ok(f"Identical job found in cache ({cache_key[:12]}), skipping Boltz2 run.")
+        write_run_record(job_name, params, [], cached=True)
+        tail = read_tail(log_file) if os.path.exists(log_file) else []
+        return StreamResult(0, [f"Restored from prediction cache entry {cache_key}."] + tail, log_file), None, []
+
+    # Stored MSAs replace the remote MSA search for proteins seen before
+    use_msa_store = params.get("use_msa_store", True)
+    msa_store = MSAStore(max_gb=params.get("msa_store_max_gb", DEFAULT_MSA_STORE_MAX_GB))
+    if use_msa_store and inject_cached_msas(param_file, msa_store):
+        ok("Reusing stored MSA, skipping the MSA server.")
+
+    os.makedirs(output_path, exist_ok=True)
+    timelines = {}
+
+    def attempt(attempt_params, number):
+        # Partial predictions of a failed attempt are dropped; boltz reuses the processed inputs and MSAs
+        shutil.rmtree(f"{output_path}/boltz_results_{job_name}/predictions", ignore_errors=True)
+        suffix = attempt_suffix(number)
+        cmd = build_predict_command(param_file, job_name, attempt_params)
+        progress = ProgressTracker()
+        # CPU, memory and GPU use of the boltz process tree, tagged with the current stage
+        profiler = ResourceProfiler(f"{output_path}/{job_name}_resources{suffix}.json",
+                                    interval=params.get("profile_interval", DEFAULT_INTERVAL),
+                                    stage_fn=lambda: progress.stage)
+        label = "Running Boltz2 prediction..." if number == 1 else f"Running Boltz2 prediction (attempt {number})..."
+        returncode = None
+        try:
+            # Run with loader animation; output is streamed to a log file as it arrives
+            with spinner(f"{Color.RESET}{label}", progress):
+                result = run_boltz(cmd, f"{output_path}/{job_name}_boltz{suffix}.log", cwd=DATA_DIR,
+                                   on_line=progress.feed, on_start=profiler.start)
+            returncode = result.returncode
+        finally:
+            timelines[number] = profiler.stop(returncode)
+        return result
+
+    # Out-of-memory and MSA server failures are retried as configured in run_params.txt
+    result, final_params, attempts = run_with_retries(
+        attempt, params, on_retry=lambda note, number: warn(f"{note} (attempt {number})."))
+    with open(f"{output_path}/{job_name}_attempts.json", 'w') as f:
+        json.dump(attempts, f, indent=2)
+    write_run_record(job_name, final_params, attempts)
+    if result.returncode == 0:
+        if use_msa_store:
+            harvest_msas(param_file, output_path, job_name, msa_store)
+        if use_cache:
+            # Keyed by the parameters that actually produced the result
+            cache.store(prediction_cache_key(param_file, final_params), job_name, output_path)
+    return result, timelines[len(attempts)], attempts
+
+
+def attempts_html(attempts):
+    """Returns a table of the attempts of a retried run; empty for a single attempt."""
+    if len(attempts) < 2:
+        return ""
+    rows = ""
+    for a in attempts:
+        settings = ", ".join(f"{key}={value}" for key, value in a["params"].items())
+        outcome = "success" if a["failure"] is None else f"{a['failure']} (exit code {a['returncode']})"
+        rows += (f"<tr><td>{a['attempt']}</td><td>{html.escape(settings)}</td><td>{outcome}</td>"
+                 f"<td>{a['duration_s']:.0f}</td><td>{html.escape(a.get('next', ''))}</td></tr>")
+    return f"""
+    <table class="report-table">
+        <tr><th>Attempt</th><th>Settings</th><th>Result</th><th>Duration (s)</th><th>Next</th></tr>
+        {rows}
+    </table>"""
+
+
+def job_output_section(job_name, result, ranking_weights=None, attempts=()):
+    """Formats the log tail of a run and loads the viewer data on success."""
+    from .ranking import ranked_model_ids
+    from .viewer import create_visualizations
+
+    log_tail = html.escape("\n".join(result.tail))
+    log_note = f"Showing the last {len(result.tail)} lines. Full log: {result.log_file}"
+    if result.returncode != 0:
+        fail("Boltz2 run failed. See details in the HTML output below.")
+        return (f'<h2>Job Failed</h2>{attempts_html(attempts)}<pre class="output-box error">'
+                f'Exit Code: {result.returncode}\n{log_note}\n\n{log_tail}</pre>'), None
+
+    ok("Boltz2 run finished successfully!")
+    job_output_html = f'{attempts_html(attempts)}<pre class="output-box success">{log_note}\n\n{log_tail}</pre>'
+    # Generate visualizations on success
+    ids = ranked_model_ids(job_name, ranking_weights)
+    if not ids:
+        return job_output_html + '<pre class="output-box error">Error: No model PDB file found.</pre>', None
+    return job_output_html, create_visualizations(job_name=job_name, model_id=ids[0], ranked_ids=ids)
+
+
+def main(params_filepath=RUN_PARAMS_FILE):
+    """Entry point of the Boltz2 Engine cell; returns the job name."""
+    from .artifacts import add_artifacts, write_manifest
+    from .colab import display_html
+    from .confidence_store import DEFAULT_STORE_DTYPE, ensure_confidence_store
+    from .profiler import resource_section_html
+    from .ranking import manifest_path as ranking_path
+    from .telemetry import log_event
+    from .viewer import render_run_report
+    from .worker import DEFAULT_MAX_JOBS, ping, start_worker
+
+    # 1. Set up parameters
+    os.chdir(DATA_DIR)
+    params = load_run_params(params_filepath)
+    job_name = params.get("job_name", "boltz2_job")
+    log_event(job_type=JOB_TYPE, job_name=job_name, event=" ")
+
+    # A warm worker keeps boltz loaded between runs; it serves the next run once it is up
+    if params.get("warm_worker", False) and ping() is None:
+        start_worker(max_jobs=params.get("worker_max_jobs", DEFAULT_MAX_JOBS),
+                     max_rss_mb=params.get("worker_max_rss_mb"))
+        ok("Starting a warm Boltz2 worker for the next runs.")
+
+    # 2. Prepare the parameter file and run the prediction
+    param_file = prepare_param_file(job_name)
+    result, timeline, attempts = run_prediction(job_name, param_file, params)
+    if os.path.isdir(f"{DATA_DIR}/{job_name}"):
+        write_manifest(job_name)
+    if result.returncode == 0 and params.get("confidence_store", True):
+        try:
+            ensure_confidence_store(job_name, params.get("confidence_dtype", DEFAULT_STORE_DTYPE))
+        except (FileNotFoundError, ValueError) as e:
+            warn(f"Confidence arrays stay compressed: {e}")
+
+    # 3. Generate and display the final HTML output
+    job_output_html, visual_data = job_output_section(job_name, result, params.get("ranking_weights"), attempts)
+    resource_png = f"{DATA_DIR}/{job_name}/{job_name}_resources.png"
+    resource_html = resource_section_html(timeline, resource_png)
+    add_artifacts(job_name, [ranking_path(job_name), resource_png])
+    display_html(render_run_report(job_name, job_output_html, visual_data, resource_html))
+    return job_name
@@ -0,0 +1,554 @@
+"""Virtual screening: one receptor against a ligand library, ranked by predicted affinity.
+
+The receptor is a job YAML (by default the params.yaml the parameter form
+writes). Its proteins, and any ligands other than the affinity binder, are
+kept as they are. Each library ligand is added as a new chain and becomes the
+affinity binder. The library is a SMILES file ("SMILES [name]" per line), a
+CSV/TSV with a SMILES column, or an SDF file, optionally gzipped. SDF records
+need a SMILES data field unless RDKit is installed to convert the molblocks.
+
+Libraries are streamed, never loaded whole. Ligands go into a SQLite state
+file, `{job}_screen/screen.sqlite`, in chunks. Each ligand's job YAML is
+written only when a worker picks the ligand up, and its affinity is written
+back to the state file as soon as the job finishes. The leaderboard is a
+sorted query on that table. An interrupted screen resumes where it stopped:
+ligands that were running go back to pending, and finished ones are kept.
+
+The receptor MSAs are computed once. boltz's MSA and featurization stages run
+on a receptor-only job (see pipeline.py), or the MSA comes from the MSA store.
+Every ligand YAML then points its proteins at those files, so no ligand job
+queries the MSA server.
+"""
+import csv
+import datetime
+import glob
+import gzip
+import hashlib
+import html
+import io
+import itertools
+import json
+import os
+import shutil
+import sqlite3
+import string
+import threading
+import time
+
+from .artifacts import write_manifest
+from .batch import DONE, FAILED, PENDING, RUNNING
+from .cache import DEFAULT_CACHE_MAX_GB, PredictionCache, prediction_cache_key
+from .console import Color, fail, ok, warn
+from .msa_store import DEFAULT_MSA_STORE_MAX_GB, MSAStore, msa_query_sequence, normalize_sequence, sequence_key
+from .params import DATA_DIR, RUN_PARAMS_FILE, build_predict_command, load_run_params
+from .pipeline import prefetch_inputs
+from .results_index import AFFINITY_COLUMNS, _read_json, write_run_record
+from .retry import attempt_suffix, run_with_retries
+from .worker import run_boltz
+
+JOB_TYPE = "Boltz Screening Execution"
+SOURCE_YAML = f"{DATA_DIR}/params.yaml"
+STATE_VERSION = 1
+INVALID = "invalid"
+# Ligands inserted into the state file per transaction while the library is read
+INGEST_CHUNK = 5000
+DEFAULT_TOP = 50
+# Finished ligands between two refreshes of the displayed leaderboard
+DEFAULT_REFRESH = 10
+CONFIDENCE_COLUMNS = ["confidence_score", "iptm", "ligand_iptm"]
+# Leaderboard sort columns and their direction (lower predicted log10 IC50 binds more strongly)
+SORT_ORDER = {"affinity_pred_value": "ASC", "affinity_probability_binary": "DESC",
+              **{key: "DESC" for key in CONFIDENCE_COLUMNS}}
+SMILES_COLUMNS = ("smiles", "canonical_smiles", "isomeric_smiles")
+NAME_COLUMNS = ("name", "id", "ligand", "compound_id", "title")
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS ligands (
+    idx INTEGER PRIMARY KEY, name TEXT, smiles TEXT, status TEXT, returncode INTEGER, attempts INTEGER,
+    cached INTEGER, runtime_s REAL, started_at TEXT, finished_at TEXT,
+    {", ".join(f"{key} REAL" for key in AFFINITY_COLUMNS + CONFIDENCE_COLUMNS)});
+CREATE INDEX IF NOT EXISTS ligands_status ON ligands (status, idx);
+{"".join(f"CREATE INDEX IF NOT EXISTS ligands_{key} ON ligands ({key});" for key in SORT_ORDER)}
+"""
+
+
+def _open_text(path):
+    if path.endswith(".gz"):
+        return io.TextIOWrapper(gzip.open(path, 'rb'), encoding="utf-8", errors="replace")
+    return open(path, 'r', encoding="utf-8", errors="replace")
+
+
+def _library_format(path):
+    base = path[:-3] if path.endswith(".gz") else path
+    ext = os.path.splitext(base)[1].lower()
+    if ext in (".csv", ".tsv"):
+        return ext[1:]
+    return "sdf" if ext in (".sdf", ".sd") else "smi"
+
+
+def _read_smi(f):
+    for number, line in enumerate(f, start=1):
+        fields = line.split()
+        if not fields or fields[0].startswith("#") or fields[0].lower() in SMILES_COLUMNS:
+            continue
+        yield (" ".join(fields[1:]) or f"line_{number}"), fields[0]
+
+
+def _read_table(f, delimiter):
+    reader = csv.reader(f, delimiter=delimiter)
+    header = [column.strip().lower() for column in next(reader, [])]
+    smiles_col = next((header.index(c) for c in SMILES_COLUMNS if c in header), None)
+    if smiles_col is None:
+        raise ValueError(f"The library has no SMILES column (looked for {', '.join(SMILES_COLUMNS)}).")
+    name_col = next((header.index(c) for c in NAME_COLUMNS if c in header), None)
+    for number, row in enumerate(reader, start=1):
+        if not row:
+            continue
+        smiles = row[smiles_col].strip() if smiles_col < len(row) else ""
+        name = row[name_col].strip() if name_col is not None and name_col < len(row) else ""
+        yield name or f"row_{number}", smiles
+
+
+def _molblock_smiles(molblock):
+    try:
+        from rdkit import Chem
+    except ImportError:
+        return ""
+    mol = Chem.MolFromMolBlock(molblock)
+    return Chem.MolToSmiles(mol) if mol is not None else ""
+
+
+def _read_sdf(f):
+    lines, number = [], 0
+    for line in f:
+        if not line.startswith("$$$$"):
+            lines.append(line)
+            continue
+        number += 1
+        fields, field = {}, None
+        for record_line in lines:
+            if record_line.startswith(">"):
+                field = record_line[record_line.find("<") + 1:record_line.rfind(">")].strip().lower()
+                fields[field] = ""
+            elif field is not None and record_line.strip():
+                fields[field] = fields[field] or record_line.strip()
+        smiles = next((fields[key] for key in fields if "smiles" in key and fields[key]), "")
+        if not smiles:
+            end = next((i for i, record_line in enumerate(lines) if record_line.startswith("M  END")), len(lines))
+            smiles = _molblock_smiles("".join(lines[:end + 1]))
+        name = lines[0].strip() if lines else ""
+        yield name or f"molecule_{number}", smiles
+        lines = []
+
+
+def read_library(path):
+    """Yields (name, SMILES) of every library entry in file order; SMILES is "" if it cannot be read."""
+    fmt = _library_format(path)
+    with _open_text(path) as f:
+        if fmt == "sdf":
+            yield from _read_sdf(f)
+        elif fmt in ("csv", "tsv"):
+            yield from _read_table(f, "," if fmt == "csv" else "\t")
+        else:
+            yield from _read_smi(f)
+
+
+def _chain_ids(entry):
+    spec = next(iter(entry.values()))
+    ids = spec.get("id", [])
+    return list(ids) if isinstance(ids, (list, tuple)) else [ids]
+
+
+def receptor_entries(receptor_file):
+    """Sequence entries of the receptor YAML, without the ligand that was its affinity binder."""
+    import yaml
+    with open(receptor_file, 'r') as f:
+        data = yaml.safe_load(f) or {}
+    binders = {prop["affinity"]["binder"] for prop in data.get("properties", []) or []
+               if isinstance(prop, dict) and "affinity" in prop}
+    entries = [entry for entry in data.get("sequences", [])
+               if not ("ligand" in entry and set(_chain_ids(entry)) & binders)]
+    for entry in entries:
+        if "protein" in entry:
+            entry["protein"]["sequence"] = normalize_sequence(entry["protein"].get("sequence", ""))
+    if not any("protein" in entry for entry in entries):
+        raise ValueError(f"The receptor '{receptor_file}' has no protein chain.")
+    return entries
+
+
+def ligand_chain_id(entries):
+    """First single-letter chain id the receptor does not use."""
+    used = {str(i) for entry in entries for i in _chain_ids(entry)}
+    return next(c for c in string.ascii_uppercase + string.ascii_lowercase if c not in used)
+
+
+def screen_dir(job_name, data_dir=DATA_DIR):
+    return f"{data_dir}/{job_name}_screen"
+
+
+def _now():
+    return datetime.datetime.now().isoformat(timespec="seconds")
+
+
+class Screen:
+    """A resumable screen of one receptor against a ligand library, backed by a SQLite state file."""
+
+    def __init__(self, job_name, receptor_file, library, params, data_dir=DATA_DIR, cache=None, msa_store=None):
+        self.job_name = job_name
+        self.library = os.path.abspath(library)
+        self.params = params
+        self.cache = cache
+        self.msa_store = msa_store
+        self.root = screen_dir(job_name, data_dir)
+        self.jobs_dir = f"{self.root}/jobs"
+        self.yaml_dir = f"{self.root}/yaml"
+        self.log_dir = f"{self.root}/logs"
+        for path in (self.jobs_dir, self.yaml_dir, self.log_dir):
+            os.makedirs(path, exist_ok=True)
+        self.entries = receptor_entries(receptor_file)
+        self.ligand_id = ligand_chain_id(self.entries)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(f"{self.root}/screen.sqlite", check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+        receptor_key = hashlib.sha256(json.dumps(self.entries, sort_keys=True).encode("utf-8")).hexdigest()
+        for key, value in (("version", str(STATE_VERSION)), ("receptor", receptor_key), ("library", self.library)):
+            previous = self._meta(key)
+            if previous is not None and previous != value:
+                raise ValueError(f"'{self.root}' holds a screen with a different {key}; "
+                                 f"use another job_name or remove that folder.")
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                                  [("version", str(STATE_VERSION)), ("receptor", receptor_key),
+                                   ("library", self.library)])
+            # Ligands that were running when the kernel died start over
+            self.conn.execute("UPDATE ligands SET status = ? WHERE status = ?", (PENDING, RUNNING))
+
+    def _meta(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- Library ---
+    def ingest(self, chunk=INGEST_CHUNK):
+        """Reads library entries not yet in the state file, `chunk` per transaction; returns how many."""
+        done = int(self._meta("ingested") or 0)
+        records = itertools.islice(read_library(self.library), done, None)
+        added = 0
+        while True:
+            rows = [(done + added + i, name, smiles, PENDING if smiles else INVALID)
+                    for i, (name, smiles) in enumerate(itertools.islice(records, chunk))]
+            if not rows:
+                return added
+            added += len(rows)
+            with self._lock, self.conn:
+                self.conn.executemany("INSERT OR IGNORE INTO ligands (idx, name, smiles, status) VALUES (?, ?, ?, ?)",
+                                      rows)
+                self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('ingested', ?)", (str(done + added),))
+
+    def retry_failed(self):
+        with self._lock, self.conn:
+            return self.conn.execute("UPDATE ligands SET status = ? WHERE status = ?", (PENDING, FAILED)).rowcount
+
+    def summary(self):
+        """Returns ligand counts per status."""
+        counts = {PENDING: 0, RUNNING: 0, DONE: 0, FAILED: 0, INVALID: 0}
+        with self._lock:
+            for status, n in self.conn.execute("SELECT status, COUNT(*) FROM ligands GROUP BY status"):
+                counts[status] = n
+        return counts
+
+    # --- Receptor MSAs ---
+    def _msa_file(self, sequence):
+        return f"{self.root}/msa/{sequence_key(sequence)}.csv"
+
+    def prepare_receptor(self):
+        """Makes sure every receptor protein has an MSA file; returns the sequences that still lack one.
+
+        Stored MSAs are used for single-protein receptors (paired MSAs depend
+        on the partner chains, see msa_store.py). The rest come from boltz's
+        MSA stage on a receptor-only job, run once without inference.
+        """
+        import yaml
+
+        proteins = [entry["protein"] for entry in self.entries if "protein" in entry]
+        sequences = {normalize_sequence(p["sequence"]) for p in proteins if "msa" not in p}
+        missing = [s for s in sequences if not os.path.exists(self._msa_file(s))]
+        if missing and self.msa_store and len(sequences) == 1:
+            stored = self.msa_store.lookup(missing[0])
+            if stored and stored.endswith(".csv"):
+                self._keep_msa(missing[0], stored)
+        missing = [s for s in sequences if not os.path.exists(self._msa_file(s))]
+        if missing:
+            name = f"{self.job_name}_receptor"
+            param_file = f"{self.yaml_dir}/{name}.yaml"
+            with open(param_file, 'w') as f:
+                yaml.safe_dump({"version": 1, "sequences": self.entries}, f, sort_keys=False, default_flow_style=None)
+            output_path = f"{self.root}/receptor"
+            prefetch_inputs(param_file, name, output_path, self.params, f"{self.log_dir}/{name}.prefetch.log")
+            for msa_file in sorted(glob.glob(f"{output_path}/boltz_results_{name}/msa/*.csv")):
+                query = msa_query_sequence(msa_file)
+                if query in missing:
+                    self._keep_msa(query, msa_file)
+                    if self.msa_store and len(sequences) == 1:
+                        self.msa_store.store(query, msa_file)
+        for protein in proteins:
+            sequence = normalize_sequence(protein["sequence"])
+            if "msa" not in protein and os.path.exists(self._msa_file(sequence)):
+                protein["msa"] = self._msa_file(sequence)
+        return [s for s in sequences if not os.path.exists(self._msa_file(s))]
+
+    def _keep_msa(self, sequence, msa_file):
+        path = self._msa_file(sequence)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        shutil.copyfile(msa_file, f"{path}.tmp")
+        os.replace(f"{path}.tmp", path)
+
+    # --- Execution ---
+    def ligand_job(self, idx):
+        return f"lig{idx:06d}"
+
+    def write_ligand_yaml(self, idx, smiles):
+        """Writes the job YAML of one ligand: the receptor plus the ligand as affinity binder."""
+        import yaml
+
+        param_file = f"{self.yaml_dir}/{self.ligand_job(idx)}.yaml"
+        data = {"version": 1,
+                "sequences": self.entries + [{"ligand": {"id": [self.ligand_id], "smiles": smiles}}],
+                "properties": [{"affinity": {"binder": self.ligand_id}}]}
+        with open(param_file, 'w') as f:
+            yaml.safe_dump(data, f, sort_keys=False, default_flow_style=None)
+        return param_file
+
+    def run(self, max_concurrent=1, on_update=None):
+        """Runs the pending ligands in library order; returns the counts per status."""
+        workers = [threading.Thread(target=self._worker, args=(on_update,)) for _ in range(max(1, int(max_concurrent)))]
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+        return self.summary()
+
+    def _next_ligand(self):
+        with self._lock, self.conn:
+            row = self.conn.execute("SELECT idx, name, smiles FROM ligands WHERE status = ? ORDER BY idx LIMIT 1",
+                                    (PENDING,)).fetchone()
+            if row is None:
+                return None
+            self.conn.execute("UPDATE ligands SET status = ?, started_at = ? WHERE idx = ?",
+                              (RUNNING, _now(), row["idx"]))
+            return {**dict(row), "status": RUNNING}
+
+    def _worker(self, on_update):
+        while True:
+            ligand = self._next_ligand()
+            if ligand is None:
+                return
+            if on_update:
+                on_update(ligand)
+            started = time.monotonic()
+            try:
+                ligand.update(self._run_ligand(ligand))
+            except Exception:
+                # Fails this ligand only; the worker goes on with the next one
+                self._log_exception(ligand["idx"], "Failed to prepare the ligand job")
+                ligand.update(returncode=-1, attempts=0, cached=0)
+            ligand.update(runtime_s=round(time.monotonic() - started, 2), finished_at=_now(),
+                          status=DONE if ligand["returncode"] == 0 else FAILED)
+            columns = ["status", "returncode", "attempts", "cached", "runtime_s", "finished_at"]
+            columns += [key for key in AFFINITY_COLUMNS + CONFIDENCE_COLUMNS if key in ligand]
+            with self._lock, self.conn:
+                self.conn.execute(f"UPDATE ligands SET {', '.join(f'{c} = ?' for c in columns)} WHERE idx = ?",
+                                  [ligand[c] for c in columns] + [ligand["idx"]])
+            if on_update:
+                on_update(ligand)
+
+    def _run_ligand(self, ligand):
+        name = self.ligand_job(ligand["idx"])
+        output_path = f"{self.jobs_dir}/{name}"
+        if os.path.exists(output_path):
+            shutil.rmtree(output_path)
+        param_file = self.write_ligand_yaml(ligand["idx"], ligand["smiles"])
+        outcome = {"returncode": 0, "attempts": 0, "cached": 0}
+        try:
+            if self.cache and self.cache.restore(prediction_cache_key(param_file, self.params), name, output_path):
+                outcome["cached"] = 1
+                write_run_record(name, self.params, [], cached=True, data_dir=self.jobs_dir)
+            else:
+                os.makedirs(output_path, exist_ok=True)
+
+                def attempt(params, number):
+                    shutil.rmtree(f"{output_path}/boltz_results_{name}/predictions", ignore_errors=True)
+                    cmd = build_predict_command(param_file, name, params)
+                    return run_boltz(cmd, f"{self.log_dir}/{name}{attempt_suffix(number)}.log",
+                                     cwd=self.jobs_dir, tail_lines=20)
+
+                result, final_params, attempts = run_with_retries(attempt, self.params)
+                outcome.update(returncode=result.returncode, attempts=len(attempts))
+                write_run_record(name, final_params, attempts, data_dir=self.jobs_dir)
+                if result.returncode == 0 and self.cache:
+                    self.cache.store(prediction_cache_key(param_file, final_params), name, output_path)
+        except Exception:
+            self._log_exception(ligand["idx"], "Failed to run boltz")
+            return {"returncode": -1, "attempts": 0, "cached": 0}
+        if os.path.isdir(output_path):
+            try:
+                outcome.update(self._results(name, write_manifest(name, self.jobs_dir)))
+            except Exception:
+                self._log_exception(ligand["idx"], "Could not read the results")
+                outcome["returncode"] = -1
+        return outcome
+
+    def _log_exception(self, idx, what):
+        import traceback
+
+        os.makedirs(self.log_dir, exist_ok=True)
+        with open(f"{self.log_dir}/{self.ligand_job(idx)}.log", 'a') as log:
+            log.write(f"\n{what}:\n{traceback.format_exc()}\n")
+
+    def _results(self, name, manifest):
+        """Affinity and model 0 confidence of a finished ligand job, from its fresh manifest."""
+        found = {}
+        paths = {(a["kind"], a["model_id"]): a["path"] for a in manifest["artifacts"]}
+        affinity = _read_json(f"{self.jobs_dir}/{name}/{paths.get(('affinity', None), '-')}") or {}
+        confidence = _read_json(f"{self.jobs_dir}/{name}/{paths.get(('confidence', 0), '-')}") or {}
+        for key in AFFINITY_COLUMNS:
+            found[key] = affinity.get(key)
+        for key in CONFIDENCE_COLUMNS:
+            found[key] = confidence.get(key)
+        return found
+
+    # --- Leaderboard ---
+    def leaderboard(self, sort=None, limit=DEFAULT_TOP):
+        """Finished ligands best first; ligands without the sort value go last."""
+        sort = sort or "affinity_pred_value"
+        if sort not in SORT_ORDER:
+            raise ValueError(f"Cannot rank ligands by '{sort}'; use one of: {', '.join(SORT_ORDER)}.")
+        sql = (f"SELECT * FROM ligands WHERE status = ? ORDER BY {sort} IS NULL, {sort} {SORT_ORDER[sort]}, idx"
+               + (" LIMIT ?" if limit else ""))
+        with self._lock:
+            return [dict(r) for r in self.conn.execute(sql, (DONE, int(limit)) if limit else (DONE,))]
+
+    def export_leaderboard(self, path=None, sort=None):
+        """Writes every finished ligand, ranked, to a CSV file; returns its path."""
+        path = path or f"{self.root}/leaderboard.csv"
+        columns = ["rank", "idx", "name", "smiles"] + AFFINITY_COLUMNS + CONFIDENCE_COLUMNS + ["job_dir"]
+        with open(f"{path}.tmp", 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            for rank, row in enumerate(self.leaderboard(sort, limit=None), start=1):
+                row.update(rank=rank, job_dir=f"{self.jobs_dir}/{self.ligand_job(row['idx'])}")
+                writer.writerow([row[c] for c in columns])
+        os.replace(f"{path}.tmp", path)
+        return path
+
+
+def _cell(value, fmt="{:.3f}"):
+    return "<td>-</td>" if value is None else f"<td>{fmt.format(value)}</td>"
+
+
+def leaderboard_html(job_name, rows, counts, sort):
+    """The leaderboard table of a screen, with its progress."""
+    body = ""
+    for rank, r in enumerate(rows, start=1):
+        body += (f"<tr><td>{rank}</td><td>{html.escape(r['name'])}</td>"
+                 f"<td class=\"smiles\">{html.escape(r['smiles'])}</td>"
+                 + _cell(r["affinity_pred_value"], "{:.2f}") + _cell(r["affinity_probability_binary"])
+                 + _cell(r["iptm"]) + _cell(r["ligand_iptm"]) + _cell(r["runtime_s"], "{:.0f}")
+                 + f"<td>lig{r['idx']:06d}{' (cached)' if r['cached'] else ''}</td></tr>")
+    total = sum(counts.values())
+    progress = (f"{counts[DONE]} of {total} ligands done, {counts[FAILED]} failed, "
+                f"{counts[INVALID]} unreadable, {counts[PENDING] + counts[RUNNING]} to go")
+    return f"""
+<style>
+    .screen-table {{ font-family: 'Roboto', sans-serif; border-collapse: collapse; margin: 10px; }}
+    .screen-table th, .screen-table td {{ border: 1px solid #e0e0e0; padding: 6px 12px; text-align: left; }}
+    .screen-table th {{ background-color: #f5f5f5; color: #145ABE; }}
+    .screen-table .smiles {{ font-family: monospace; max-width: 420px; word-break: break-all; }}
+</style>
+<h3>Screen {html.escape(job_name)}: top {len(rows)} by {html.escape(sort)}</h3>
+<p style="font-family: 'Roboto', sans-serif; margin: 10px;">{progress}. Affinity is boltz's predicted
+    log10(IC50 / µM), lower binds more strongly; the binding probability is its binder/decoy classifier.</p>
+<table class="screen-table">
+    <tr><th>Rank</th><th>Ligand</th><th>SMILES</th><th>Affinity</th><th>Binding Prob.</th><th>ipTM</th>
+        <th>Ligand ipTM</th><th>Runtime (s)</th><th>Job</th></tr>
+    {body}
+</table>
+"""
+
+
+def main(params_filepath=RUN_PARAMS_FILE):
+    """Entry point of the Boltz2 Screening cell; returns the leaderboard CSV."""
+    from .colab import display_html, update_html
+    from .telemetry import log_event
+
+    # 1. Set up parameters, the receptor and the library
+    os.chdir(DATA_DIR)
+    params = load_run_params(params_filepath)
+    job_name = params.get("job_name", "boltz2_job")
+    library = params.get("screen_library", f"{DATA_DIR}/library.smi")
+    if not os.path.exists(library):
+        raise FileNotFoundError(f"Cannot proceed: The ligand library '{library}' does not exist.")
+    sort = params.get("screen_sort", "affinity_pred_value")
+    top = params.get("screen_top", DEFAULT_TOP)
+    log_event(job_type=JOB_TYPE, job_name=job_name, event=" ")
+    cache = (PredictionCache(max_gb=params.get("cache_max_gb", DEFAULT_CACHE_MAX_GB))
+             if params.get("use_cache", True) else None)
+    msa_store = (MSAStore(max_gb=params.get("msa_store_max_gb", DEFAULT_MSA_STORE_MAX_GB))
+                 if params.get("use_msa_store", True) else None)
+
+    with Screen(job_name, params.get("screen_receptor", SOURCE_YAML), library, params,
+                cache=cache, msa_store=msa_store) as screen:
+        added = screen.ingest()
+        if params.get("screen_retry_failed", True):
+            screen.retry_failed()
+        counts = screen.summary()
+        print(f"{Color.CYAN}[i] Screen '{job_name}': {added} new ligands read, {counts[DONE]} done, "
+              f"{counts[PENDING]} pending, {counts[INVALID]} unreadable.{Color.RESET}")
+
+        # 2. Receptor MSAs, computed once for the whole library
+        if counts[PENDING]:
+            missing = screen.prepare_receptor()
+            if missing:
+                warn(f"No MSA for {len(missing)} receptor sequence(s); each ligand job queries the MSA server.")
+            else:
+                ok(f"Receptor MSAs ready, ligand jobs skip the MSA server ({screen.root}/msa).")
+
+        # 3. Run the ligands, refreshing the leaderboard as results come in
+        display_id = f"screen-{job_name}"
+        display_html(leaderboard_html(job_name, screen.leaderboard(sort, top), counts, sort), display_id)
+        print_lock = threading.Lock()
+        finished = [0]
+
+        def report(ligand):
+            with print_lock:
+                label = f"{ligand['name']} (lig{ligand['idx']:06d})"
+                if ligand["status"] == RUNNING:
+                    print(f"[{Color.YELLOW}…{Color.RESET}] {label} started")
+                    return
+                if ligand["status"] == DONE:
+                    affinity = ligand.get("affinity_pred_value")
+                    ok(f"{label} finished{' from cache' if ligand['cached'] else ''}, affinity "
+                       f"{'-' if affinity is None else f'{affinity:.2f}'}")
+                else:
+                    fail(f"{label} failed (exit code {ligand['returncode']}), see {screen.log_dir}")
+                finished[0] += 1
+                if finished[0] % params.get("screen_refresh", DEFAULT_REFRESH) == 0:
+                    update_html(leaderboard_html(job_name, screen.leaderboard(sort, top), screen.summary(), sort),
+                                display_id)
+
+        counts = screen.run(max_concurrent=params.get("max_concurrent_jobs", 1), on_update=report)
+        update_html(leaderboard_html(job_name, screen.leaderboard(sort, top), counts, sort), display_id)
+        path = screen.export_leaderboard(sort=sort)
+        print(f"{Color.CYAN}[i] Screen complete: {counts[DONE]} done, {counts[FAILED]} failed. "
+              f"Leaderboard: {path}{Color.RESET}")
+        return path
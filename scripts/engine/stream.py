@@ -0,0 +1,164 @@
+"""Line-by-line streaming of `boltz predict` output with progress tracking.
+
+Instead of buffering the whole stdout/stderr in memory, the child's output is
+written to a per-job log file as it arrives. Only a bounded tail is kept for
+the HTML report, and progress-bar updates are parsed into a stage/percent/ETA
+summary for the live loader line.
+"""
+import codecs
+import collections
+import re
+import subprocess
+import time
+
+ANSI_ESCAPE = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
+
+# First matching pattern wins, so more specific markers come first.
+STAGE_PATTERNS = [
+    ("MSA", re.compile(r"MSA|mmseqs|colabfold|PENDING|COMPLETE:", re.IGNORECASE)),
+    ("Preprocessing", re.compile(r"Checking input data|Processing input data|Featuriz", re.IGNORECASE)),
+    ("Recycling", re.compile(r"recycl", re.IGNORECASE)),
+    ("Diffusion sampling", re.compile(r"diffusion|sampling step", re.IGNORECASE)),
+    ("Inference", re.compile(r"Predicting DataLoader|Predicting:", re.IGNORECASE)),
+    ("Writing outputs", re.compile(r"Writing|Number of failed examples", re.IGNORECASE)),
+]
+# tqdm style bars: " 45%|████▌     | 9/20 [00:12<00:15, 1.2it/s]"
+PROGRESS_PATTERN = re.compile(r"(\d+)%\|[^|]*\|\s*(\d+)/(\d+)\s*\[([\d:]+)<([\d:?]+)")
+
+StreamResult = collections.namedtuple("StreamResult", ["returncode", "tail", "log_file"])
+
+
+def clean_ansi_codes(text):
+    """Removes ANSI escape sequences from a string."""
+    return ANSI_ESCAPE.sub('', text)
+
+
+def _to_seconds(clock):
+    """Converts a tqdm `[hh:]mm:ss` string into seconds, or None if unknown."""
+    if not clock or "?" in clock:
+        return None
+    seconds = 0
+    for part in clock.split(":"):
+        seconds = seconds * 60 + int(part)
+    return seconds
+
+
+def _format_clock(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:d}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes:02d}:{seconds:02d}"
+
+
+class ProgressTracker:
+    """Follows the current boltz stage and its progress from output lines."""
+
+    def __init__(self):
+        self.stage = None
+        self.percent = None
+        self.eta = None
+        self.stage_started = None
+        self.started = time.monotonic()
+        self.stages = []
+
+    def feed(self, line):
+        """Updates the stage and progress from a single (ANSI-free) output line."""
+        for stage, pattern in STAGE_PATTERNS:
+            if pattern.search(line):
+                if stage != self.stage:
+                    self.stage = stage
+                    self.stage_started = time.monotonic()
+                    self.percent = self.eta = None
+                    self.stages.append((stage, round(self.stage_started - self.started, 2)))
+                break
+        match = PROGRESS_PATTERN.search(line)
+        if match:
+            self.percent = int(match.group(1))
+            self.eta = _to_seconds(match.group(5))
+            if self.eta is None and self.percent and self.stage_started is not None:
+                elapsed = time.monotonic() - self.stage_started
+                self.eta = elapsed * (100 - self.percent) / self.percent
+
+    def describe(self):
+        """Returns a short human-readable progress string."""
+        elapsed = _format_clock(time.monotonic() - self.started)
+        if self.stage is None:
+            return f"[{elapsed}]"
+        text = self.stage
+        if self.percent is not None:
+            text += f" {self.percent}%"
+        if self.eta is not None:
+            text += f" (ETA {_format_clock(self.eta)})"
+        return f"{text} [{elapsed}]"
+
+
+def _iter_segments(stream, chunk_size=8192):
+    """Yields (text, is_final) pieces split on newlines and carriage returns.
+
+    Segments ending in a carriage return are in-place progress bar redraws;
+    only newline-terminated segments are final output lines. An unterminated
+    tail (e.g. a tqdm bar drawn at 0% that only redraws when the step is done)
+    is also yielded as non-final, so the stage it starts is seen right away.
+    Characters split across reads (e.g. tqdm's █) are decoded once complete.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    buffer = ""
+    while True:
+        chunk = stream.read1(chunk_size) if hasattr(stream, "read1") else stream.read(chunk_size)
+        if not chunk:
+            break
+        buffer += decoder.decode(chunk)
+        while True:
+            match = re.search(r"\r\n|\n|\r(?=.)", buffer, re.DOTALL)
+            if not match:
+                break
+            yield buffer[:match.start()], match.group() != "\r"
+            buffer = buffer[match.end():]
+        if buffer:
+            yield buffer, False
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer, True
+
+
+def run_streaming(cmd, log_file, cwd=None, env=None, tail_lines=200, on_line=None, on_start=None):
+    """Runs `cmd`, streaming merged stdout/stderr into `log_file` line by line.
+
+    `on_line` receives every ANSI-free segment, including progress redraws.
+    `on_start` receives the Popen object right after the process is started.
+    Only the last `tail_lines` final lines are kept in memory.
+    """
+    proc = subprocess.Popen(cmd, cwd=cwd, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    if on_start:
+        on_start(proc)
+    try:
+        tail = log_stream(proc.stdout, log_file, tail_lines, on_line)
+    finally:
+        proc.stdout.close()
+        returncode = proc.wait()
+    return StreamResult(returncode, tail, log_file)
+
+
+def log_stream(stream, log_file, tail_lines=200, on_line=None):
+    """Writes the final lines of a binary output stream to `log_file`; returns the tail."""
+    tail = collections.deque(maxlen=tail_lines)
+    with open(log_file, 'w') as log:
+        for segment, is_final in _iter_segments(stream):
+            text = clean_ansi_codes(segment).rstrip()
+            if on_line and text:
+                on_line(text)
+            if is_final:
+                log.write(text + "\n")
+                log.flush()
+                if text:
+                    tail.append(text)
+    return list(tail)
+
+
+def read_tail(log_file, tail_lines=200):
+    """Returns the last non-empty lines of an existing log file."""
+    tail = collections.deque(maxlen=tail_lines)
+    with open(log_file, 'r', errors="replace") as f:
+        for line in f:
+            if line.strip():
+                tail.append(line.rstrip())
+    return list(tail)
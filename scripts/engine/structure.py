@@ -0,0 +1,180 @@
+"""Columnar reader for model PDB and mmCIF files.
+
+The report only needs a few per-atom fields, so instead of building a Bio.PDB
+object hierarchy the ATOM/HETATM records of the first model are read in one
+pass into NumPy arrays: `chain`, `resseq`, `icode`, `res_name`, `atom_name`,
+`element` (strings), `hetero` (bool), `xyz` (atoms x 3) and `b_factor`.
+PDB records are sliced at their fixed columns from an (atoms x 80) byte
+matrix; the `_atom_site` loop of an mmCIF file is split into columns.
+"""
+import re
+
+# Fixed columns (start, stop) of the ATOM/HETATM fields that are read
+PDB_COLUMNS = {
+    "atom_name": (12, 16), "res_name": (17, 20), "chain": (21, 22), "resseq": (22, 26), "icode": (26, 27),
+    "x": (30, 38), "y": (38, 46), "z": (46, 54), "b_factor": (60, 66), "element": (76, 78),
+}
+PDB_WIDTH = 80
+_CIF_TOKEN = re.compile(r"'([^']*)'|\"([^\"]*)\"|(\S+)")
+
+
+def _pdb_matrix(data):
+    """Returns the ATOM/HETATM records of the first model as an (atoms x 80) uint8 matrix."""
+    import numpy as np
+
+    width = PDB_WIDTH + 1
+    buf = np.frombuffer(data, dtype=np.uint8)
+    if len(data) % width == 0 and (buf[PDB_WIDTH::width] == ord("\n")).all():
+        # Every line has the full 80 columns: the file already is the matrix
+        rows = buf.reshape(-1, width)[:, :PDB_WIDTH]
+    else:
+        # Gather every line into 80 columns, blank-padded past its end
+        ends = np.flatnonzero(buf == ord("\n"))
+        if not data.endswith(b"\n"):
+            ends = np.append(ends, len(buf))
+        starts = np.concatenate(([0], ends[:-1] + 1)).astype(np.int64)
+        padded = np.concatenate((buf, np.full(PDB_WIDTH, ord(" "), dtype=np.uint8)))
+        record = padded[starts[:, None] + np.arange(6)]
+        wanted = ((record == np.frombuffer(b"ATOM  ", np.uint8)).all(axis=1)
+                  | (record == np.frombuffer(b"HETATM", np.uint8)).all(axis=1)
+                  | (record == np.frombuffer(b"ENDMDL", np.uint8)).all(axis=1))
+        starts, lengths = starts[wanted], (ends - starts)[wanted]
+        columns = np.arange(PDB_WIDTH)
+        rows = padded[starts[:, None] + columns]
+        rows[columns >= lengths[:, None]] = ord(" ")
+        rows[rows == ord("\r")] = ord(" ")
+    record = rows[:, :6]
+    end_model = np.flatnonzero((record == np.frombuffer(b"ENDMDL", np.uint8)).all(axis=1))
+    if len(end_model):
+        rows, record = rows[:end_model[0]], record[:end_model[0]]
+    hetero = (record == np.frombuffer(b"HETATM", np.uint8)).all(axis=1)
+    atom = (record == np.frombuffer(b"ATOM  ", np.uint8)).all(axis=1)
+    keep = hetero | atom
+    return rows[keep], hetero[keep]
+
+
+def _column(rows, start, stop):
+    import numpy as np
+
+    return np.ascontiguousarray(rows[:, start:stop]).view(f"S{stop - start}").ravel()
+
+
+def _text(values):
+    import numpy as np
+
+    return np.char.strip(values).astype(str)
+
+
+def read_pdb(data):
+    """Reads PDB bytes (or text) into per-atom arrays."""
+    import numpy as np
+
+    if isinstance(data, str):
+        data = data.encode("ascii", "replace")
+    rows, hetero = _pdb_matrix(data)
+    col = {name: _column(rows, *span) for name, span in PDB_COLUMNS.items()}
+    xyz = np.empty((len(rows), 3), dtype=np.float32)
+    for i, axis in enumerate("xyz"):
+        xyz[:, i] = col[axis].astype(np.float32)
+    blank_b = np.char.strip(col["b_factor"]) == b""
+    return {
+        "chain": col["chain"].astype(str),
+        "resseq": col["resseq"].astype(np.int64) if len(rows) else np.zeros(0, dtype=np.int64),
+        "icode": _text(col["icode"]),
+        "res_name": _text(col["res_name"]),
+        "atom_name": _text(col["atom_name"]),
+        "element": _text(col["element"]),
+        "hetero": hetero,
+        "xyz": xyz,
+        "b_factor": np.where(blank_b, b"0", col["b_factor"]).astype(np.float32),
+    }
+
+
+def _cif_columns(text):
+    """Returns the `_atom_site` loop as {item name: array of strings}."""
+    import numpy as np
+
+    lines = text.splitlines()
+    keys, rows = [], []
+    i = 0
+    while i < len(lines):
+        if lines[i].strip() == "loop_" and i + 1 < len(lines) and lines[i + 1].startswith("_atom_site."):
+            i += 1
+            while i < len(lines) and lines[i].startswith("_atom_site."):
+                keys.append(lines[i].split()[0][len("_atom_site."):])
+                i += 1
+            while i < len(lines) and lines[i].strip() and not lines[i].startswith(("_", "loop_", "#")):
+                rows.append(lines[i])
+                i += 1
+            break
+        i += 1
+    if not keys:
+        return {}
+    tokens = ["".join(groups) for groups in _CIF_TOKEN.findall(" ".join(rows))]
+    table = np.array(tokens, dtype=str).reshape(-1, len(keys))
+    return {key: table[:, j] for j, key in enumerate(keys)}
+
+
+def read_cif(text):
+    """Reads mmCIF text (the `_atom_site` loop, first model) into per-atom arrays."""
+    import numpy as np
+
+    col = _cif_columns(text)
+    if not col:
+        return read_pdb(b"")
+
+    def pick(*names, default="."):
+        for name in names:
+            if name in col:
+                return col[name]
+        return np.full(len(next(iter(col.values()))), default)
+
+    model = pick("pdbx_PDB_model_num", default="1")
+    first = model == model[0] if len(model) else np.zeros(0, dtype=bool)
+    col = {key: values[first] for key, values in col.items()}
+    resseq = pick("auth_seq_id", "label_seq_id")
+    icode = pick("pdbx_PDB_ins_code", default="")
+    xyz = np.stack([pick(f"Cartn_{axis}").astype(np.float32) for axis in "xyz"], axis=1)
+    return {
+        "chain": pick("auth_asym_id", "label_asym_id"),
+        "resseq": np.where(np.isin(resseq, [".", "?"]), "0", resseq).astype(np.int64),
+        "icode": np.where(np.isin(icode, [".", "?"]), "", icode),
+        "res_name": pick("auth_comp_id", "label_comp_id"),
+        "atom_name": pick("auth_atom_id", "label_atom_id"),
+        "element": pick("type_symbol", default=""),
+        "hetero": pick("group_PDB", default="ATOM") == "HETATM",
+        "xyz": xyz.reshape(-1, 3),
+        "b_factor": pick("B_iso_or_equiv", default="0").astype(np.float32),
+    }
+
+
+def read_structure(path):
+    """Reads a model .pdb or .cif/.mmcif file into per-atom arrays (see the module docstring)."""
+    if path.lower().endswith((".cif", ".mmcif")):
+        with open(path, 'r') as f:
+            return read_cif(f.read())
+    with open(path, 'rb') as f:
+        return read_pdb(f.read())
+
+
+def residue_starts(structure):
+    """Marks the first atom of every residue (a change of chain, number, insertion code or record type)."""
+    import numpy as np
+
+    n = len(structure["chain"])
+    starts = np.ones(n, dtype=bool)
+    if n > 1:
+        same = np.ones(n - 1, dtype=bool)
+        for key in ("chain", "resseq", "icode", "hetero"):
+            values = structure[key]
+            same &= values[1:] == values[:-1]
+        starts[1:] = ~same
+    return starts
+
+
+def chain_order(chains):
+    """Unique chain ids in order of first appearance."""
+    import numpy as np
+
+    unique, first = np.unique(chains, return_index=True)
+    return [str(c) for c in unique[np.argsort(first)]]
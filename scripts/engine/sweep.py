@@ -0,0 +1,342 @@
+"""Parameter sweeps over run_params.txt keys that share one preprocessing pass.
+
+`sweep_grid` in run_params.txt lists the values to try per key, e.g.
+
+    sweep_grid = "recycling_steps=3,10; sampling_steps=50,200; step_scale=1.5,2.0"
+
+Every combination is a variant with its own output directory under
+`{job}_sweep/`. The MSA search and featurization do not depend on these
+settings, so only the first variant runs them: its `processed/` inputs and
+MSAs are hard-linked into the other variants' `boltz_results_{job}`, where
+boltz finds the processed records and goes straight to inference. Sweeping a
+key that preprocessing reads (PREPROCESSING_KEYS) splits the variants into
+groups that each run their own first variant. The best
+model of each variant is ranked and the runtimes and confidence metrics are
+collected into `{job}_sweep/sweep.json` and a comparison table.
+"""
+import html
+import itertools
+import json
+import os
+import shutil
+import threading
+import time
+
+from .artifacts import write_manifest
+from .cache import DEFAULT_CACHE_MAX_GB, PredictionCache, _link_tree, prediction_cache_key
+from .console import Color, fail, ok, warn
+from .msa_store import DEFAULT_MSA_STORE_MAX_GB, MSAStore, harvest_msas, inject_cached_msas
+from .params import DATA_DIR, DEFAULT_RUN_PARAMS, RUN_PARAMS_FILE, build_predict_command, load_run_params, parse_value
+from .predictions import model_ids
+from .retry import RETRY_PARAM_KEYS, attempt_suffix, run_with_retries
+from .worker import run_boltz
+
+JOB_TYPE = "Boltz Sweep Execution"
+# Keys that name or place the job rather than change the prediction cannot be swept
+UNSWEEPABLE_KEYS = {"job_name", "override"}
+# Outputs of the first variant that later variants reuse instead of recomputing
+SHARED_DIRS = ("processed", "msa")
+# Keys that change what goes into those outputs; variants differing in them cannot share
+PREPROCESSING_KEYS = ("max_msa_seqs", "msa_pairing_strategy")
+TABLE_METRICS = [("confidence_score", "Confidence"), ("iptm", "ipTM"), ("plddt", "pLDDT"),
+                 ("ligand_plddt", "Ligand pLDDT"), ("interface_pae", "Interface PAE")]
+
+
+def parse_grid(value):
+    """Parses a sweep grid from a dict of lists or a "key=v1,v2; key=v1,v2" string."""
+    if isinstance(value, dict):
+        grid = {key: list(values) if isinstance(values, (list, tuple)) else [values]
+                for key, values in value.items()}
+    else:
+        grid = {}
+        for part in str(value or "").split(";"):
+            if "=" in part:
+                key, values = part.split("=", 1)
+                grid[key.strip()] = [parse_value(v) for v in values.split(",") if v.strip()]
+    for key, values in grid.items():
+        if key not in DEFAULT_RUN_PARAMS or key in UNSWEEPABLE_KEYS:
+            raise ValueError(f"'{key}' cannot be swept; use one of "
+                             f"{', '.join(sorted(set(DEFAULT_RUN_PARAMS) - UNSWEEPABLE_KEYS))}.")
+        if not values:
+            raise ValueError(f"No values given for '{key}' in the sweep grid.")
+    if not grid:
+        raise ValueError("The sweep grid is empty; set sweep_grid in run_params.txt.")
+    return grid
+
+
+def expand_grid(grid):
+    """Returns every combination of the grid as a list of {key: value} overrides."""
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[key] for key in keys))]
+
+
+def variant_label(overrides):
+    return ", ".join(f"{key}={value}" for key, value in overrides.items())
+
+
+def sweep_dir(job_name, data_dir=DATA_DIR):
+    return f"{data_dir}/{job_name}_sweep"
+
+
+def preprocessing_params(params):
+    return tuple(params.get(key, DEFAULT_RUN_PARAMS[key]) for key in PREPROCESSING_KEYS)
+
+
+def share_preprocessing(src_output, dst_output, job_name):
+    """Links the processed inputs and MSAs of one variant into another; True if any were found."""
+    src_root = f"{src_output}/boltz_results_{job_name}"
+    dst_root = f"{dst_output}/boltz_results_{job_name}"
+    if not os.path.isdir(f"{src_root}/processed/records"):
+        return False
+    for name in SHARED_DIRS:
+        if os.path.isdir(f"{src_root}/{name}"):
+            _link_tree(f"{src_root}/{name}", f"{dst_root}/{name}")
+    return True
+
+
+class Sweep:
+    """Runs the variants of a sweep, the first of each preprocessing group alone and the rest over its inputs."""
+
+    def __init__(self, job_name, param_file, params, grid, data_dir=DATA_DIR, cache=None):
+        self.job_name = job_name
+        self.param_file = param_file
+        self.params = params
+        self.grid = grid
+        self.cache = cache
+        self.root = sweep_dir(job_name, data_dir)
+        self.variants = [{
+            "variant": i,
+            "name": f"v{i:02d}",
+            "overrides": overrides,
+            "final_params": {},
+            "data_dir": f"{self.root}/v{i:02d}",
+            "status": "pending",
+            "returncode": None,
+            "runtime_s": None,
+            "shared_preprocessing": False,
+            "cached": False,
+            "attempts": [],
+            "best": None,
+        } for i, overrides in enumerate(expand_grid(grid))]
+        self.leaders = []
+        self._lock = threading.Lock()
+
+    def output_path(self, variant):
+        return f"{variant['data_dir']}/{self.job_name}"
+
+    def run(self, max_concurrent=1, on_update=None):
+        """Runs every variant; returns the variant records."""
+        if os.path.exists(self.root):
+            shutil.rmtree(self.root)
+        groups = {}
+        for variant in self.variants:
+            key = preprocessing_params({**self.params, **variant["overrides"]})
+            groups.setdefault(key, []).append(variant)
+        self.leaders = [group[0] for group in groups.values()]
+        self._run_all(self.leaders, max_concurrent, on_update)
+        rest = []
+        for key, (first, *others) in groups.items():
+            # A retry of the first variant may have preprocessed with other values than asked
+            if preprocessing_params(first["final_params"]) == key:
+                for variant in others:
+                    variant["shared_preprocessing"] = share_preprocessing(
+                        self.output_path(first), self.output_path(variant), self.job_name)
+            rest += others
+        self._run_all(rest, max_concurrent, on_update)
+        self.save()
+        return self.variants
+
+    def _run_all(self, variants, max_concurrent, on_update):
+        pending = list(variants)
+        workers = [threading.Thread(target=self._worker, args=(pending, on_update))
+                   for _ in range(max(1, min(int(max_concurrent), len(variants))))]
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+
+    def _worker(self, pending, on_update):
+        while True:
+            with self._lock:
+                if not pending:
+                    return
+                variant = pending.pop(0)
+            self._run_variant(variant, on_update)
+
+    def _run_variant(self, variant, on_update):
+        from .results_index import write_run_record
+
+        params = {**self.params, **variant["overrides"]}
+        output_path = self.output_path(variant)
+        variant["status"] = "running"
+        if on_update:
+            on_update(variant)
+        started = time.monotonic()
+        cache_key = prediction_cache_key(self.param_file, params) if self.cache else None
+        if cache_key and self.cache.restore(cache_key, self.job_name, output_path):
+            variant["cached"] = True
+            final_params = params
+            returncode = 0
+        else:
+            os.makedirs(output_path, exist_ok=True)
+
+            def attempt(attempt_params, number):
+                results_root = f"{output_path}/boltz_results_{self.job_name}"
+                shutil.rmtree(f"{results_root}/predictions", ignore_errors=True)
+                if preprocessing_params(attempt_params) != preprocessing_params(params):
+                    # The retry changed a preprocessing setting: let boltz redo the shared inputs
+                    for name in SHARED_DIRS:
+                        shutil.rmtree(f"{results_root}/{name}", ignore_errors=True)
+                cmd = build_predict_command(self.param_file, self.job_name, attempt_params)
+                return run_boltz(cmd, f"{output_path}/{self.job_name}_boltz{attempt_suffix(number)}.log",
+                                 cwd=variant["data_dir"], tail_lines=20)
+
+            result, final_params, variant["attempts"] = run_with_retries(attempt, params)
+            returncode = result.returncode
+            variant["log_file"] = result.log_file
+            if returncode == 0 and self.cache:
+                self.cache.store(prediction_cache_key(self.param_file, final_params), self.job_name, output_path)
+        variant["final_params"] = {key: final_params[key]
+                                   for key in [*self.grid, *RETRY_PARAM_KEYS, *PREPROCESSING_KEYS]
+                                   if key in final_params}
+        variant["runtime_s"] = round(time.monotonic() - started, 2)
+        variant["returncode"] = returncode
+        variant["status"] = "done" if returncode == 0 else "failed"
+        if os.path.isdir(output_path):
+            write_run_record(self.job_name, final_params, variant["attempts"], cached=variant["cached"],
+                             data_dir=variant["data_dir"])
+            write_manifest(self.job_name, variant["data_dir"])
+        if returncode == 0:
+            variant["best"] = self._best_model(variant)
+        with self._lock:
+            self.save()
+        if on_update:
+            on_update(variant)
+
+    def _best_model(self, variant):
+        from .ranking import rank_job
+
+        if not model_ids(self.job_name, variant["data_dir"]):
+            return None
+        try:
+            best = rank_job(self.job_name, self.params.get("ranking_weights"), variant["data_dir"])["models"][0]
+        except (FileNotFoundError, KeyError, ValueError) as e:
+            print(f"Warning: Could not rank models of variant {variant['name']} ({e}).")
+            return None
+        best["n_models"] = len(model_ids(self.job_name, variant["data_dir"]))
+        return best
+
+    def save(self):
+        os.makedirs(self.root, exist_ok=True)
+        path = f"{self.root}/sweep.json"
+        with open(f"{path}.tmp", 'w') as f:
+            json.dump({"job_name": self.job_name, "grid": self.grid, "variants": self.variants}, f, indent=2)
+        os.replace(f"{path}.tmp", path)
+
+
+def _final_value(requested, final):
+    return str(final) if final == requested else f"{final} (asked {requested})"
+
+
+def sweep_table_html(job_name, grid, variants):
+    """Returns the comparison table of a finished sweep, one row per variant."""
+    keys = list(grid)
+    scored = [v["best"]["score"] for v in variants if v["best"] and v["best"]["score"] is not None]
+    top_score = max(scored) if scored else None
+    rows = ""
+    for v in variants:
+        final = v.get("final_params", {})
+        cells = "".join(f"<td>{html.escape(_final_value(v['overrides'][key], final.get(key, v['overrides'][key])))}</td>"
+                        for key in keys)
+        status_class = "ok" if v["status"] == "done" else "err"
+        note = " (cached)" if v["cached"] else (" (shared)" if v["shared_preprocessing"] else "")
+        if len(v["attempts"]) > 1:
+            note += f" ({len(v['attempts'])} attempts)"
+        # Keys outside the grid that a retry changed, against what the first attempt ran with
+        first_attempt = v["attempts"][0]["params"] if v["attempts"] else final
+        changed = [f"{key}={final[key]}" for key in final
+                   if key not in keys and final[key] != first_attempt.get(key, final[key])]
+        if changed:
+            note += html.escape(f" (ran with {', '.join(changed)})")
+        best = v["best"] or {"metrics": {}}
+        score = best.get("score")
+        score_class = ' class="ok"' if score is not None and score == top_score else ""
+        metric_cells = "".join(
+            f"<td>{best['metrics'][key]:.3f}</td>" if key in best["metrics"] else "<td>-</td>"
+            for key, _ in TABLE_METRICS)
+        rows += (f"<tr><td>{v['name']}</td>{cells}<td class=\"{status_class}\">{v['status']}{note}</td>"
+                 f"<td>{v['runtime_s'] or 0:.1f}</td>"
+                 f"<td>{'Model ' + str(best['model_id']) if 'model_id' in best else '-'}</td>"
+                 f"<td{score_class}>{'-' if score is None else f'{score:.3f}'}</td>{metric_cells}</tr>")
+    headers = "".join(f"<th>{html.escape(key)}</th>" for key in keys)
+    metric_headers = "".join(f"<th>{label}</th>" for _, label in TABLE_METRICS)
+    return f"""
+<style>
+    .sweep-table {{ font-family: 'Roboto', sans-serif; border-collapse: collapse; margin: 10px; }}
+    .sweep-table th, .sweep-table td {{ border: 1px solid #e0e0e0; padding: 6px 12px; text-align: left; }}
+    .sweep-table th {{ background-color: #f5f5f5; color: #145ABE; }}
+    .sweep-table .ok {{ color: #388e3c; font-weight: bold; }}
+    .sweep-table .err {{ color: #d32f2f; font-weight: bold; }}
+</style>
+<h3>Parameter sweep: {html.escape(job_name)}</h3>
+<table class="sweep-table">
+    <tr><th>Variant</th>{headers}<th>Status</th><th>Runtime (s)</th><th>Best Model</th><th>Score</th>{metric_headers}</tr>
+    {rows}
+</table>
+"""
+
+
+def main(params_filepath=RUN_PARAMS_FILE):
+    """Entry point of the Boltz2 Sweep cell; returns the sweep directory."""
+    from .colab import display_html
+    from .run import prepare_param_file
+    from .telemetry import log_event
+
+    # 1. Set up parameters and the grid
+    os.chdir(DATA_DIR)
+    params = load_run_params(params_filepath)
+    job_name = params.get("job_name", "boltz2_job")
+    grid = parse_grid(params.get("sweep_grid"))
+    log_event(job_type=JOB_TYPE, job_name=job_name, event=" ")
+    param_file = prepare_param_file(job_name)
+
+    # Stored MSAs replace the remote MSA search of the first variant too
+    use_msa_store = params.get("use_msa_store", True)
+    msa_store = MSAStore(max_gb=params.get("msa_store_max_gb", DEFAULT_MSA_STORE_MAX_GB))
+    if use_msa_store and inject_cached_msas(param_file, msa_store):
+        ok("Reusing stored MSA, skipping the MSA server.")
+    cache = (PredictionCache(max_gb=params.get("cache_max_gb", DEFAULT_CACHE_MAX_GB))
+             if params.get("use_cache", True) else None)
+    sweep = Sweep(job_name, param_file, params, grid, cache=cache)
+    print(f"{Color.CYAN}[i] Sweeping {len(sweep.variants)} variants of '{job_name}' "
+          f"over {', '.join(grid)}.{Color.RESET}")
+
+    # 2. Run the first variant of each preprocessing group, then the rest over its processed inputs
+    print_lock = threading.Lock()
+
+    def report(variant):
+        with print_lock:
+            label = f"{variant['name']} ({variant_label(variant['overrides'])})"
+            if variant["status"] == "running":
+                print(f"[{Color.YELLOW}…{Color.RESET}] {label} started")
+            elif variant["status"] == "done":
+                source = " from cache" if variant["cached"] else ""
+                ok(f"{label} finished{source} in {variant['runtime_s']:.0f}s")
+            else:
+                fail(f"{label} failed (exit code {variant['returncode']}), see {variant.get('log_file')}")
+
+    sweep.run(max_concurrent=params.get("max_concurrent_jobs", 1), on_update=report)
+    first = sweep.variants[0]
+    if first["returncode"] == 0 and use_msa_store:
+        harvest_msas(param_file, sweep.output_path(first), job_name, msa_store)
+    followers = [v for v in sweep.variants if v not in sweep.leaders]
+    if followers and not any(v["shared_preprocessing"] or v["cached"] for v in followers):
+        warn("The first variants left no processed inputs; every variant ran its own preprocessing.")
+    if len(sweep.leaders) > 1:
+        print(f"{Color.CYAN}[i] {len(sweep.leaders)} preprocessing runs: the grid sweeps "
+              f"{', '.join(key for key in PREPROCESSING_KEYS if key in grid)}.{Color.RESET}")
+
+    # 3. Comparison table
+    display_html(sweep_table_html(job_name, grid, sweep.variants))
+    print(f"{Color.CYAN}[i] Sweep results: {sweep.root}/sweep.json{Color.RESET}")
+    return sweep.root
@@ -0,0 +1,222 @@
+"""Non-blocking usage telemetry.
+
+`log_event` used to POST synchronously (without a timeout) before any work
+started, so a slow endpoint stalled the whole cell. Events are now put on a
+queue and sent by a daemon thread. The thread drains them in batches over one
+keep-alive session, retries with exponential backoff, and spools to a local
+JSONL file when the endpoint is unreachable. Spooled events are replayed after
+the next successful send, and the queue is flushed (or spooled) at interpreter
+exit.
+"""
+import atexit
+import datetime
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from zoneinfo import ZoneInfo
+
+from .params import DATA_DIR
+
+# ==== CONFIG ====
+LOG_URL = "https://script.google.com/macros/s/AKfycbxPoo0REctEt-6eXRFg-ow3_iAueyOcG3y-XsIZ8PsSFTZWM5B_Y-IJyOoYQ9bf7Q03/exec"
+NOTEBOOK_NAME = "Boltz2 v1.1"
+SESSION_ID = str(uuid.uuid4())
+SPOOL_FILE = f"{DATA_DIR}/.telemetry_spool.jsonl"
+
+_STOP = object()
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+class TelemetryClient:
+    """Sends form-encoded events to a URL from a background thread."""
+
+    def __init__(self, url, spool_file=SPOOL_FILE, batch_size=20, flush_interval=0.5,
+                 timeout=5.0, max_retries=3, backoff=0.5):
+        self.url = url
+        self.spool_file = spool_file
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.sent = 0
+        self.spooled = 0
+        self._queue = queue.Queue()
+        self._spool_lock = threading.Lock()
+        # Events taken off the queue (or the spool) that were neither sent nor spooled yet, by id
+        self._unacked = {}
+        self._unacked_lock = threading.Lock()
+        self._session = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="telemetry", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # --- Public API ---
+    def log(self, event):
+        """Queues an event dict and returns immediately."""
+        if self._closed:
+            self._spool([event])
+        else:
+            self._queue.put(event)
+
+    def flush(self, timeout=None):
+        """Waits until every queued event was sent or spooled; returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def close(self, timeout=2.0):
+        """Stops the sender, spooling whatever could not be sent within `timeout`.
+
+        That includes the batch the sender is still working on: an event it
+        gets through after this point is both sent and spooled, never lost.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        with self._unacked_lock:
+            leftover = list(self._unacked.values())
+            self._unacked.clear()
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not _STOP:
+                    leftover.append(item)
+        self._spool(leftover)
+
+    # --- Worker ---
+    def _run(self):
+        while True:
+            batch, stop = self._next_batch()
+            if batch:
+                if self._send_batch(batch):
+                    self._replay_spool()
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                self._queue.task_done()
+                return
+
+    def _next_batch(self):
+        """Blocks for the first event, then drains up to `batch_size` events."""
+        # Taken and tracked under the lock, so close() never misses an event in between
+        with self._unacked_lock:
+            batch, stop = self._take_batch()
+            self._unacked.update((id(event), event) for event in batch)
+        return batch, stop
+
+    def _take_batch(self):
+        try:
+            item = self._queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return [], False
+        if item is _STOP:
+            return [], True
+        batch = [item]
+        while len(batch) < self.batch_size:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _release(self, events, spool=False):
+        """Acknowledges events, spooling them if asked unless close() already did."""
+        with self._unacked_lock:
+            owned = [event for event in events if self._unacked.pop(id(event), None) is not None]
+        if spool:
+            self._spool(owned)
+
+    def _post(self, event):
+        if self._session is None:
+            try:
+                import requests
+            except ImportError:
+                return False
+            self._session = requests.Session()
+        for attempt in range(self.max_retries):
+            try:
+                response = self._session.post(self.url, data=event, timeout=self.timeout)
+                if response.status_code < 500:
+                    return True
+            except Exception:
+                pass
+            if attempt + 1 < self.max_retries:
+                time.sleep(self.backoff * 2 ** attempt)
+        return False
+
+    def _send_batch(self, batch):
+        """Sends a batch in order; on the first hard failure the rest is spooled."""
+        for i, event in enumerate(batch):
+            if not self._post(event):
+                self._release(batch[i:], spool=True)
+                return False
+            self._release([event])
+            self.sent += 1
+        return True
+
+    # --- Spool ---
+    def _spool(self, events):
+        if not events:
+            return
+        with self._spool_lock:
+            os.makedirs(os.path.dirname(self.spool_file) or ".", exist_ok=True)
+            with open(self.spool_file, 'a') as f:
+                for event in events:
+                    f.write(json.dumps(event, default=str) + "\n")
+            self.spooled += len(events)
+
+    def _replay_spool(self):
+        with self._spool_lock:
+            if not os.path.exists(self.spool_file):
+                return
+            with open(self.spool_file, 'r') as f:
+                events = [json.loads(line) for line in f if line.strip()]
+            os.remove(self.spool_file)
+            with self._unacked_lock:
+                self._unacked.update((id(event), event) for event in events)
+        for start in range(0, len(events), self.batch_size):
+            if not self._send_batch(events[start:start + self.batch_size]):
+                self._release(events[start + self.batch_size:], spool=True)
+                return
+
+
+def get_telemetry(url, **kwargs):
+    """Returns the shared client for `url`, so re-running a cell reuses one sender thread."""
+    with _clients_lock:
+        client = _clients.get(url)
+        if client is None or client._closed:
+            client = _clients[url] = TelemetryClient(url, **kwargs)
+        return client
+
+
+def log_event(job_type, job_name, event=" ", url=LOG_URL):
+    """Queues a usage event tagged with the signed-in Colab user."""
+    from .colab import get_user_info
+    user_email, user_name = get_user_info()
+    now_ist = datetime.datetime.now(ZoneInfo("Asia/Kolkata"))
+    get_telemetry(url).log({
+        "timestamp": now_ist.strftime("%Y-%m-%d %H:%M:%S %Z"),
+        "email": user_email,
+        "username": user_name,
+        "notebook": NOTEBOOK_NAME,
+        "session_id": SESSION_ID,
+        "job_type": job_type,
+        "job_name": job_name,
+        "event": event,
+    })
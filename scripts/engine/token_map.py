@@ -0,0 +1,184 @@
+"""Per-model map from confidence-array tokens to chains, residues and atoms.
+
+boltz's pLDDT/PAE arrays have one row per token: a standard residue of a
+protein or nucleic-acid chain, or a heavy atom of a ligand. The token map of
+a model records, for every token, its chain (`chain`, an index into
+`chain_ids`), residue number (`resseq`), molecule type (`mol_type`, an index
+into MOL_TYPES) and atom range in the model file (`atom_start`/`atom_stop`).
+It is built once from the model with the columnar reader and cached next to
+the predictions as `{job}_model_{i}_tokens.npz`, tagged with the model file
+it was built from so an edited model gets a fresh map.
+
+Per-chain statistics are then reductions over contiguous token runs: the
+pLDDT statistics of every chain (ligands included) and sample come out of
+np.add.reduceat calls rather than a loop over chains.
+"""
+import os
+
+from . import artifacts
+from .params import DATA_DIR
+from .predictions import model_file, predictions_dir
+from .structure import read_structure, residue_starts
+
+TOKEN_MAP_VERSION = 1
+MOL_TYPES = ("protein", "dna", "rna", "ligand")
+LIGAND = MOL_TYPES.index("ligand")
+DNA_RESIDUES = ("DA", "DC", "DG", "DT", "DI", "DU", "DN")
+RNA_RESIDUES = ("A", "C", "G", "U", "I", "N")
+_ARRAYS = ("chain_ids", "chain", "resseq", "mol_type", "atom_start", "atom_stop")
+
+
+def token_map_file(job_name, model_id, data_dir=DATA_DIR):
+    return f"{predictions_dir(job_name, data_dir)}/{job_name}_model_{model_id}_tokens.npz"
+
+
+def build_token_map(structure):
+    """Builds the token map of a structure from structure.read_structure.
+
+    Polymer residues are one token each (all their atoms), HETATM records one
+    token per heavy atom, as in boltz.
+    """
+    import numpy as np
+
+    hetero = structure["hetero"]
+    n_atoms = len(hetero)
+    starts = residue_starts(structure)
+    is_token = (starts & ~hetero) | (hetero & (structure["element"] != "H"))
+    atom_start = np.flatnonzero(is_token)
+    residue_first = np.flatnonzero(starts)
+    residue_end = np.append(residue_first[1:], n_atoms)
+    atom_stop = np.where(hetero[atom_start], atom_start + 1,
+                         residue_end[np.searchsorted(residue_first, atom_start, side="right") - 1])
+
+    res_names = structure["res_name"][atom_start]
+    mol_type = np.zeros(len(atom_start), dtype=np.uint8)
+    mol_type[np.isin(res_names, DNA_RESIDUES)] = MOL_TYPES.index("dna")
+    mol_type[np.isin(res_names, RNA_RESIDUES)] = MOL_TYPES.index("rna")
+    mol_type[hetero[atom_start]] = LIGAND
+
+    unique, first, chain = np.unique(structure["chain"][atom_start], return_index=True, return_inverse=True)
+    order = np.argsort(first)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return {
+        "chain_ids": unique[order].astype(str),
+        "chain": rank[chain].astype(np.int16),
+        "resseq": structure["resseq"][atom_start].astype(np.int32),
+        "mol_type": mol_type,
+        "atom_start": atom_start.astype(np.int32),
+        "atom_stop": atom_stop.astype(np.int32),
+    }
+
+
+def model_source(job_name, model_id, data_dir=DATA_DIR):
+    """Identifies the model file a map is built from: its manifest path, size and hash."""
+    for entry in artifacts.find(job_name, "model", int(model_id), data_dir):
+        if entry["path"].endswith(".pdb"):
+            return f"{entry['path']}:{entry['size']}:{entry['sha256']}"
+    return None
+
+
+def load_token_map(job_name, model_id, data_dir=DATA_DIR):
+    """Returns the token map of a model, building and caching it if needed.
+
+    Models that are not in the job's manifest are mapped without caching.
+    """
+    import numpy as np
+
+    source = model_source(job_name, model_id, data_dir)
+    path = token_map_file(job_name, model_id, data_dir)
+    if source is not None:
+        try:
+            with np.load(path) as data:
+                if int(data["version"]) == TOKEN_MAP_VERSION and str(data["source"]) == source:
+                    return {key: data[key] for key in _ARRAYS}
+        except (OSError, KeyError, ValueError):
+            pass
+    token_map = build_token_map(read_structure(model_file(job_name, model_id, data_dir)))
+    if source is not None:
+        with open(f"{path}.tmp", 'wb') as f:
+            np.savez(f, version=TOKEN_MAP_VERSION, source=source, **token_map)
+        os.replace(f"{path}.tmp", path)
+        artifacts.add_artifacts(job_name, [path], data_dir)
+    return token_map
+
+
+def token_chains(token_map):
+    """Chain id of every token."""
+    return token_map["chain_ids"][token_map["chain"]]
+
+
+def ligand_mask(token_map):
+    return token_map["mol_type"] == LIGAND
+
+
+def chain_runs(token_map):
+    """Returns the token order that groups each chain's tokens, and where each chain starts in it.
+
+    The order is None when the tokens already are grouped by chain, as boltz
+    writes them.
+    """
+    import numpy as np
+
+    chain = token_map["chain"]
+    sizes = np.bincount(chain, minlength=len(token_map["chain_ids"]))
+    bounds = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    if len(chain) and np.all(np.diff(chain) >= 0):
+        return None, bounds
+    return np.argsort(chain, kind="stable"), bounds
+
+
+def chain_tokens(token_map):
+    """Maps chain id -> token index: a slice when the chain's tokens are contiguous."""
+    import numpy as np
+
+    order, bounds = chain_runs(token_map)
+    stops = np.append(bounds[1:], len(token_map["chain"]))
+    tokens = {}
+    for chain_id, start, stop in zip(token_map["chain_ids"].tolist(), bounds, stops):
+        if order is None:
+            tokens[chain_id] = slice(int(start), int(stop))
+        else:
+            tokens[chain_id] = np.sort(order[start:stop])
+    return tokens
+
+
+def chain_mol_types(token_map):
+    """Molecule type of every chain: that of its first token."""
+    import numpy as np
+
+    first = np.unique(token_map["chain"], return_index=True)[1]
+    return [MOL_TYPES[t] for t in token_map["mol_type"][first]]
+
+
+def chain_plddt_stats(token_map, plddt):
+    """Mean pLDDT and % of tokens above 70 and 90 of every chain, ligands included.
+
+    `plddt` is one sample (tokens) or a stack (samples x tokens) on a 0-100
+    scale; each value of the result is a scalar or a per-sample array. Each
+    statistic is one reduceat over the chains' token runs.
+    """
+    import numpy as np
+
+    plddt = np.asarray(plddt)
+    if not len(token_map["chain_ids"]):
+        return {}
+    if plddt.shape[-1] != len(token_map["chain"]):
+        raise ValueError(f"{plddt.shape[-1]} pLDDT values for {len(token_map['chain'])} tokens")
+    order, bounds = chain_runs(token_map)
+    if order is not None:
+        plddt = plddt[..., order]
+    sizes = np.bincount(token_map["chain"], minlength=len(bounds))
+    mean = np.add.reduceat(plddt, bounds, axis=-1, dtype=np.float64) / sizes
+    confident = np.add.reduceat(plddt > 70, bounds, axis=-1, dtype=np.int32) * (100 / sizes)
+    very_high = np.add.reduceat(plddt > 90, bounds, axis=-1, dtype=np.int32) * (100 / sizes)
+    stats = {}
+    for i, (chain_id, mol_type) in enumerate(zip(token_map["chain_ids"].tolist(), chain_mol_types(token_map))):
+        stats[chain_id] = {
+            "mol_type": mol_type,
+            "n_tokens": int(sizes[i]),
+            "mean_plddt": mean[..., i],
+            "pct_confident": confident[..., i],
+            "pct_very_high": very_high[..., i],
+        }
+    return stats
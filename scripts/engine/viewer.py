@@ -0,0 +1,486 @@
+"""3D structure viewer and the run report HTML for the Boltz2 Engine cell.
+
+The model is not inlined as PDB text. It is embedded as a two-level payload,
+each level gzip-compressed and base64-encoded, and decoded in the browser with
+DecompressionStream. The coarse level (one atom per residue plus all ligand
+atoms) is rendered first. The full-atom level is only loaded when the user
+asks for it or picks a style that needs every atom: in Colab it is fetched
+from the kernel then, so the notebook output only carries the coarse level;
+elsewhere it is embedded as well.
+"""
+import base64
+import gzip
+import json
+
+from .predictions import model_file, model_ids
+
+# Atoms kept per polymer residue in the coarse level (protein CA, nucleic acid P)
+COARSE_ATOM_NAMES = {"CA", "P"}
+# Structures up to this many atoms are shipped as a single full-atom level
+LOD_MIN_ATOMS = 2000
+# Colab output callback that serves the payload of another diffusion sample
+MODEL_CALLBACK = "boltz.model_payload"
+
+
+def _encode_level(pdb_text):
+    return base64.b64encode(gzip.compress(pdb_text.encode("utf-8"), compresslevel=6, mtime=0)).decode("ascii")
+
+
+def coarse_pdb(pdb_data):
+    """Reduces a PDB to CA/P trace atoms, all HETATM records and their CONECT records."""
+    kept, serials = [], set()
+    for line in pdb_data.splitlines():
+        record = line[:6].strip()
+        if record == "ATOM" and line[12:16].strip() in COARSE_ATOM_NAMES or record == "HETATM":
+            kept.append(line)
+            serials.add(line[6:11].strip())
+        elif record == "CONECT":
+            if all(line[i:i + 5].strip() in serials for i in range(6, len(line.rstrip()), 5)):
+                kept.append(line)
+        elif record in ("TER", "END", "MODEL", "ENDMDL"):
+            kept.append(line)
+    return "\n".join(kept) + "\n"
+
+
+def build_viewer_payload(pdb_data, lod_min_atoms=LOD_MIN_ATOMS):
+    """Returns the compressed viewer levels of a PDB string.
+
+    `full` always holds the whole file. `coarse` is None for structures small
+    enough to render at full detail straight away.
+    """
+    atom_count = sum(1 for line in pdb_data.splitlines() if line.startswith(("ATOM", "HETATM")))
+    coarse = _encode_level(coarse_pdb(pdb_data)) if atom_count > lod_min_atoms else None
+    return {
+        "atom_count": atom_count,
+        "coarse": coarse,
+        "full": _encode_level(pdb_data),
+    }
+
+
+def create_visualizations(job_name, model_id=0, b_min=50, b_max=90, ranked_ids=None):
+    """
+    Returns the compressed viewer levels of a model and the ids offered in the model menu.
+    """
+    pdb_file = model_file(job_name, model_id)
+
+    # --- Load PDB Data ---
+    with open(pdb_file, "r") as f:
+        pdb_data = f.read()
+
+    # The py3Dmol viewer is embedded directly in the HTML template for dynamic control
+    # We just need to return the compressed levels to be inserted into the JS
+    return {
+        "payload": build_viewer_payload(pdb_data),
+        "model_id": model_id,
+        "model_ids": ranked_ids or model_ids(job_name),
+    }
+
+
+RUN_REPORT_TEMPLATE = """
+<style>
+    /* ... Your existing CSS styles ... */
+    @import url('https://fonts.googleapis.com/css2?family=Roboto+Mono&family=Roboto:wght@400;500;700&display=swap');
+    .boltz-container {{
+        font-family: 'Roboto', sans-serif;
+        background-color: #ffffff;
+        color: #212121;
+        border: 1px solid #e0e0e0;
+        border-radius: 10px;
+        padding: 20px;
+        margin: 10px;
+        box-shadow: 0 4px 8px rgba(0,0,0,0.05);
+    }}
+    .boltz-container h1, .boltz-container h2, .boltz-container h3 {{
+        font-family: 'Roboto', sans-serif;
+        color: #257AE1;
+        border-bottom: 2px solid #185FE2;
+        padding-bottom: 5px;
+        margin-top: 20px;
+    }}
+    .boltz-container h1 {{
+        text-align: center;
+        font-size: 2em;
+        font-weight: 700;
+        color: #145ABE;
+        border-bottom: none;
+    }}
+    .boltz-container .job-name-span {{
+        font-family: 'Roboto Mono', monospace;
+        background-color: #eeeeee;
+        color: #922DF0;
+        padding: 3px 8px;
+        border-radius: 5px;
+        font-weight: bold;
+    }}
+    .output-box {{
+        background-color: #f5f5f5;
+        border: 1px solid #e0e0e0;
+        border-radius: 5px;
+        padding: 15px;
+        white-space: pre-wrap;
+        word-wrap: break-word;
+        max-height: 400px;
+        overflow-y: auto;
+        font-family: 'Roboto Mono', monospace;
+        font-size: 0.9em;
+        color: #333;
+    }}
+    .output-box.success {{ border-left: 5px solid #388e3c; }}
+    .report-table {{ border-collapse: collapse; margin-top: 10px; font-size: 0.9em; }}
+    .report-table th, .report-table td {{ border: 1px solid #e0e0e0; padding: 6px 12px; text-align: left; }}
+    .report-table th {{ background-color: #f5f5f5; }}
+    .output-box.error {{ border-left: 5px solid #d32f2f; color: #c62828; }}
+    .viz-container {{
+        display: flex;
+        flex-wrap: wrap;
+        gap: 20px;
+        margin-top: 20px;
+    }}
+    .viz-options {{
+        flex: 1;
+        min-width: 280px;
+        background-color: #ffffff;
+        border: 1px solid #e0e0e0;
+        border-radius: 8px;
+        padding: 15px;
+        box-shadow: 0 2px 4px rgba(0,0,0,0.04);
+    }}
+    .viz-viewer {{
+        flex: 2;
+        min-width: 500px;
+        height: 500px;
+        background-color: #f5f5f5;
+        border: 1px solid #e0e0e0;
+        border-radius: 8px;
+        box-shadow: 0 2px 4px rgba(0,0,0,0.04);
+        position: relative;
+    }}
+    .viz-options h3 {{
+        color: #0d47a1;
+        border-bottom: 1px solid #e0e0e0;
+        padding-bottom: 8px;
+        margin-bottom: 15px;
+    }}
+    .viz-options label {{
+        display: block;
+        margin-bottom: 6px;
+        font-weight: 500;
+        color: #424242;
+    }}
+    .viz-options select, .viz-options input[type="number"], .viz-options button {{
+        width: 100%;
+        box-sizing: border-box;
+        padding: 8px;
+        margin-bottom: 20px;
+        border: 1px solid #ccc;
+        border-radius: 4px;
+        font-family: 'Roboto', sans-serif;
+        font-size: 0.9em;
+        background-color: #fff;
+        color: #333;
+    }}
+    .viz-options button {{
+        background-color: #1976d2;
+        color: white;
+        border: none;
+        cursor: pointer;
+        transition: background-color 0.2s ease;
+    }}
+    .viz-options button:hover {{
+        background-color: #1565c0;
+    }}
+</style>
+
+<script src="https://3Dmol.org/build/3Dmol-min.js"></script>
+<script type="application/octet-stream" id="pdb_coarse">{coarse_payload}</script>
+<script type="application/octet-stream" id="pdb_full">{full_payload}</script>
+<script type="application/json" id="model_payloads">{model_payloads_json}</script>
+<script>
+    let viewer = null;
+    let pdbData = null;
+    let fullDetail = false;
+    let levels = null;
+    let currentModel = {model_id};
+
+    // Payload levels are gzip + base64; decoding happens only when a level is shown
+    async function decodeLevel(b64) {{
+        if (!b64) return null;
+        const bytes = Uint8Array.from(atob(b64), c => c.charCodeAt(0));
+        const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('gzip'));
+        return await new Response(stream).text();
+    }}
+
+    function embeddedText(id) {{
+        const element = document.getElementById(id);
+        return element ? element.textContent.trim() : '';
+    }}
+
+    // Other samples are fetched from the kernel when selected (or read from the
+    // embedded payloads when the output cannot call back into the kernel)
+    async function fetchModelPayload(modelId) {{
+        const embedded = JSON.parse(embeddedText('model_payloads') || '{{}}');
+        if (embedded[modelId]) return embedded[modelId];
+        const result = await google.colab.kernel.invokeFunction('{callback_name}', [{job_name_js}, modelId], {{}});
+        return result.data['application/json'];
+    }}
+
+    // The full level of the shown model is not embedded in Colab; it is fetched when first needed
+    async function fullLevel() {{
+        if (!levels.full) levels.full = (await fetchModelPayload(currentModel)).full;
+        return levels.full;
+    }}
+
+    async function showLevels(newLevels) {{
+        levels = newLevels;
+        const needsAtoms = document.getElementById('styleSelect').value !== 'cartoon';
+        fullDetail = !levels.coarse || needsAtoms;
+        pdbData = await decodeLevel(fullDetail ? await fullLevel() : levels.coarse);
+        updateDetailButton();
+    }}
+
+    async function initializeViewer() {{
+        const element = document.getElementById('mol_viewer');
+        await showLevels({{ coarse: embeddedText('pdb_coarse'), full: embeddedText('pdb_full') }});
+        if (element && pdbData) {{
+            viewer = $3Dmol.createViewer(element, {{ backgroundColor: 'white' }});
+            togglePlddtOptions();
+            updateViewer();
+        }} else {{
+            console.error("Viewer element or PDB data not found.");
+        }}
+    }}
+
+    setTimeout(initializeViewer, 500);
+
+    async function handleModelChange() {{
+        const select = document.getElementById('modelSelect');
+        select.disabled = true;
+        try {{
+            currentModel = Number(select.value);
+            await showLevels(await fetchModelPayload(currentModel));
+            updateViewer();
+        }} catch (err) {{
+            console.error(err);
+            alert('Could not load this model. Re-run the cell to switch models after a kernel restart.');
+        }} finally {{
+            select.disabled = false;
+        }}
+    }}
+
+    async function loadFullDetail() {{
+        if (fullDetail) return;
+        const button = document.getElementById('detailButton');
+        if (button) {{ button.disabled = true; button.textContent = 'Loading full-atom model...'; }}
+        try {{
+            pdbData = await decodeLevel(await fullLevel());
+            fullDetail = true;
+        }} catch (err) {{
+            console.error(err);
+            alert('Could not load the full-atom model. Re-run the cell to load it after a kernel restart.');
+        }}
+        updateDetailButton();
+        updateViewer();
+    }}
+
+    function updateDetailButton() {{
+        const button = document.getElementById('detailButton');
+        if (!button) return;
+        button.style.display = fullDetail ? 'none' : 'block';
+        button.disabled = false;
+        button.textContent = 'Load Full-Atom Detail';
+    }}
+
+    async function handleStyleChange() {{
+        togglePlddtOptions();
+        // Sphere, stick and line styles need every atom, not just the trace
+        if (document.getElementById('styleSelect').value !== 'cartoon') {{
+            await loadFullDetail();
+        }}
+        updateViewer();
+    }}
+
+    function togglePlddtOptions() {{
+        const style = document.getElementById('styleSelect').value;
+        const plddtContainer = document.getElementById('plddtOptionsContainer');
+        const colorSelect = document.getElementById('colorSchemeSelect');
+        const plddtOptions = document.querySelectorAll('.plddt-option');
+
+        if (style === 'cartoon') {{
+            plddtContainer.style.display = 'block';
+            plddtOptions.forEach(opt => {{ opt.disabled = false; }});
+        }} else {{
+            plddtContainer.style.display = 'none';
+            plddtOptions.forEach(opt => {{ opt.disabled = true; }});
+
+            const selectedOption = colorSelect.options[colorSelect.selectedIndex];
+            if (selectedOption.disabled) {{
+                colorSelect.value = 'chain';
+            }}
+        }}
+    }}
+
+    // ** DEFINITIVE FIX for disappearing structure **
+    function updateViewer() {{
+        if (!viewer) return;
+
+        viewer.clear();
+        viewer.addModel(pdbData, "pdb");
+
+        const style = document.getElementById('styleSelect').value;
+        const colorScheme = document.getElementById('colorSchemeSelect').value;
+
+        // ** ROBUSTNESS FIX STARTS HERE **
+        // Validate Min/Max values to prevent rendering errors if boxes are empty
+        let bMin = parseFloat(document.getElementById('bFactorMin').value);
+        let bMax = parseFloat(document.getElementById('bFactorMax').value);
+
+        if (isNaN(bMin)) {{ bMin = 50.0; }}
+        if (isNaN(bMax)) {{ bMax = 90.0; }}
+        // ** ROBUSTNESS FIX ENDS HERE **
+
+        const gradientSchemes = ['roygb', 'blueWhiteRed'];
+        let styleObj = {{}};
+
+        if (style === 'cartoon') {{
+            if (gradientSchemes.includes(colorScheme)) {{
+                // This now uses the validated bMin and bMax values
+                styleObj = {{
+                    cartoon: {{
+                        colorscheme: {{ prop: 'b', gradient: colorScheme, min: bMin, max: bMax }}
+                    }}
+                }};
+            }} else {{
+                styleObj = {{ cartoon: {{ colorscheme: colorScheme }} }};
+            }}
+        }} else {{
+            styleObj[style] = {{ colorscheme: colorScheme }};
+        }}
+
+        viewer.setStyle({{}}, styleObj);
+        viewer.addStyle({{'hetflag': true}}, {{'stick': {{'colorscheme': 'default'}}}});
+        viewer.zoomTo();
+        viewer.render();
+    }}
+
+    function resetZoom() {{
+        if (viewer) viewer.zoomTo();
+    }}
+</script>
+
+<div class="boltz-container">
+    <h1>Boltz2 Results: <span class="job-name-span">{job_name}</span></h1>
+    <div class="section">
+        <h2>Job Output</h2>
+        {job_output_html}
+    </div>
+    {resource_html}
+    {visualization_html_content}
+</div>
+"""
+
+VIEWER_SECTION_HTML = """
+<div class="section">
+    <h2>Protein Structure Visualization</h2>
+    <div class="viz-container">
+        <div class="viz-viewer">
+            <div id="mol_viewer" style="width:100%; height:100%;"></div>
+        </div>
+        <div class="viz-options">
+            <h3>Display Options</h3>
+            {model_select_html}
+            <div>
+                <label for="styleSelect">Style:</label>
+                <select id="styleSelect" onchange="handleStyleChange()">
+                    <option value="cartoon" selected>Cartoon</option>
+                    <option value="sphere">Sphere</option>
+                    <option value="stick">Stick</option>
+                    <option value="line">Line</option>
+                </select>
+            </div>
+            <div>
+                <label for="colorSchemeSelect">Color Scheme:</label>
+                <select id="colorSchemeSelect" onchange="updateViewer()">
+                    <optgroup label="pLDDT Gradient (Cartoon)">
+                        <option class="plddt-option" value="roygb" selected>Rainbow</option>
+                        <!--<option class="plddt-option" value="blueWhiteRed">Blue-White-Red</option>-->
+                    </optgroup>
+                    <optgroup label="General Coloring">
+                        <!--<option value="ssPyMOL">By Secondary Structure</option>-->
+                        <!--<option value="residue">By Residue</option>-->
+                        <option value="greenCarbon">Green Carbon</option>
+                        <option value="chain">By Chain</option>
+                        <option value="default">By Element</option>
+                    </optgroup>
+                </select>
+            </div>
+            <div id="plddtOptionsContainer">
+                <div>
+                    <label for="bFactorMin">pLDDT Min (for Gradient):</label>
+                    <input type="number" id="bFactorMin" value="50" step="1" min="1" onchange="updateViewer()">
+                </div>
+                <div>
+                    <label for="bFactorMax">pLDDT Max (for Gradient):</label>
+                    <input type="number" id="bFactorMax" value="90" step="1" min="1" onchange="updateViewer()">
+                </div>
+            </div>
+            <button id="detailButton" onclick="loadFullDetail()" style="display:none">Load Full-Atom Detail</button>
+            <button onclick="resetZoom()">Reset Zoom</button>
+        </div>
+    </div>
+</div>
+"""
+
+
+MODEL_SELECT_HTML = """
+            <div>
+                <label for="modelSelect">Model:</label>
+                <select id="modelSelect" onchange="handleModelChange()">{options}</select>
+            </div>"""
+
+
+def model_payload_callback(job_name, model_id):
+    """Kernel callback the viewer uses to fetch another sample's payload on demand."""
+    from IPython.display import JSON
+    return JSON(create_visualizations(job_name=job_name, model_id=int(model_id))["payload"])
+
+
+def render_run_report(job_name, job_output_html, visual_data=None, resource_html=""):
+    """Returns the run report HTML, including the viewer when a model is available.
+
+    Only the coarse level of the shown model is embedded. Its full-atom level
+    and the other samples are served by a kernel callback when the user asks
+    for them, or embedded as well when the output cannot call back into the
+    kernel (outside Colab).
+    """
+    from .colab import register_callback
+
+    payload = visual_data['payload'] if visual_data else {}
+    visualization_html_content = ""
+    model_payloads = {}
+    full_payload = payload.get('full') or ""
+    if visual_data:
+        can_call_back = register_callback(MODEL_CALLBACK, model_payload_callback)
+        if can_call_back and payload.get('coarse'):
+            full_payload = ""
+        ids = visual_data.get('model_ids') or [visual_data.get('model_id', 0)]
+        model_select_html = ""
+        if len(ids) > 1:
+            if not can_call_back:
+                model_payloads = {model_id: create_visualizations(job_name=job_name, model_id=model_id)["payload"]
+                                  for model_id in ids if model_id != visual_data['model_id']}
+            options = "".join(f'<option value="{model_id}"{" selected" if model_id == visual_data["model_id"] else ""}>'
+                              f'#{rank} - Model {model_id}</option>' for rank, model_id in enumerate(ids, start=1))
+            model_select_html = MODEL_SELECT_HTML.format(options=options)
+        visualization_html_content = VIEWER_SECTION_HTML.format(model_select_html=model_select_html)
+    return RUN_REPORT_TEMPLATE.format(
+        job_name=job_name,
+        job_output_html=job_output_html,
+        resource_html=resource_html,
+        coarse_payload=payload.get('coarse') or "",
+        full_payload=full_payload,
+        model_id=int(visual_data['model_id']) if visual_data else 0,
+        model_payloads_json=json.dumps(model_payloads) if model_payloads else "",
+        callback_name=MODEL_CALLBACK,
+        job_name_js=json.dumps(job_name),
+        visualization_html_content=visualization_html_content
+    )
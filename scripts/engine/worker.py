@@ -0,0 +1,425 @@
+"""Long-lived boltz worker that keeps torch and the last built model loaded.
+
+Every `boltz predict` process pays Python startup, the torch import and reading
+the checkpoints from ~/.boltz before it does any work. The worker pays the
+imports once: it imports boltz and runs each submitted `predict` in-process.
+It also keeps the model `load_from_checkpoint` built last for each checkpoint,
+so a later job with the same checkpoint and model arguments skips loading it;
+a job with other arguments (e.g. other sampling steps) builds a fresh one,
+which replaces it. It serves a Unix socket, one request per connection:
+
+    client -> worker   one JSON line: {"op": "ping" | "predict" | "shutdown", ...}
+    worker -> client   ping: one JSON status line
+                       predict: a status frame (accepted or busy), frames of the
+                                job's stdout/stderr, then a result frame
+
+A frame is a 1-byte kind, a 4-byte big-endian length and the payload. The
+worker runs one job at a time; a predict sent while it is busy is refused, and
+the caller runs the CLI instead. After `max_jobs` jobs, or once its resident
+memory passes `max_rss_mb`, the worker exits after answering, so leaks in
+long sessions are recycled.
+
+`run_boltz()` submits to the worker when one answers a ping and falls back to
+the `boltz` CLI otherwise. For testing on a CPU, `--stub SCRIPT` serves a
+Python script with a `main()` (e.g. benchmarks/fake_boltz.py) in place of boltz:
+
+    python -m engine.worker --stub ../benchmarks/fake_boltz.py --max-jobs 3
+"""
+import collections
+import contextlib
+import json
+import os
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+from .console import warn
+from .params import DATA_DIR
+from .stream import StreamResult, log_stream, run_streaming
+
+SOCKET_PATH = f"{DATA_DIR}/.boltz_worker.sock"
+WORKER_LOG = f"{DATA_DIR}/boltz_worker.log"
+DEFAULT_MAX_JOBS = 20
+PING_TIMEOUT = 2.0
+STATUS, OUTPUT, RESULT = b"s", b"o", b"r"
+_HEADER = struct.Struct(">cI")
+
+# Stands in for the Popen object handed to `on_start` hooks (the resource profiler needs the pid)
+WorkerProcess = collections.namedtuple("WorkerProcess", ["pid"])
+
+
+class WorkerUnavailable(OSError):
+    """The worker is not running, is busy, or went away before finishing a job."""
+
+
+# --- Protocol ---
+def _send_frame(conn, kind, payload):
+    conn.sendall(_HEADER.pack(kind, len(payload)) + payload)
+
+
+def _recv_exact(conn, size):
+    data = b""
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            raise WorkerUnavailable("The boltz worker closed the connection.")
+        data += chunk
+    return data
+
+
+def _recv_frame(conn):
+    kind, length = _HEADER.unpack(_recv_exact(conn, _HEADER.size))
+    return kind, _recv_exact(conn, length)
+
+
+class _FrameReader:
+    """File-like view of a job's output frames; reads return b"" at the result frame."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.result = None
+
+    def read(self, size=-1):
+        if self.result is not None:
+            return b""
+        kind, payload = _recv_frame(self.conn)
+        if kind == RESULT:
+            self.result = json.loads(payload)
+            return b""
+        return payload
+
+
+def _connect(socket_path, timeout):
+    if not os.path.exists(socket_path):
+        raise WorkerUnavailable(f"No boltz worker socket at {socket_path}.")
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    conn.settimeout(timeout)
+    try:
+        conn.connect(socket_path)
+    except OSError as e:
+        conn.close()
+        raise WorkerUnavailable(f"The boltz worker at {socket_path} is not answering ({e}).") from e
+    return conn
+
+
+def _request(conn, message):
+    conn.sendall(json.dumps(message).encode("utf-8") + b"\n")
+
+
+def ping(socket_path=SOCKET_PATH, timeout=PING_TIMEOUT):
+    """Returns the worker's status dict, or None if no worker answers."""
+    try:
+        with contextlib.closing(_connect(socket_path, timeout)) as conn:
+            _request(conn, {"op": "ping"})
+            return json.loads(conn.makefile('rb').readline())
+    except (OSError, ValueError):
+        return None
+
+
+def shutdown(socket_path=SOCKET_PATH, timeout=PING_TIMEOUT):
+    """Asks the worker to exit; True if one was running."""
+    try:
+        with contextlib.closing(_connect(socket_path, timeout)) as conn:
+            _request(conn, {"op": "shutdown"})
+            conn.makefile('rb').readline()
+        return True
+    except OSError:
+        return False
+
+
+def submit(cmd, log_file, cwd=None, tail_lines=200, on_line=None, on_start=None, socket_path=SOCKET_PATH):
+    """Runs a `boltz predict` command on the worker, streaming its output like `run_streaming`.
+
+    Raises WorkerUnavailable when the worker is gone or busy, or dies mid-job.
+    """
+    conn = _connect(socket_path, PING_TIMEOUT)
+    with contextlib.closing(conn):
+        _request(conn, {"op": "predict", "argv": list(cmd[1:]), "cwd": os.path.abspath(cwd or os.getcwd())})
+        kind, payload = _recv_frame(conn)
+        status = json.loads(payload)
+        if kind != STATUS or not status.get("accepted"):
+            raise WorkerUnavailable("The boltz worker is busy with another job.")
+        conn.settimeout(None)
+        if on_start:
+            on_start(WorkerProcess(status["pid"]))
+        reader = _FrameReader(conn)
+        tail = log_stream(reader, log_file, tail_lines, on_line)
+        if reader.result is None:
+            raise WorkerUnavailable("The boltz worker stopped before the job finished.")
+        return StreamResult(reader.result["returncode"], tail, log_file)
+
+
+def run_boltz(cmd, log_file, cwd=None, tail_lines=200, on_line=None, on_start=None, socket_path=SOCKET_PATH):
+    """Runs `boltz predict` on the warm worker if one is free, else as a new process."""
+    if os.path.exists(socket_path):
+        try:
+            return submit(cmd, log_file, cwd, tail_lines, on_line, on_start, socket_path)
+        except WorkerUnavailable as e:
+            warn(f"{e} Running the boltz CLI instead.")
+    return run_streaming(cmd, log_file, cwd=cwd, tail_lines=tail_lines, on_line=on_line, on_start=on_start)
+
+
+def start_worker(socket_path=SOCKET_PATH, max_jobs=DEFAULT_MAX_JOBS, max_rss_mb=None, stub=None,
+                 log_file=WORKER_LOG, env=None):
+    """Starts a detached worker process; it serves jobs once boltz is loaded. Returns the Popen."""
+    cmd = [sys.executable, "-m", "engine.worker", "--socket", socket_path, "--max-jobs", str(max_jobs)]
+    if max_rss_mb:
+        cmd += ["--max-rss-mb", str(max_rss_mb)]
+    if stub:
+        cmd += ["--stub", os.path.abspath(stub)]
+    scripts_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(env or os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (scripts_dir, env.get("PYTHONPATH")) if p)
+    with open(log_file, 'a') as log:
+        return subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL,
+                                env=env, start_new_session=True)
+
+
+def wait_until_ready(socket_path=SOCKET_PATH, timeout=300.0, interval=0.5):
+    """Polls the worker until it answers a ping; returns its status or None on timeout."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = ping(socket_path)
+        if status:
+            return status
+        time.sleep(interval)
+    return None
+
+
+# --- Runners ---
+def _memoize_models(model_classes):
+    """Makes `load_from_checkpoint` of each class return the model it built last for the same arguments.
+
+    boltz builds its models with Lightning's `load_from_checkpoint`. Only one
+    model is kept per checkpoint file; arguments that differ from the last
+    call build a fresh model in its place.
+    """
+    for model_class in model_classes:
+        original = model_class.load_from_checkpoint
+        built = {}
+
+        def load(checkpoint_path, *args, _original=original, _built=built, **kwargs):
+            if not isinstance(checkpoint_path, (str, os.PathLike)):
+                return _original(checkpoint_path, *args, **kwargs)
+            path = os.path.realpath(checkpoint_path)
+            key = (os.path.getmtime(path), repr(args), repr(sorted(kwargs.items())))
+            if path not in _built or _built[path][0] != key:
+                _built.pop(path, None)  # free the previous model before building the next
+                _built[path] = (key, _original(checkpoint_path, *args, **kwargs))
+            return _built[path][1]
+
+        model_class.load_from_checkpoint = staticmethod(load)
+
+
+def _boltz_model_classes():
+    import importlib
+
+    classes = []
+    for module, name in (("boltz.model.models.boltz1", "Boltz1"), ("boltz.model.models.boltz2", "Boltz2")):
+        try:
+            classes.append(getattr(importlib.import_module(module), name))
+        except (ImportError, AttributeError):
+            pass
+    return classes
+
+
+class BoltzRunner:
+    """Runs `boltz predict` in-process with torch imported once and the last built models kept."""
+
+    def __init__(self):
+        import torch
+        from boltz.main import cli
+        self.torch = torch
+        self.cli = cli
+        _memoize_models(_boltz_model_classes())
+
+    def run(self, argv):
+        import gc
+        try:
+            self.cli.main(args=argv, prog_name="boltz", standalone_mode=False)
+            return 0
+        except SystemExit as e:
+            return e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        finally:
+            gc.collect()
+            if self.torch.cuda.is_available():
+                self.torch.cuda.empty_cache()
+
+
+class ScriptRunner:
+    """Runs a Python script's `main()` in-process, as the stub for `boltz` (loaded once)."""
+
+    def __init__(self, path):
+        import importlib.util
+        spec = importlib.util.spec_from_file_location("boltz_stub", path)
+        self.module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(self.module)
+        self.path = path
+
+    def run(self, argv):
+        saved, sys.argv = sys.argv, [self.path] + list(argv)
+        try:
+            return self.module.main() or 0
+        except SystemExit as e:
+            return e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        finally:
+            sys.argv = saved
+
+
+# --- Server ---
+def _rss_mb():
+    try:
+        with open("/proc/self/status", 'r') as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+@contextlib.contextmanager
+def _captured_output(conn):
+    """Sends everything written to fds 1 and 2 (this process and its children) to `conn`."""
+    sys.stdout.flush()
+    sys.stderr.flush()
+    read_fd, write_fd = os.pipe()
+    saved = os.dup(1), os.dup(2)
+    os.dup2(write_fd, 1)
+    os.dup2(write_fd, 2)
+    os.close(write_fd)
+
+    def forward():
+        while True:
+            chunk = os.read(read_fd, 65536)
+            if not chunk:
+                return
+            try:
+                _send_frame(conn, OUTPUT, chunk)
+            except OSError:
+                pass  # the client went away; keep draining so the job does not block
+
+    t = threading.Thread(target=forward, name="worker-output", daemon=True)
+    t.start()
+    try:
+        yield
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(saved[0], 1)
+        os.dup2(saved[1], 2)
+        for fd in saved:
+            os.close(fd)
+        # Children that outlive the job (data loader workers) may hold the pipe open
+        t.join(timeout=5)
+        os.close(read_fd)
+
+
+class Worker:
+    """Accepts jobs on a Unix socket and runs them one at a time."""
+
+    def __init__(self, runner, socket_path=SOCKET_PATH, max_jobs=DEFAULT_MAX_JOBS, max_rss_mb=None):
+        self.runner = runner
+        self.socket_path = socket_path
+        self.max_jobs = max_jobs
+        self.max_rss_mb = max_rss_mb
+        self.jobs_done = 0
+        self.started = time.monotonic()
+        self._job_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def status(self):
+        return {"pid": os.getpid(), "jobs_done": self.jobs_done, "max_jobs": self.max_jobs,
+                "busy": self._job_lock.locked(), "rss_mb": _rss_mb(),
+                "uptime_s": round(time.monotonic() - self.started, 1)}
+
+    def _recycle_due(self):
+        rss = _rss_mb()
+        return self.jobs_done >= self.max_jobs or bool(self.max_rss_mb and rss and rss > self.max_rss_mb)
+
+    def _handle(self, conn):
+        with contextlib.closing(conn):
+            message = json.loads(conn.makefile('rb').readline() or b"{}")
+            op = message.get("op")
+            if op == "ping":
+                conn.sendall(json.dumps(self.status()).encode("utf-8") + b"\n")
+            elif op == "shutdown":
+                conn.sendall(json.dumps(self.status()).encode("utf-8") + b"\n")
+                self._stop.set()
+            elif op == "predict":
+                if not self._job_lock.acquire(blocking=False):
+                    _send_frame(conn, STATUS, json.dumps({"accepted": False, "busy": True}).encode("utf-8"))
+                    return
+                try:
+                    _send_frame(conn, STATUS, json.dumps({"accepted": True, "pid": os.getpid()}).encode("utf-8"))
+                    result = self._predict(conn, message)
+                finally:
+                    self._job_lock.release()
+                # Sent after the lock is free, so the client's next job is not refused as busy
+                with contextlib.suppress(OSError):
+                    _send_frame(conn, RESULT, json.dumps(result).encode("utf-8"))
+                if result["recycle"]:
+                    print(f"Recycling the worker after {self.jobs_done} jobs ({_rss_mb() or 0:.0f} MB resident).",
+                          flush=True)
+                    self._stop.set()
+
+    def _predict(self, conn, message):
+        cwd = os.getcwd()
+        with _captured_output(conn):
+            try:
+                os.chdir(message.get("cwd") or cwd)
+                returncode = self.runner.run(message["argv"])
+            except Exception:
+                import traceback
+                traceback.print_exc()
+                returncode = 1
+            finally:
+                os.chdir(cwd)
+        self.jobs_done += 1
+        return {"returncode": returncode, "pid": os.getpid(), "jobs_done": self.jobs_done,
+                "recycle": self._recycle_due()}
+
+    def serve(self):
+        if os.path.exists(self.socket_path):
+            if ping(self.socket_path):
+                raise RuntimeError(f"A boltz worker is already serving {self.socket_path}.")
+            os.remove(self.socket_path)  # left behind by a worker that was killed
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.socket_path)
+        server.listen(8)
+        server.settimeout(0.5)
+        print(f"boltz worker {os.getpid()} serving {self.socket_path}", flush=True)
+        try:
+            while not self._stop.is_set():
+                try:
+                    conn, _ = server.accept()
+                except socket.timeout:
+                    continue
+                threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+            # Let a recycling job's client read its result before the socket goes away
+            with self._job_lock:
+                pass
+        finally:
+            server.close()
+            with contextlib.suppress(OSError):
+                os.remove(self.socket_path)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve boltz predict jobs from a warm process.")
+    parser.add_argument("--socket", default=SOCKET_PATH)
+    parser.add_argument("--max-jobs", type=int, default=DEFAULT_MAX_JOBS, help="exit after this many jobs")
+    parser.add_argument("--max-rss-mb", type=float, default=None, help="exit once resident memory exceeds this")
+    parser.add_argument("--stub", default=None, help="Python script whose main() stands in for boltz")
+    args = parser.parse_args(argv)
+    runner = ScriptRunner(args.stub) if args.stub else BoltzRunner()
+    Worker(runner, args.socket, args.max_jobs, args.max_rss_mb).serve()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,22 +5,6 @@ import threading
 import time
 import os
 import shutil
-import datetime
-import uuid
-from zoneinfo import ZoneInfo
-import getpass
-import requests
-
-# Google auth imports
-from google.colab import auth
-from googleapiclient.discovery import build
-
-# ==== CONFIG ====
-LOG_URL = "https://script.google.com/macros/s/AKfycbxPoo0REctEt-6eXRFg-ow3_iAueyOcG3y-XsIZ8PsSFTZWM5B_Y-IJyOoYQ9bf7Q03/exec"
-NOTEBOOK_NAME = "Boltz2 v1.1"
-SESSION_ID = str(uuid.uuid4())
-JOB_TYPE = "Installation"
-JOB_NAME = "Boltz2 CUDA Setup"
 
 os.chdir("/content/")
 
@@ -33,30 +17,30 @@ class Color:
     RESET = "\033[0m"
 
 print(f"{Color.CYAN} ===Initialising Setup=== {Color.RESET}")
-# ==== Google authentication and email retrieval ====
-auth.authenticate_user()
-service = build('oauth2', 'v2')
-user_info = service.userinfo().get().execute()
-USER_EMAIL = user_info.get('email', None)
-USER_NAME = user_info.get('name', "unknown")  # <-- use Google account name
 
-# ==== Logging function ====
-def log_event(job_type=JOB_TYPE, job_name=JOB_NAME, event="visit"):
-    now_ist = datetime.datetime.now(ZoneInfo("Asia/Kolkata"))
-    data = {
-        "timestamp": now_ist.strftime("%Y-%m-%d %H:%M:%S %Z"),
-        "email": USER_EMAIL,
-        "username": USER_NAME,
-        "notebook": NOTEBOOK_NAME,
-        "session_id": SESSION_ID,
-        "job_type": job_type,
-        "job_name": job_name,
-        "event": event
-    }
-    try:
-        requests.post(LOG_URL, data=data)
-    except Exception as e:
-        print(f"[{Color.RED}✘{Color.RESET}] Failed to log event: {e}")
+# ==== Move Notebook dist folder and engine package ====
+# dist/ holds the compiled parameter generator; scripts/ holds the other cell
+# scripts and the engine package they import. Both are moved out of the clone
+# (removed at the end) first, so telemetry and every later cell import the
+# engine from one place.
+os.makedirs("/content/boltz_data", exist_ok=True)
+notebook_folder = "/content/Boltz-Notebook"
+for name in ("dist", "scripts"):
+    source = f"{notebook_folder}/{name}"
+    destination = f"/content/boltz_data/{name}"
+    if os.path.exists(source):
+        if os.path.exists(destination):
+            shutil.rmtree(destination)
+        shutil.move(source, destination)
+engine_dir = "/content/boltz_data/scripts"
+if engine_dir not in sys.path:
+    sys.path.insert(0, engine_dir)
+
+# ==== Google authentication and telemetry (sent in the background) ====
+if not os.path.isdir(f"{engine_dir}/engine"):
+    raise FileNotFoundError(f"The engine package is missing from {engine_dir}; "
+                            "run the Install Dependencies cell again to clone Boltz-Notebook afresh.")
+from engine.telemetry import log_event
 
 log_event(job_type="Installation", job_name="Boltz Setup", event=" ")
 # ==== Repos ====
@@ -125,14 +109,6 @@ for step in steps:
         all_success = False
         break
 
-# ==== Move Notebook dist folder ====
-os.makedirs("/content/boltz_data", exist_ok=True)
-notebook_dist = "/content/Boltz-Notebook/dist"
-destination_notebook_dist = "/content/boltz_data/dist"
-notebook_folder = "/content/Boltz-Notebook"
-if os.path.exists(notebook_dist):
-    if os.path.exists(destination_notebook_dist):
-        shutil.rmtree(destination_notebook_dist)
-    shutil.move(notebook_dist, destination_notebook_dist)
+# ==== Remove the cloned notebook repository ====
 if os.path.exists(notebook_folder):
     shutil.rmtree(notebook_folder)
\ No newline at end of file